@@ -20,7 +20,13 @@ Random Walks on Networks
 
 
 from .utils import *
+from .structures import *
 from .distributions import *
 from .visits import *
 from .walkers import *
+from .analytic import *
+from .cache import *
+from .sinks import *
+from .observers import *
+from .fitting import *
 
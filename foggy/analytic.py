@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+=================================
+Expected Activity of Random Walks
+=================================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-03-18
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    analytic.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+__all__ = ["walker_moments", "expected_activity"]
+
+
+import numpy
+
+from .distributions import random_generator
+from .visits import ConstantValue, assessor_values
+
+
+def walker_moments(num_walkers):
+    """
+    Determine mean and variance of the number of walkers per time point.
+
+    Parameters
+    ----------
+    num_walkers: distribution or number
+        Either a callable with ``mean`` and ``variance`` methods, like
+        ``UniformInterval``, or a constant number of walkers. Other callables
+        raise a ValueError since their moments are unknown.
+
+    Returns
+    -------
+    tuple: Mean and variance.
+    """
+    if hasattr(num_walkers, "mean") and hasattr(num_walkers, "variance"):
+        return (float(num_walkers.mean()), float(num_walkers.variance()))
+    if callable(num_walkers):
+        raise ValueError("analytic moments require a distribution of the "
+                "number of walkers with mean() and variance() methods")
+    return (float(num_walkers), 0.0)
+
+def _propagate(trans, start, values, probes, steps, transient, tol):
+    """
+    Propagate the distribution of a single walker and its correlations with
+    the earlier positions on the walk.
+
+    Position k = 0 is the source and position k = s + 1 is reached by step s.
+    Positions are counted as in ``foggy.walkers.march``.
+
+    Returns
+    -------
+    visits: numpy.array
+        Expected number of counted visits at each node.
+    node_sq: numpy.array
+        Correlations of a probed earlier visit with later visits at each node
+        (summed over all pairs of positions, one column per probe).
+    value_sq: numpy.array
+        Correlations of a probed earlier visit with later values (one entry per
+        probe).
+    later: numpy.array
+        Expected value of earlier counted visits while at each node.
+    """
+    prob = start.copy()
+    corr = numpy.zeros(probes.shape, dtype=float)
+    earlier = numpy.zeros(len(prob), dtype=float)
+    visits = numpy.zeros(len(prob), dtype=float)
+    node_sq = numpy.zeros(probes.shape, dtype=float)
+    value_sq = numpy.zeros(probes.shape[1], dtype=float)
+    later = numpy.zeros(len(prob), dtype=float)
+    delta_earlier = None
+    delta_corr = None
+    for pos in xrange(steps + 1):
+        counted = (transient == 0) if pos == 0 else (pos > transient + 1)
+        if counted:
+            visits += prob
+            node_sq += probes * corr
+            value_sq += values.dot(corr)
+            later += earlier
+            next_earlier = trans.dot(earlier + values * prob)
+            next_corr = trans.dot(corr + prob[:, numpy.newaxis] * probes)
+        else:
+            next_earlier = trans.dot(earlier)
+            next_corr = trans.dot(corr)
+        next_prob = trans.dot(prob)
+        if counted and tol is not None and delta_earlier is not None:
+            new_earlier = next_earlier - earlier
+            new_corr = next_corr - corr
+            # once the walker's distribution has converged the correlations grow
+            # linearly and the remaining positions can be summed in closed form
+            if (numpy.abs(next_prob - prob).sum() <= tol * prob.sum() and
+                    numpy.abs(new_earlier - delta_earlier).sum() <= tol *
+                    numpy.abs(new_earlier).sum() and
+                    numpy.abs(new_corr - delta_corr).sum() <= tol *
+                    numpy.abs(new_corr).sum()):
+                remaining = steps - pos
+                linear = remaining * (remaining - 1) / 2.0
+                visits += remaining * next_prob
+                tot_earlier = remaining * next_earlier + linear * new_earlier
+                tot_corr = remaining * next_corr + linear * new_corr
+                node_sq += probes * tot_corr
+                value_sq += values.dot(tot_corr)
+                later += tot_earlier
+                return (visits, node_sq, value_sq, later)
+        if counted:
+            delta_earlier = next_earlier - earlier
+            delta_corr = next_corr - corr
+        prob = next_prob
+        earlier = next_earlier
+        corr = next_corr
+    return (visits, node_sq, value_sq, later)
+
+def expected_activity(walk, sources, num_walkers, steps,
+        assessor=ConstantValue(), transient=0, probes=None, block_size=256,
+        tol=None, seed=None, max_exact=2**14):
+    """
+    Compute the expected activity of independent random walkers and its
+    fluctuations from the transition matrix rather than by simulation.
+
+    The model is the one of ``foggy.walkers.march``: In each time point a
+    number of walkers start at uniformly chosen sources and walk for a number
+    of steps or until they reach a dead end.
+
+    Parameters
+    ----------
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: distribution or number
+        Distribution of the number of walkers (see ``walker_moments``).
+    steps: int
+        The maximum number of steps for each individual random walker.
+    assessor: callable (optional)
+        The value of a visit at a node (see ``assessor_values``).
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    probes: int (optional)
+        The variance at each node requires the probabilities of returning to
+        the node. By default these are computed exactly which costs one
+        propagation per node, i.e., O(N * steps * nnz) operations for N nodes
+        and nnz edges, and dense arrays of N x block_size elements. Given a
+        number of random probe vectors instead, they are estimated without
+        bias at the cost of that many propagations, which is the only
+        feasible choice for large networks.
+    block_size: int (optional)
+        Number of nodes propagated at once in the exact computation.
+    tol: float (optional)
+        If given, stop propagating once the relative change of the walker
+        distribution and the growth of correlations falls below tol and
+        extrapolate linearly for the remaining steps.
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) for the probes.
+    max_exact: int (optional)
+        Largest number of nodes for which the exact computation is performed.
+
+    Returns
+    -------
+    Four arrays for the mean activity, its standard deviation, and the
+    standard deviations of the internal and external fluctuations of each node
+    (cf. ``internal_dynamics_external_fluctuations``).
+    """
+    steps = int(steps)
+    transient = int(transient)
+    num_nodes = len(walk)
+    if probes is None and num_nodes > max_exact:
+        raise ValueError("exact computation for %d nodes is too expensive, "
+                "pass a number of probes or raise max_exact" % num_nodes)
+    trans = walk.transition_matrix().T.tocsr()
+    values = assessor_values(assessor, num_nodes)
+    start = numpy.bincount(numpy.asarray(sources, dtype=int),
+            minlength=num_nodes) / float(len(sources))
+    # the pair terms of each node, summed over probes
+    pair_nodes = numpy.zeros(num_nodes, dtype=float)
+    pair_values = numpy.zeros(num_nodes, dtype=float)
+    if probes is None:
+        for first in xrange(0, num_nodes, block_size):
+            block = numpy.arange(first, min(first + block_size, num_nodes))
+            unit = numpy.zeros((num_nodes, len(block)), dtype=float)
+            unit[block, numpy.arange(len(block))] = 1.0
+            (visits, node_sq, value_sq, later) = _propagate(trans, start,
+                    values, unit, steps, transient, tol)
+            pair_nodes[block] = node_sq.sum(axis=1)[block]
+            pair_values[block] = value_sq
+    else:
+        rng = random_generator(seed)
+        if hasattr(rng, "integers"):
+            signs = rng.integers(2, size=(num_nodes, int(probes)))
+        else:
+            signs = rng.randint(2, size=(num_nodes, int(probes)))
+        signs = 2.0 * signs - 1.0
+        (visits, node_sq, value_sq, later) = _propagate(trans, start, values,
+                signs, steps, transient, tol)
+        pair_nodes = node_sq.mean(axis=1)
+        pair_values = (signs * value_sq).mean(axis=1)
+    # moments of the value contributed by a single walker
+    mean_single = values * visits
+    var_single = values * values * (visits + 2.0 * pair_nodes) -\
+            mean_single * mean_single
+    mean_total = mean_single.sum()
+    var_total = (values * values).dot(visits) + 2.0 * values.dot(later) -\
+            mean_total * mean_total
+    cov_single = values * (later + values * visits + pair_values) -\
+            mean_single * mean_total
+    # compound over the random number of walkers
+    (mean_num, var_num) = walker_moments(num_walkers)
+    mean = mean_num * mean_single
+    variance = mean_num * var_single + var_num * mean_single * mean_single
+    var_sum = mean_num * var_total + var_num * mean_total * mean_total
+    cov_sum = mean_num * cov_single + var_num * mean_single * mean_total
+    if mean_total > 0.0:
+        fraction = mean_single / mean_total
+    else:
+        fraction = numpy.zeros(num_nodes, dtype=float)
+    internal = variance - 2.0 * fraction * cov_sum + fraction * fraction *\
+            var_sum
+    external = fraction * numpy.sqrt(max(var_sum, 0.0))
+    return (mean, numpy.sqrt(numpy.maximum(variance, 0.0)),
+            numpy.sqrt(numpy.maximum(internal, 0.0)), external)
+
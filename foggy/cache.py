@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+=======================
+Cache of Prepared Walks
+=======================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-03-24
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    cache.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+__all__ = ["file_digest", "WalkCache"]
+
+
+import io
+import os
+import shutil
+import hashlib
+import tempfile
+import itertools
+import cPickle as pickle
+
+import numpy
+import networkx as nx
+
+from .structures import PreparedWalk
+
+
+def file_digest(filename, block_size=2**20):
+    """
+    Compute the SHA-1 digest of a file's content.
+
+    Parameters
+    ----------
+    filename: str
+        Path to the file.
+    block_size: int (optional)
+        Number of bytes read at once.
+
+    Returns
+    -------
+    str: The digest in hexadecimal notation.
+    """
+    sha = hashlib.sha1()
+    with open(filename, "rb") as file_h:
+        for block in iter(lambda: file_h.read(block_size), ""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class WalkCache(object):
+    """
+    A directory of prepared walks that are stored as .npy files and opened as
+    read-only memory maps such that all processes on a machine share the same
+    pages.
+
+    Each entry is a sub-directory named after a key that is derived from the
+    content of the graph file and the preparation parameters.
+    """
+
+    def __init__(self, directory, mmap_mode="r", **kw_args):
+        """
+        Parameters
+        ----------
+        directory: str
+            Location of the cache which is created if necessary.
+        mmap_mode: str (optional)
+            Passed on to ``numpy.load``.
+        """
+        super(WalkCache, self).__init__(**kw_args)
+        self.directory = directory
+        self.mmap_mode = mmap_mode
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def key(digest, **params):
+        """
+        Combine the digest of a graph with preparation parameters.
+
+        Parameters
+        ----------
+        digest: str
+            Identifies the graph, e.g., the result of ``file_digest``.
+        params:
+            Any parameters of the preparation, e.g., the walk type, weight,
+            temperature, or layers. Their representation enters the key.
+        """
+        sha = hashlib.sha1(digest)
+        for name in sorted(params):
+            sha.update("{0}={1!r};".format(name, params[name]))
+        return sha.hexdigest()
+
+    def __contains__(self, key):
+        return os.path.isdir(os.path.join(self.directory, key))
+
+    def load(self, key):
+        """
+        Open a cached walk.
+
+        Returns
+        -------
+        PreparedWalk: The memory-mapped walk or None if key is not cached.
+        dict: The mapping from nodes to indices.
+        unicode: The name of the graph or None if it was not stored.
+        """
+        path = os.path.join(self.directory, key)
+        if not os.path.isdir(path):
+            return None
+        filename = os.path.join(path, "nodes.npy")
+        if os.path.exists(filename):
+            nodes = numpy.load(filename)
+            if nodes.ndim != 1:
+                # tuple nodes stored by earlier versions cannot be restored
+                shutil.rmtree(path, ignore_errors=True)
+                return None
+            nodes = nodes.tolist()
+        else:
+            with open(os.path.join(path, "nodes.pkl"), "rb") as file_h:
+                nodes = pickle.load(file_h)
+        walk = PreparedWalk.load(path, mmap_mode=self.mmap_mode)
+        filename = os.path.join(path, "name.txt")
+        if os.path.exists(filename):
+            with io.open(filename, encoding="utf-8") as file_h:
+                name = file_h.read()
+        else:
+            name = None
+        return (walk, dict(itertools.izip(nodes, itertools.count())), name)
+
+    def store(self, key, walk, node2id, name=None):
+        """
+        Add a walk to the cache.
+
+        The entry is written to a temporary location first and then moved into
+        place so that concurrent processes never see a partial entry. Nodes
+        are stored as a .npy file if they form a one-dimensional array of a
+        plain type and pickled otherwise, e.g., the tuples of a grid graph.
+        """
+        nodes = sorted(node2id, key=node2id.get)
+        tmp_dir = tempfile.mkdtemp(prefix="tmp_", dir=self.directory)
+        try:
+            walk.save(tmp_dir)
+            array = numpy.asarray(nodes)
+            if array.ndim == 1 and not array.dtype.hasobject:
+                numpy.save(os.path.join(tmp_dir, "nodes.npy"), array)
+            else:
+                with open(os.path.join(tmp_dir, "nodes.pkl"), "wb") as file_h:
+                    pickle.dump(nodes, file_h, pickle.HIGHEST_PROTOCOL)
+            if name is not None:
+                with io.open(os.path.join(tmp_dir, "name.txt"), "w",
+                        encoding="utf-8") as file_h:
+                    file_h.write(unicode(name))
+            os.rename(tmp_dir, os.path.join(self.directory, key))
+        except OSError:
+            # another process has stored the same entry in the meantime
+            if key not in self:
+                raise
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def prepare(self, filename, setup, graph=None, **params):
+        """
+        Return the prepared walk of a pickled graph from the cache or prepare
+        and store it.
+
+        Parameters
+        ----------
+        filename: str
+            Path to the pickled graph.
+        setup: callable
+            A preparation function like ``prepare_uniform_walk``.
+        graph: nx.(Di)Graph (optional)
+            The graph loaded from filename, it is read only if necessary.
+        params:
+            Keyword arguments passed on to setup.
+
+        Returns
+        -------
+        PreparedWalk: The memory-mapped walk.
+        dict: The mapping from nodes to indices.
+        unicode: The name of the graph or None for entries stored without it.
+        """
+        key = self.key(file_digest(filename), setup=setup.__name__, **params)
+        result = self.load(key)
+        if result is None:
+            if graph is None:
+                graph = nx.read_gpickle(filename)
+            (walk, node2id) = setup(graph, **params)
+            self.store(key, walk, node2id, name=graph.name)
+            result = self.load(key)
+        return result
+
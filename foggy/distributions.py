@@ -19,12 +19,121 @@ Random Walks on Networks
 """
 
 
-__all__ = ["UniformInterval"]
+__all__ = ["random_generator", "RandomBlocks", "UniformInterval",
+        "walker_counts"]
 
 
 import numpy
 
 
+def random_generator(seed=None):
+    """
+    Create an independent random number generator.
+
+    Parameters
+    ----------
+    seed: (optional)
+        A valid seed or an existing generator which is returned unchanged.
+
+    Returns
+    -------
+    A ``numpy.random.Generator`` based on PCG64 where available (numpy >= 1.17)
+    and a ``numpy.random.RandomState`` otherwise.
+    """
+    if isinstance(seed, numpy.random.RandomState):
+        return seed
+    if hasattr(numpy.random, "Generator"):
+        if isinstance(seed, numpy.random.Generator):
+            return seed
+        return numpy.random.Generator(numpy.random.PCG64(seed))
+    return numpy.random.RandomState(seed)
+
+
+class RandomBlocks(object):
+    """
+    Supply uniform random numbers from large pre-allocated blocks such that
+    inner loops need not call the generator for every single number.
+
+    Warning
+    -------
+    Arrays handed out are views on the current block and are only valid until
+    the next call to ``uniform``.
+    """
+
+    def __init__(self, seed=None, size=2**16, **kw_args):
+        """
+        Parameters
+        ----------
+        seed: (optional)
+            A valid seed or generator (see ``random_generator``).
+        size: int (optional)
+            The number of random numbers drawn at once.
+        """
+        super(RandomBlocks, self).__init__(**kw_args)
+        self.rng = random_generator(seed)
+        # integers come from a separate stream so that the sequence of uniform
+        # numbers does not depend on when blocks are refilled
+        self._int_rng = random_generator(self._integers(self.rng,
+                numpy.iinfo(numpy.int32).max))
+        self.size = int(size)
+        self._block = numpy.empty(0, dtype=float)
+        self._pos = 0
+
+    def _fill(self, block):
+        if hasattr(self.rng, "integers"):
+            self.rng.random(out=block)
+        else:
+            block[:] = self.rng.random_sample(len(block))
+
+    def _refill(self, num):
+        remainder = self._block[self._pos:].copy()
+        size = max(self.size, num)
+        if len(self._block) != size:
+            self._block = numpy.empty(size, dtype=float)
+        self._block[:len(remainder)] = remainder
+        self._fill(self._block[len(remainder):])
+        self._pos = 0
+
+    def uniform(self, num):
+        """
+        Return the next num uniform random numbers in [0, 1).
+        """
+        end = self._pos + num
+        if end > len(self._block):
+            self._refill(num)
+            end = num
+        draws = self._block[self._pos:end]
+        self._pos = end
+        return draws
+
+    def peek(self, num):
+        """
+        Return at least the next num uniform random numbers without consuming
+        them (see ``skip``).
+        """
+        if self._pos + num > len(self._block):
+            self._refill(num)
+        return self._block[self._pos:]
+
+    def skip(self, num):
+        """
+        Consume num random numbers that were previously obtained by ``peek``.
+        """
+        self._pos += num
+
+    @staticmethod
+    def _integers(rng, high, num=None):
+        if hasattr(rng, "integers"):
+            return rng.integers(high, size=num)
+        return rng.randint(high, size=num)
+
+    def integers(self, high, num=None):
+        """
+        Return num random integers in [0, high).
+        """
+        return self._integers(self._int_rng, high, num)
+
+
 class UniformInterval(object):
     """
     Instances of UniformInterval can be called without argument to yield a
@@ -32,7 +141,7 @@ class UniformInterval(object):
     interval (cut off at zero).
     """
 
-    def __init__(self, mid_point, variation=0, **kw_args):
+    def __init__(self, mid_point, variation=0, seed=None, **kw_args):
         """
         At instantiation the mean of the interval and and the uniform variation
         around that mean are determined.
@@ -44,9 +153,14 @@ class UniformInterval(object):
         variation: int (optional)
             Determines the interval, it is from mid_point - variation or zero to
             mid_point + variation.
+        seed: (optional)
+            A valid seed or generator (see ``random_generator``). Without it,
+            marchers draw the numbers from their own seed (see
+            ``walker_counts``).
         """
         super(UniformInterval, self).__init__(**kw_args)
-        self.rand_int = numpy.random.random_integers
+        self.seed = seed
+        self.rng = random_generator(seed)
         self.mid_point = int(mid_point)
         assert self.mid_point >= 0
         self.variation = int(variation)
@@ -69,6 +183,69 @@ class UniformInterval(object):
     def constant(self):
         return self.mid_point
 
+    def derive(self, blocks):
+        """
+        Return an instance that draws from a seed of the given random numbers
+        unless this instance has its own seed or is constant.
+
+        Parameters
+        ----------
+        blocks: RandomBlocks
+            The random numbers of a marcher.
+        """
+        if self.seed is not None or self.variation == 0:
+            return self
+        return UniformInterval(self.mid_point, self.variation,
+                seed=blocks.integers(numpy.iinfo(numpy.int32).max))
+
+    def mean(self):
+        """
+        Expected number of walkers taking the cut-off at zero into account.
+        """
+        return self._moments()[0]
+
+    def variance(self):
+        """
+        Variance of the number of walkers taking the cut-off at zero into
+        account.
+        """
+        return self._moments()[1]
+
+    def _moments(self):
+        num = float(self.maxi - self.mini + 1)
+        low = max(self.mini, 0)
+        if low > self.maxi:
+            return (0.0, 0.0)
+        # sums of k and k^2 over the positive part of the interval
+        first = 0.5 * (low + self.maxi) * (self.maxi - low + 1)
+        second = (self.maxi * (self.maxi + 1.0) * (2.0 * self.maxi + 1.0) -
+                (low - 1.0) * low * (2.0 * low - 1.0)) / 6.0
+        mean = first / num
+        return (mean, second / num - mean * mean)
+
     def variable(self):
-        return max(self.rand_int(self.mini, self.maxi), 0)
+        if hasattr(self.rng, "integers"):
+            draw = self.rng.integers(self.mini, self.maxi, endpoint=True)
+        else:
+            draw = self.rng.randint(self.mini, self.maxi + 1)
+        return max(draw, 0)
+
+
+def walker_counts(num_walkers, blocks):
+    """
+    Tie the distribution of the number of walkers to the random numbers of a
+    marcher such that the marcher's seed also determines the number of walkers
+    per time point.
+
+    Parameters
+    ----------
+    num_walkers: callable
+        A callable that returns an integer z >= 0. Distributions that have a
+        ``derive`` method, like ``UniformInterval``, are replaced.
+    blocks: RandomBlocks
+        The random numbers of the marcher.
+    """
+    if hasattr(num_walkers, "derive"):
+        return num_walkers.derive(blocks)
+    return num_walkers
 
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+===========================
+Fluctuation Scaling Fitting
+===========================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-03-28
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    fitting.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+__all__ = ["loglink_fit", "loglog_fit", "fit_table"]
+
+
+import numpy
+import scipy.stats
+
+
+FIT_FIELDS = ["count", "slope", "standard_error", "p_value", "intercept",
+        "int_error", "r_squared"]
+
+
+def _group_sums(groups, num, values):
+    return numpy.bincount(groups, weights=values, minlength=num)
+
+def _prepare(x, y, groups):
+    """
+    Remove observations where x or y are not finite or not positive and
+    number the groups of the remaining ones.
+    """
+    x = numpy.asarray(x, dtype=float)
+    y = numpy.asarray(y, dtype=float)
+    with numpy.errstate(invalid="ignore"):
+        mask = numpy.isfinite(x) & (x > 0.0) & numpy.isfinite(y) & (y > 0.0)
+    if groups is None:
+        labels = None
+        indices = numpy.zeros(mask.sum(), dtype=int)
+    else:
+        (labels, indices) = numpy.unique(numpy.asarray(groups)[mask],
+                return_inverse=True)
+    num = 1 if labels is None else len(labels)
+    return (labels, indices, num, numpy.log(x[mask]), y[mask])
+
+def _records(labels, count, slope, std_err, intercept, int_err, r_squared):
+    dof = count - 2.0
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        p_value = 2.0 * scipy.stats.t.sf(numpy.abs(slope / std_err), dof)
+    undefined = dof < 1.0
+    for values in (std_err, int_err, p_value):
+        values[undefined] = numpy.nan
+    arrays = [count.astype(int), slope, std_err, p_value, intercept, int_err,
+            r_squared]
+    if labels is None:
+        return numpy.rec.fromarrays(arrays, names=FIT_FIELDS)
+    return numpy.rec.fromarrays([labels] + arrays, names=["group"] +
+            FIT_FIELDS)
+
+def _least_squares(indices, num, count, x, y):
+    """
+    Ordinary least squares of y on x per group.
+    """
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        mean_x = _group_sums(indices, num, x) / count
+        mean_y = _group_sums(indices, num, y) / count
+        # centered sums of squares and products per group
+        x = x - mean_x[indices]
+        y = y - mean_y[indices]
+        s_xx = _group_sums(indices, num, x * x)
+        s_yy = _group_sums(indices, num, y * y)
+        s_xy = _group_sums(indices, num, x * y)
+        slope = s_xy / s_xx
+        intercept = mean_y - slope * mean_x
+        residual = numpy.maximum(s_yy - slope * s_xy, 0.0) / (count - 2.0)
+        std_err = numpy.sqrt(residual / s_xx)
+        int_err = numpy.sqrt(residual * (1.0 / count + mean_x * mean_x / s_xx))
+        r_squared = s_xy * s_xy / (s_xx * s_yy)
+    return (slope, std_err, intercept, int_err, r_squared)
+
+def loglink_fit(x, y, groups=None, max_iter=100, tol=1E-10):
+    """
+    Fit y = exp(intercept + slope * log(x)) by non-linear least squares for all
+    groups of observations at once, e.g., the standard deviation versus the
+    mean activity of nodes of many simulations.
+
+    This is the generalized linear model with Gaussian errors and a log link
+    of ``fit_slope`` in analysis.R. It is solved by iteratively reweighted
+    least squares started from the log-log fit of ``loglog_fit``. Since errors
+    are measured on the original scale, large values of y weigh more than in
+    ``loglog_fit`` and the estimates generally differ.
+
+    Observations where x or y are not finite or not positive are ignored.
+
+    Parameters
+    ----------
+    x: array-like
+        Independent variable, e.g., the mean activity of nodes.
+    y: array-like
+        Dependent variable, e.g., the standard deviation of their activity.
+    groups: array-like (optional)
+        Labels that assign observations to separate fits, e.g., simulation
+        ids. By default all observations form one group.
+    max_iter: int (optional)
+        Maximum number of iterations.
+    tol: float (optional)
+        Largest relative change of the estimates at convergence.
+
+    Returns
+    -------
+    numpy.recarray: One record per group with fields "group" (unless groups
+    is None), "count", "slope", "standard_error", "p_value" (slope different
+    from zero), "intercept", "int_error", and "r_squared" (on the original
+    scale of y). Estimates that are undefined for too few observations or
+    that did not converge are NaN.
+    """
+    (labels, indices, num, log_x, y) = _prepare(x, y, groups)
+    count = numpy.bincount(indices, minlength=num).astype(float)
+    (slope, _, intercept, _, _) = _least_squares(indices, num, count, log_x,
+            numpy.log(y))
+    converged = numpy.zeros(num, dtype=bool)
+    with numpy.errstate(all="ignore"):
+        for _ in xrange(max_iter):
+            eta = intercept[indices] + slope[indices] * log_x
+            mean = numpy.exp(eta)
+            # weights and working response of the Gaussian family, log link
+            weight = mean * mean
+            work = eta + (y - mean) / mean
+            s_w = _group_sums(indices, num, weight)
+            s_wx = _group_sums(indices, num, weight * log_x)
+            s_wxx = _group_sums(indices, num, weight * log_x * log_x)
+            s_wz = _group_sums(indices, num, weight * work)
+            s_wxz = _group_sums(indices, num, weight * log_x * work)
+            det = s_w * s_wxx - s_wx * s_wx
+            new_slope = (s_w * s_wxz - s_wx * s_wz) / det
+            new_intercept = (s_wz - new_slope * s_wx) / s_w
+            change = numpy.abs(new_slope - slope) +\
+                    numpy.abs(new_intercept - intercept)
+            converged = change <= tol * (numpy.abs(new_slope) +
+                    numpy.abs(new_intercept) + tol)
+            (slope, intercept) = (new_slope, new_intercept)
+            finite = numpy.isfinite(slope) & numpy.isfinite(intercept)
+            if converged[finite].all():
+                break
+        mean = numpy.exp(intercept[indices] + slope[indices] * log_x)
+        weight = mean * mean
+        s_w = _group_sums(indices, num, weight)
+        s_wx = _group_sums(indices, num, weight * log_x)
+        s_wxx = _group_sums(indices, num, weight * log_x * log_x)
+        det = s_w * s_wxx - s_wx * s_wx
+        residual = y - mean
+        rss = _group_sums(indices, num, residual * residual)
+        dispersion = rss / (count - 2.0)
+        std_err = numpy.sqrt(dispersion * s_w / det)
+        int_err = numpy.sqrt(dispersion * s_wxx / det)
+        deviation = y - (_group_sums(indices, num, y) / count)[indices]
+        r_squared = 1.0 - rss / _group_sums(indices, num, deviation *
+                deviation)
+    for values in (slope, std_err, intercept, int_err, r_squared):
+        values[~converged] = numpy.nan
+    return _records(labels, count, slope, std_err, intercept, int_err,
+            r_squared)
+
+def loglog_fit(x, y, groups=None):
+    """
+    Fit log(y) = intercept + slope * log(x) by ordinary least squares for all
+    groups of observations at once, e.g., the standard deviation versus the
+    mean activity of nodes of many simulations.
+
+    Errors are measured on the log scale, so the estimates generally differ
+    from those of ``loglink_fit`` and analysis.R. They also differ from the
+    k * x^alpha + c fit of ``foggy.plots.fluctuation_scaling_fit``.
+
+    Observations where x or y are not finite or not positive are ignored.
+
+    Parameters
+    ----------
+    x: array-like
+        Independent variable, e.g., the mean activity of nodes.
+    y: array-like
+        Dependent variable, e.g., the standard deviation of their activity.
+    groups: array-like (optional)
+        Labels that assign observations to separate fits, e.g., simulation
+        ids. By default all observations form one group.
+
+    Returns
+    -------
+    numpy.recarray: One record per group with fields "group" (unless groups
+    is None), "count", "slope", "standard_error", "p_value" (slope different
+    from zero), "intercept", "int_error", and "r_squared". Estimates that are
+    undefined for too few observations are NaN.
+    """
+    (labels, indices, num, log_x, y) = _prepare(x, y, groups)
+    count = numpy.bincount(indices, minlength=num).astype(float)
+    return _records(labels, count, *_least_squares(indices, num, count,
+            log_x, numpy.log(y)))
+
+FITS = {
+    "loglink": loglink_fit,
+    "loglog": loglog_fit
+}
+
+def fit_table(table, x="mean_activity", y="std_activity", by="sim_id",
+        condition=None, method="loglink"):
+    """
+    Fit the fluctuation scaling of each simulation in a results table.
+
+    Parameters
+    ----------
+    table: tables.Table or numpy.ndarray
+        The per node results, e.g., ``foggy.hdf5.ResultManager.results``, or a
+        structured array with the same fields.
+    x: str (optional)
+        Column of the independent variable.
+    y: str (optional)
+        Column of the dependent variable, e.g., "internal" or "external".
+    by: str (optional)
+        Column that identifies the separately fitted groups.
+    condition: str (optional)
+        Only fit rows that satisfy a ``tables.Table.read_where`` condition,
+        e.g., "directed == False". Structured arrays should be indexed
+        instead.
+    method: str (optional)
+        Either "loglink" (``loglink_fit``), the model of analysis.R, or
+        "loglog" (``loglog_fit``).
+
+    Returns
+    -------
+    numpy.recarray: One record per group as returned by the fit with the
+    group label in a field named after by.
+    """
+    names = [by, x, y]
+    if isinstance(table, numpy.ndarray):
+        if condition is not None:
+            raise ValueError("conditions require a tables.Table, index "
+                    "structured arrays instead")
+        columns = [table[name] for name in names]
+    elif condition is not None:
+        rows = table.read_where(condition)
+        columns = [rows[name] for name in names]
+    else:
+        columns = [table.col(name) for name in names]
+    fits = FITS[method](columns[1], columns[2], columns[0])
+    fits.dtype.names = (by,) + fits.dtype.names[1:]
+    return fits
+
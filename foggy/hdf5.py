@@ -17,7 +17,7 @@ Input/Output of HDF5 Files
 """
 
 
-__all__ = ["ResultManager"]
+__all__ = ["ResultManager", "HDF5Sink"]
 
 
 import os
@@ -25,6 +25,9 @@ import os
 import numpy
 import tables
 
+from .sinks import ColumnWriter
+from .fitting import fit_table
+
 
 UUID_LENGTH = 32 # stripped dashes
 
@@ -154,6 +157,77 @@ class ResultManager(object):
         self.results = self.h5_file.create_table(self.root, "results", NodeData,
                 title="Per node results of simulations.")
 
+    def fit(self, x="mean_activity", y="std_activity", by="sim_id",
+            condition=None, method="loglink"):
+        """
+        Fit the fluctuation scaling of each simulation in the results table
+        (see ``foggy.fitting.fit_table``).
+        """
+        return fit_table(self.results, x=x, y=y, by=by, condition=condition,
+                method=method)
+
     def finalize(self):
         self.h5_file.close()
 
+
+class HDF5Sink(object):
+    """
+    Writes the results of a march to chunked and compressed arrays in an HDF5
+    file. Columns are collected until a chunk is complete such that only one
+    block of columns needs to be held in memory.
+    """
+
+    def __init__(self, h5_file, where="/", block_columns=64, complevel=5,
+            complib="zlib", chunk_bytes=2**20, **kw_args):
+        """
+        Parameters
+        ----------
+        h5_file: str or tables.File
+            An open file or the name of a file that is opened for appending.
+        where: str (optional)
+            Group of the created arrays, it is created if necessary.
+        block_columns: int (optional)
+            Number of time points per chunk.
+        complevel: int (optional)
+            Compression level from 0 to 9.
+        complib: str (optional)
+            Compression library, see ``tables.Filters``.
+        chunk_bytes: int (optional)
+            Approximate size of a chunk which determines the number of nodes
+            per chunk.
+        """
+        super(HDF5Sink, self).__init__(**kw_args)
+        if isinstance(h5_file, basestring):
+            h5_file = tables.open_file(h5_file, mode="a")
+        self.h5_file = h5_file
+        self.where = where
+        self.block_columns = block_columns
+        self.filters = tables.Filters(complevel=complevel, complib=complib)
+        self.chunk_bytes = chunk_bytes
+
+    def create(self, name, shape, dtype):
+        """
+        Parameters
+        ----------
+        name: str
+            Name of the array in the group, e.g., "visits" or "removed".
+        shape: tuple
+            Number of nodes N and number of time points T.
+        dtype: numpy.dtype
+            Type of the elements.
+
+        Returns
+        -------
+        ColumnWriter: Collects the columns of the result.
+        """
+        atom = tables.Atom.from_dtype(numpy.dtype(dtype))
+        block = max(min(self.block_columns, shape[1]), 1)
+        rows = max(min(shape[0], self.chunk_bytes // (atom.size * block)), 1)
+        array = self.h5_file.create_carray(self.where, name, atom=atom,
+                shape=shape, filters=self.filters, chunkshape=(rows, block),
+                createparents=True)
+        return ColumnWriter(array, block)
+
+    def close(self):
+        self.h5_file.close()
+
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+==============================
+Compiled Random Walker Kernels
+==============================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-03-11
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    kernels.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+__all__ = ["NUMBA_AVAILABLE", "iter_march", "march", "iter_deletory_march",
+        "deletory_march", "iter_buffered_march", "buffered_march"]
+
+
+import numpy
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+from .distributions import RandomBlocks, walker_counts
+from .observers import record
+from .visits import ConstantValue, assessor_values
+
+
+NUMBA_AVAILABLE = numba is not None
+
+METHODS = {"cumulative": 0, "uniform": 1, "alias": 2}
+
+
+def _jit(func):
+    if numba is None:
+        return func
+    return numba.njit(cache=True)(func)
+
+# The kernels mirror the loops in foggy.walkers exactly, including the
+# consumption of random numbers, such that both yield the same results for
+# the same seed.
+
+@_jit
+def _choose(indptr, indices, cumprob, unweighted, alias_prob, alias_index,
+        method, node, draw):
+    start = indptr[node]
+    end = indptr[node + 1]
+    if start == end:
+        return -1
+    if method == 1 or (method == 0 and len(unweighted) > 0 and
+            unweighted[node]):
+        return indices[start + int(draw * (end - start))]
+    if method == 2:
+        draw *= end - start
+        column = int(draw)
+        pos = start + column
+        if draw - column < alias_prob[pos]:
+            return indices[pos]
+        return indices[start + alias_index[pos]]
+    # binary search for the index to the left of the draw
+    low = start
+    high = end
+    while low < high:
+        mid = (low + high) // 2
+        if cumprob[mid] < draw:
+            low = mid + 1
+        else:
+            high = mid
+    if low == end:
+        low = end - 1
+    return indices[low]
+
+@_jit
+def _march_walkers(indptr, indices, cumprob, unweighted, alias_prob,
+        alias_index, method, starts, draws, steps, transient, values, visits):
+    pos = 0
+    for i in range(len(starts)):
+        if pos + steps > len(draws):
+            return (i, pos)
+        node = starts[i]
+        if transient == 0:
+            visits[node] += values[node]
+        for s in range(steps):
+            node = _choose(indptr, indices, cumprob, unweighted, alias_prob,
+                    alias_index, method, node, draws[pos + s])
+            if node < 0:
+                break
+            if s > transient:
+                visits[node] += values[node]
+        pos += steps
+    return (len(starts), pos)
+
+@_jit
+def _deletory_walkers(indptr, indices, cumprob, unweighted, alias_prob,
+        alias_index, method, starts, draws, steps, transient, values, capacity,
+        visits, removed):
+    pos = 0
+    for i in range(len(starts)):
+        if pos + steps > len(draws):
+            return (i, pos)
+        node = starts[i]
+        if visits[node] >= capacity[node]:
+            removed[node] += 1
+            continue
+        if transient == 0:
+            visits[node] += values[node]
+        for s in range(steps):
+            node = _choose(indptr, indices, cumprob, unweighted, alias_prob,
+                    alias_index, method, node, draws[pos + s])
+            if node < 0:
+                break
+            if visits[node] >= capacity[node]:
+                removed[node] += 1
+                break
+            if s > transient:
+                visits[node] += values[node]
+        pos += steps
+    return (len(starts), pos)
+
+@_jit
+def _buffered_walkers(indptr, indices, cumprob, unweighted, alias_prob,
+        alias_index, method, starts, performed, fresh, draws, steps, transient,
+        values, capacity, visits, backlog, store_nodes, store_performed,
+        num_stored):
+    pos = 0
+    for i in range(len(starts)):
+        remaining = steps - performed[i]
+        if pos + remaining > len(draws):
+            return (i, pos, num_stored)
+        node = starts[i]
+        done = performed[i]
+        if visits[node] >= capacity[node]:
+            backlog[node] += 1
+            store_nodes[num_stored] = node
+            store_performed[num_stored] = done
+            num_stored += 1
+            continue
+        if (fresh and transient == 0) or (not fresh and done > transient):
+            visits[node] += values[node]
+        for s in range(remaining):
+            node = _choose(indptr, indices, cumprob, unweighted, alias_prob,
+                    alias_index, method, node, draws[pos + s])
+            if node < 0:
+                break
+            done += 1
+            if visits[node] >= capacity[node]:
+                backlog[node] += 1
+                store_nodes[num_stored] = node
+                store_performed[num_stored] = done
+                num_stored += 1
+                break
+            if (fresh and s > transient) or (not fresh and done > transient):
+                visits[node] += values[node]
+        pos += remaining
+    return (len(starts), pos, num_stored)
+
+def _walk_arrays(walk, method=None):
+    """
+    Flatten a PreparedWalk into the arguments expected by the kernels.
+    """
+    empty = numpy.zeros(0, dtype=numpy.float64)
+    unweighted = walk.unweighted
+    if unweighted is None:
+        unweighted = numpy.zeros(0, dtype=bool)
+    alias_prob = walk.alias_prob
+    alias_index = walk.alias_index
+    if alias_prob is None:
+        alias_prob = empty
+        alias_index = numpy.zeros(0, dtype=walk.indices.dtype)
+    return (walk.indptr, walk.indices, walk.cumprob, unweighted, alias_prob,
+            alias_index, METHODS[walk.sampling_method(method)])
+
+def _capacity_array(capacity, num_nodes):
+    return numpy.array([capacity[node] for node in xrange(num_nodes)],
+            dtype=float)
+
+def iter_march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, seed=None):
+    """
+    Compiled counterpart of ``foggy.walkers.iter_march`` with identical
+    arguments and results.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    blocks = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, blocks)
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    arrays = _walk_arrays(walk)
+    values = assessor_values(assessor, len(walk))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    for time in xrange(time_points):
+        curr_visits.fill(0.0)
+        curr_num = num_walkers()
+        starts = sources[blocks.integers(len(sources), curr_num)]
+        while len(starts) > 0:
+            (num, used) = _march_walkers(*(arrays + (starts,
+                    blocks.peek(steps), steps, transient, values,
+                    curr_visits)))
+            blocks.skip(used)
+            starts = starts[num:]
+        yield (time, curr_visits)
+
+def march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, seed=None, sink=None):
+    """
+    Compiled counterpart of ``foggy.walkers.march`` with identical arguments
+    and results.
+    """
+    return record(iter_march(walk, sources, num_walkers, time_points, steps,
+            assessor, transient, seed), ["visits"], (len(walk),
+            int(time_points)), [float], sink)[0]
+
+def iter_deletory_march(walk, sources, num_walkers, time_points, steps,
+        capacity, assessor=ConstantValue(), transient=0, seed=None):
+    """
+    Compiled counterpart of ``foggy.walkers.iter_deletory_march`` with
+    identical arguments and results.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    blocks = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, blocks)
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    arrays = _walk_arrays(walk)
+    values = assessor_values(assessor, len(walk))
+    capacity = _capacity_array(capacity, len(walk))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    curr_removed = numpy.zeros(len(walk), dtype=int)
+    for time in xrange(time_points):
+        curr_visits.fill(0.0)
+        curr_removed.fill(0)
+        curr_num = num_walkers()
+        starts = sources[blocks.integers(len(sources), curr_num)]
+        while len(starts) > 0:
+            (num, used) = _deletory_walkers(*(arrays + (starts,
+                    blocks.peek(steps), steps, transient, values, capacity,
+                    curr_visits, curr_removed)))
+            blocks.skip(used)
+            starts = starts[num:]
+        yield (time, curr_visits, curr_removed)
+
+def deletory_march(walk, sources, num_walkers, time_points, steps, capacity,
+        assessor=ConstantValue(), transient=0, seed=None, sink=None):
+    """
+    Compiled counterpart of ``foggy.walkers.deletory_march`` with identical
+    arguments and results.
+    """
+    return record(iter_deletory_march(walk, sources, num_walkers, time_points,
+            steps, capacity, assessor, transient, seed), ["visits", "removed"],
+            (len(walk), int(time_points)), [float, int], sink)
+
+def iter_buffered_march(walk, sources, num_walkers, time_points, steps,
+        capacity, assessor=ConstantValue(), transient=0, seed=None):
+    """
+    Compiled counterpart of ``foggy.walkers.iter_buffered_march`` with
+    identical arguments and results.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    blocks = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, blocks)
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    arrays = _walk_arrays(walk)
+    values = assessor_values(assessor, len(walk))
+    capacity = _capacity_array(capacity, len(walk))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    curr_backlog = numpy.zeros(len(walk), dtype=int)
+    # walkers in the store are kept in first in, first out order
+    store_nodes = numpy.zeros(0, dtype=numpy.int64)
+    store_performed = numpy.zeros(0, dtype=numpy.int64)
+    for time in xrange(time_points):
+        curr_visits.fill(0.0)
+        curr_backlog.fill(0)
+        curr_num = num_walkers()
+        size = len(store_nodes) + curr_num
+        next_nodes = numpy.zeros(size, dtype=numpy.int64)
+        next_performed = numpy.zeros(size, dtype=numpy.int64)
+        num_stored = 0
+        for (nodes, performed, fresh) in [
+                (store_nodes, store_performed, False),
+                (None, numpy.zeros(curr_num, dtype=numpy.int64), True)]:
+            if fresh:
+                nodes = sources[blocks.integers(len(sources), curr_num)]
+            while len(nodes) > 0:
+                (num, used, num_stored) = _buffered_walkers(*(arrays + (nodes,
+                        performed, fresh, blocks.peek(steps), steps,
+                        transient, values, capacity, curr_visits,
+                        curr_backlog, next_nodes, next_performed,
+                        num_stored)))
+                blocks.skip(used)
+                nodes = nodes[num:]
+                performed = performed[num:]
+        store_nodes = next_nodes[:num_stored]
+        store_performed = next_performed[:num_stored]
+        yield (time, curr_visits, curr_backlog)
+
+def buffered_march(walk, sources, num_walkers, time_points, steps, capacity,
+        assessor=ConstantValue(), transient=0, seed=None, sink=None):
+    """
+    Compiled counterpart of ``foggy.walkers.buffered_march`` with identical
+    arguments and results.
+    """
+    return record(iter_buffered_march(walk, sources, num_walkers, time_points,
+            steps, capacity, assessor, transient, seed), ["visits", "backlog"],
+            (len(walk), int(time_points)), [float, int], sink)
+
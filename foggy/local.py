@@ -0,0 +1,750 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+============================================
+Random Walks on Networks Using Local Workers
+============================================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-03-20
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    local.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+__all__ = ["iter_march", "march", "iter_deletory_march", "deletory_march",
+        "iter_buffered_march", "buffered_march", "sharded_march",
+        "sharded_deletory_march", "sharded_fluctuations"]
+
+
+import os
+import shutil
+import itertools
+import tempfile
+import multiprocessing
+
+from collections import deque
+
+import numpy
+
+from . import kernels
+from . import walkers
+from .distributions import RandomBlocks, walker_counts
+from .structures import PreparedWalk, WalkerStore
+from .sinks import MemmapSink, open_sink
+from .observers import record, Progress
+from .utils import FluctuationAccumulator
+from .visits import ConstantValue, assessor_values, assessor_lookup
+from .walkers import _lockstep_counts, _lockstep_paths
+
+
+MAX_SEED = numpy.iinfo(numpy.int32).max
+
+# set in each worker process by _attach
+_walk = None
+_alive = None
+
+
+def _attach(path):
+    """
+    Memory-map the walk stored in path such that all workers share its pages.
+    """
+    global _walk
+    global _alive
+    _walk = PreparedWalk.load(path)
+    _alive = _walk.degree > 0
+
+def _count_task(args):
+    (nodes, steps, transient, seed) = args
+    return _lockstep_counts(_walk, nodes, steps, transient, RandomBlocks(seed),
+            _alive)
+
+def _path_task(args):
+    (nodes, remaining, seed) = args
+    return _lockstep_paths(_walk, nodes, remaining, RandomBlocks(seed), _alive)
+
+def _shard_task(args):
+    """
+    Run the serial marcher for a block of consecutive time points and write
+    the results into the corresponding columns of the memory-mapped output or
+    return the accumulated fluctuations of the activity if there is none.
+    """
+    (deletory, first, counts, sources, steps, capacity, assessor, transient,
+            compiled, seed, outputs) = args
+    num_walkers = iter(counts).next
+    if deletory:
+        results = walkers.deletory_march(_walk, sources, num_walkers,
+                len(counts), steps, capacity, assessor=assessor,
+                transient=transient, seed=seed, compiled=compiled,
+                quiet=True)
+    elif compiled and kernels.NUMBA_AVAILABLE:
+        results = (walkers.march(_walk, sources, num_walkers, len(counts),
+                steps, assessor=assessor, transient=transient, seed=seed,
+                compiled=True, quiet=True),)
+    else:
+        results = (walkers.lockstep_march(_walk, sources, num_walkers,
+                len(counts), steps, assessor=assessor, transient=transient,
+                seed=seed, quiet=True),)
+    if outputs is None:
+        accumulator = FluctuationAccumulator()
+        accumulator.add(results[0])
+        return (first, len(counts), accumulator)
+    for (filename, result) in itertools.izip(outputs, results):
+        out = numpy.load(filename, mmap_mode="r+")
+        out[:, first:first + len(counts)] = result
+        out.flush()
+        del out
+    return (first, len(counts), None)
+
+def _open_pool(walk, processes):
+    """
+    Store the walk in a temporary directory, unless it is the path of a
+    stored walk already, and start workers that attach to it.
+
+    Returns
+    -------
+    multiprocessing.Pool: The worker pool.
+    str: The temporary directory or None.
+    """
+    if isinstance(walk, basestring):
+        path = walk
+        tmp_dir = None
+    else:
+        path = tempfile.mkdtemp(prefix="foggy_")
+        tmp_dir = path
+        walk.save(path)
+    pool = multiprocessing.Pool(processes, initializer=_attach,
+            initargs=(path,))
+    return (pool, tmp_dir)
+
+def _close_pool(pool, tmp_dir):
+    pool.close()
+    pool.join()
+    if tmp_dir is not None:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _num_nodes(walk):
+    if isinstance(walk, basestring):
+        return len(PreparedWalk.load(walk))
+    return len(walk)
+
+def _split(nodes, rng, chunks, *arrays):
+    """
+    Divide walkers and any corresponding arrays into chunks with their own
+    seeds.
+    """
+    chunks = min(chunks, max(len(nodes), 1))
+    seeds = rng.integers(MAX_SEED, chunks)
+    return zip(*([numpy.array_split(nodes, chunks)] + [numpy.array_split(array,
+            chunks) for array in arrays] + [seeds]))
+
+def _iter_paths(results):
+    """
+    Iterate over the individual paths of several workers as lists.
+    """
+    for (paths, offsets) in results:
+        paths = paths.tolist()
+        offsets = offsets.tolist()
+        for i in xrange(len(offsets) - 1):
+            yield paths[offsets[i]:offsets[i + 1]]
+
+def _resolve_buffered(results, performed, transient, fresh, curr_visits,
+        curr_backlog, capacity, value, store):
+    """
+    Let the walkers of several workers follow their paths until they reach a
+    node at capacity. Those walkers are added to the store one chunk at a
+    time.
+
+    Parameters
+    ----------
+    results: list
+        Concatenated paths and their offsets per chunk of walkers.
+    performed: numpy.array
+        The number of steps each walker has performed in the order of the
+        chunks.
+    transient: int
+        Cut-off the first transient steps of each random walk.
+    fresh: bool
+        Whether the walkers start at a source rather than in the store.
+    """
+    first = 0
+    for (paths, offsets) in results:
+        num = len(offsets) - 1
+        done = performed[first:first + num]
+        first += num
+        stops = numpy.zeros(num, dtype=numpy.int64)
+        stopped = numpy.zeros(num, dtype=bool)
+        for i in xrange(num):
+            for (k, node) in enumerate(paths[offsets[i]:offsets[i + 1]]):
+                if curr_visits[node] >= capacity[node]:
+                    curr_backlog[node] += 1
+                    stops[i] = k
+                    stopped[i] = True
+                    break
+                if fresh:
+                    if k > transient + 1 or (k == 0 and transient == 0):
+                        curr_visits[node] += value(node)
+                elif done[i] + k > transient:
+                    curr_visits[node] += value(node)
+        stops = stops[stopped]
+        store.extend(paths[offsets[:-1][stopped] + stops], done[stopped] +
+                stops)
+
+def iter_march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, processes=None, chunks=None,
+        lookahead=2, seed=None):
+    """
+    Generate the results of ``march`` one time point at a time.
+
+    The arguments are those of ``march``. Yields tuples of the time point
+    and the activity at each node. The arrays are reused for the next time
+    point and need to be copied if they are kept.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if chunks is None:
+        chunks = processes
+    rng = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, rng)
+    num_nodes = _num_nodes(walk)
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    values = assessor_values(assessor, num_nodes)
+    curr_visits = numpy.zeros(num_nodes, dtype=float)
+    (pool, tmp_dir) = _open_pool(walk, processes)
+    try:
+        in_flight = deque()
+        submitted = 0
+        for time in xrange(time_points):
+            while submitted < time_points and len(in_flight) < lookahead:
+                nodes = sources[rng.integers(len(sources), num_walkers())]
+                in_flight.append(pool.map_async(_count_task,
+                        [(part, steps, transient, part_seed) for (part,
+                        part_seed) in _split(nodes, rng, chunks)]))
+                submitted += 1
+            counts = sum(in_flight.popleft().get())
+            numpy.multiply(counts, values, out=curr_visits)
+            yield (time, curr_visits)
+    finally:
+        _close_pool(pool, tmp_dir)
+
+def march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, processes=None, chunks=None,
+        lookahead=2, seed=None, sink=None):
+    """
+    Start a number of random walks on the given network for a number of time
+    points. Records the activity at visited nodes.
+
+    The walkers of each time point are divided among local worker processes.
+    Visits are counted as in ``foggy.walkers.march`` and workers only return
+    the number of visits per node.
+
+    Parameters
+    ----------
+    walk: PreparedWalk or str
+        CSR walk structure as returned by prepare_uniform_walk or the directory
+        of a walk stored by ``PreparedWalk.save``.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: callable
+        A callable that returns an integer z >= 0.
+    time_points: int
+        Number of experiments to measure activity for.
+    steps: int
+        The maximum number of steps for each individual random walker.
+    assessor: callable (optional)
+        Called with the node index as argument, it should return the activity
+        value of a visit. The value may only depend on the node (see
+        ``assessor_values``).
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    processes: int (optional)
+        Number of worker processes, by default the number of CPUs.
+    chunks: int (optional)
+        Number of tasks per time point, by default the number of processes.
+    lookahead: int (optional)
+        Number of time points submitted to the workers at once.
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic for a given number of chunks.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+
+    Returns
+    -------
+    An array of dimensions number of nodes N x number of time points T that
+    records the activity at each node per time point.
+    """
+    return record(iter_march(walk, sources, num_walkers, time_points, steps,
+            assessor, transient, processes, chunks, lookahead, seed),
+            ["visits"], (_num_nodes(walk), int(time_points)), [float], sink)[0]
+
+def iter_deletory_march(walk, sources, num_walkers, time_points, steps,
+        capacity, assessor=ConstantValue(), transient=0, processes=None,
+        chunks=None, lookahead=2, seed=None):
+    """
+    Generate the results of ``deletory_march`` one time point at a time.
+
+    The arguments are those of ``deletory_march``. Yields tuples of the
+    time point and the activity and the number of removed walkers at each
+    node. The arrays are reused for the next time point and need to be
+    copied if they are kept.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if chunks is None:
+        chunks = processes
+    rng = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, rng)
+    num_nodes = _num_nodes(walk)
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    value = assessor_lookup(assessor, num_nodes)
+    curr_visits = numpy.zeros(num_nodes, dtype=float)
+    curr_removed = numpy.zeros(num_nodes, dtype=int)
+    (pool, tmp_dir) = _open_pool(walk, processes)
+    try:
+        in_flight = deque()
+        submitted = 0
+        for time in xrange(time_points):
+            while submitted < time_points and len(in_flight) < lookahead:
+                nodes = sources[rng.integers(len(sources), num_walkers())]
+                remaining = numpy.empty(len(nodes), dtype=numpy.int64)
+                remaining.fill(steps)
+                in_flight.append(pool.map_async(_path_task,
+                        _split(nodes, rng, chunks, remaining)))
+                submitted += 1
+            curr_visits.fill(0.0)
+            curr_removed.fill(0)
+            for path in _iter_paths(in_flight.popleft().get()):
+                for (k, node) in enumerate(path):
+                    if curr_visits[node] >= capacity[node]:
+                        curr_removed[node] += 1
+                        break
+                    # position k is reached by step k - 1
+                    if k > transient + 1 or (k == 0 and transient == 0):
+                        curr_visits[node] += value(node)
+            yield (time, curr_visits, curr_removed)
+    finally:
+        _close_pool(pool, tmp_dir)
+
+def deletory_march(walk, sources, num_walkers, time_points, steps, capacity,
+        assessor=ConstantValue(), transient=0, processes=None, chunks=None,
+        lookahead=2, seed=None, sink=None):
+    """
+    Start a number of random walks on the given network for a number of time
+    points. Records the activity at visited nodes. And removes any walkers if
+    the throughput capacity for the time point is exceeded.
+
+    Workers generate the paths which are then checked against the capacity in
+    the master process following the rules of ``foggy.walkers.deletory_march``.
+
+    Parameters
+    ----------
+    walk: PreparedWalk or str
+        CSR walk structure as returned by prepare_uniform_walk or the directory
+        of a walk stored by ``PreparedWalk.save``.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: callable
+        A callable that returns an integer z >= 0.
+    time_points: int
+        Number of experiments to measure activity for.
+    steps: int
+        The maximum number of steps for each individual random walker.
+    capacity: list or dict
+        Contains maximum capacity of nodes at their respective index.
+    assessor: callable (optional)
+        Called with the node index as argument, it should return the activity
+        value of a visit.
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    processes: int (optional)
+        Number of worker processes, by default the number of CPUs.
+    chunks: int (optional)
+        Number of tasks per time point, by default the number of processes.
+    lookahead: int (optional)
+        Number of time points submitted to the workers at once.
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic for a given number of chunks.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+
+    Returns
+    -------
+    An array of dimensions number of nodes N x number of time points T that
+    records the activity at each node per time point. An array of equal
+    dimension that measures the number of removed walkers.
+    """
+    return record(iter_deletory_march(walk, sources, num_walkers, time_points,
+            steps, capacity, assessor, transient, processes, chunks, lookahead,
+            seed), ["visits", "removed"], (_num_nodes(walk), int(time_points)),
+            [float, int], sink)
+
+def iter_buffered_march(walk, sources, num_walkers, time_points, steps,
+        capacity, assessor=ConstantValue(), transient=0, processes=None,
+        chunks=None, backlog_bytes=None, seed=None):
+    """
+    Generate the results of ``buffered_march`` one time point at a time.
+
+    The arguments are those of ``buffered_march``. Yields tuples of the
+    time point and the activity and the number of stored walkers at each
+    node. The arrays are reused for the next time point and need to be
+    copied if they are kept.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if chunks is None:
+        chunks = processes
+    rng = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, rng)
+    num_nodes = _num_nodes(walk)
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    value = assessor_lookup(assessor, num_nodes)
+    curr_visits = numpy.zeros(num_nodes, dtype=float)
+    curr_backlog = numpy.zeros(num_nodes, dtype=int)
+    store = WalkerStore(max_bytes=backlog_bytes)
+    (pool, tmp_dir) = _open_pool(walk, processes)
+    try:
+        for time in xrange(time_points):
+            curr_visits.fill(0.0)
+            curr_backlog.fill(0)
+            (store_nodes, store_performed, _, _) = store.drain()
+            old = pool.map_async(_path_task, _split(store_nodes, rng,
+                    chunks, steps - store_performed))
+            nodes = sources[rng.integers(len(sources), num_walkers())]
+            remaining = numpy.empty(len(nodes), dtype=numpy.int64)
+            remaining.fill(steps)
+            fresh = pool.map_async(_path_task, _split(nodes, rng, chunks,
+                    remaining))
+            _resolve_buffered(old.get(), store_performed, transient, False,
+                    curr_visits, curr_backlog, capacity, value, store)
+            _resolve_buffered(fresh.get(), numpy.zeros(len(nodes),
+                    dtype=numpy.int64), transient, True, curr_visits,
+                    curr_backlog, capacity, value, store)
+            yield (time, curr_visits, curr_backlog)
+    finally:
+        _close_pool(pool, tmp_dir)
+        store.close()
+
+def buffered_march(walk, sources, num_walkers, time_points, steps, capacity,
+        assessor=ConstantValue(), transient=0, processes=None, chunks=None,
+        backlog_bytes=None, seed=None, sink=None):
+    """
+    Start a number of random walks on the given network for a number of time
+    points. Records the activity at visited nodes. And stores any walkers if
+    the throughput capacity for the time point is exceeded. The buffered walker
+    is then reintroduced at the next time point at that node.
+
+    Workers generate the paths which are then checked against the capacity in
+    the master process following the rules of ``foggy.walkers.buffered_march``.
+    Stored walkers continue before new ones.
+
+    Parameters
+    ----------
+    walk: PreparedWalk or str
+        CSR walk structure as returned by prepare_uniform_walk or the directory
+        of a walk stored by ``PreparedWalk.save``.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: callable
+        A callable that returns an integer z >= 0.
+    time_points: int
+        Number of experiments to measure activity for.
+    steps: int
+        The maximum number of steps for each individual random walker.
+    capacity: list or dict
+        Contains maximum capacity of nodes at their respective index.
+    assessor: callable (optional)
+        Called with the node index as argument, it should return the activity
+        value of a visit.
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    processes: int (optional)
+        Number of worker processes, by default the number of CPUs.
+    chunks: int (optional)
+        Number of tasks per time point, by default the number of processes.
+    backlog_bytes: int (optional)
+        Memory budget of the stored walkers beyond which they are kept on disk
+        (see ``WalkerStore``).
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic for a given number of chunks.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+
+    Returns
+    -------
+    An array of dimensions number of nodes N x number of time points T that
+    records the activity at each node per time point. An array of equal
+    dimension that measures the backlog at each time point.
+    """
+    return record(iter_buffered_march(walk, sources, num_walkers, time_points,
+            steps, capacity, assessor, transient, processes, chunks,
+            backlog_bytes, seed), ["visits", "backlog"], (_num_nodes(walk),
+            int(time_points)), [float, int], sink)
+
+def _sharded(walk, sources, num_walkers, time_points, steps, capacity,
+        assessor, transient, processes, block_size, compiled, seed, sink,
+        progress, accumulate=False):
+    """
+    Distribute blocks of time points among workers that write their columns
+    directly into shared, memory-mapped output arrays or, if accumulate is
+    True, only return the merged fluctuations of their activity.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if block_size is None:
+        block_size = max(time_points // (4 * processes), 1)
+    deletory = capacity is not None
+    rng = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, rng)
+    num_nodes = _num_nodes(walk)
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    # the number of walkers is determined up front so that it does not depend
+    # on the order in which blocks are processed
+    counts = numpy.array([num_walkers() for time in xrange(time_points)],
+            dtype=numpy.int64)
+    firsts = range(0, time_points, block_size)
+    seeds = rng.integers(MAX_SEED, len(firsts))
+    names = ["visits", "removed"] if deletory else ["visits"]
+    dtypes = [float, int]
+    # workers write directly into the files of a memmap sink
+    if accumulate:
+        out_dir = None
+        outputs = None
+    elif isinstance(sink, MemmapSink):
+        out_dir = None
+        outputs = [sink.filename(name) for name in names]
+    else:
+        out_dir = tempfile.mkdtemp(prefix="foggy_")
+        outputs = [os.path.join(out_dir, name + ".npy") for name in names]
+    for (filename, dtype) in itertools.izip(outputs or [], dtypes):
+        numpy.lib.format.open_memmap(filename, mode="w+", dtype=dtype,
+                shape=(num_nodes, time_points), fortran_order=True)
+    tasks = [(deletory, first, counts[first:first + block_size], sources,
+            steps, capacity, assessor, transient, compiled, part_seed, outputs)
+            for (first, part_seed) in itertools.izip(firsts, seeds)]
+    (pool, tmp_dir) = _open_pool(walk, processes)
+    if progress is None:
+        progress = Progress(time_points)
+    try:
+        total = FluctuationAccumulator()
+        for (first, num, part) in pool.imap_unordered(_shard_task, tasks):
+            if part is not None:
+                total.merge(part)
+            for time in xrange(first, first + num):
+                progress(time)
+        results = [total] if accumulate else list()
+        for (name, dtype, filename) in itertools.izip(names, dtypes,
+                outputs or []):
+            out = numpy.load(filename, mmap_mode="r+")
+            if out_dir is None:
+                results.append(out)
+            elif sink is None:
+                results.append(numpy.array(out))
+            else:
+                result = open_sink(sink, name, out.shape, dtype)
+                for time in xrange(time_points):
+                    result.write(time, out[:, time])
+                results.append(result.close())
+            del out
+    finally:
+        _close_pool(pool, tmp_dir)
+        if out_dir is not None:
+            shutil.rmtree(out_dir, ignore_errors=True)
+        if hasattr(progress, "close"):
+            progress.close()
+    return tuple(results)
+
+def sharded_march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, processes=None, block_size=None,
+        compiled=False, seed=None, sink=None, progress=None):
+    """
+    Start a number of random walks on the given network for a number of time
+    points. Records the activity at visited nodes.
+
+    Time points are independent of each other. They are divided into blocks of
+    consecutive time points that workers simulate with ``lockstep_march`` (or
+    the compiled ``march``) and their own random number streams.
+
+    Parameters
+    ----------
+    walk: PreparedWalk or str
+        CSR walk structure as returned by prepare_uniform_walk or the directory
+        of a walk stored by ``PreparedWalk.save``.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: callable
+        A callable that returns an integer z >= 0.
+    time_points: int
+        Number of experiments to measure activity for.
+    steps: int
+        The maximum number of steps for each individual random walker.
+    assessor: callable (optional)
+        Called with the node index as argument, it should return the activity
+        value of a visit. It is sent to the workers and must be picklable.
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    processes: int (optional)
+        Number of worker processes, by default the number of CPUs.
+    block_size: int (optional)
+        Number of time points per task, by default a quarter of the time
+        points per process.
+    compiled: bool (optional)
+        Use the compiled kernels in ``foggy.kernels`` if numba is available.
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic for a given block size.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+    progress: callable (optional)
+        Called with each time point once its block is complete and closed at
+        the end. By default a ``foggy.Progress`` reports on standard output.
+
+    Returns
+    -------
+    An array of dimensions number of nodes N x number of time points T that
+    records the activity at each node per time point.
+    """
+    return _sharded(walk, sources, num_walkers, time_points, steps, None,
+            assessor, transient, processes, block_size, compiled, seed,
+            sink, progress)[0]
+
+def sharded_deletory_march(walk, sources, num_walkers, time_points, steps,
+        capacity, assessor=ConstantValue(), transient=0, processes=None,
+        block_size=None, compiled=False, seed=None, sink=None, progress=None):
+    """
+    Start a number of random walks on the given network for a number of time
+    points. Records the activity at visited nodes. And removes any walkers if
+    the throughput capacity for the time point is exceeded.
+
+    Time points are independent of each other. They are divided into blocks of
+    consecutive time points that workers simulate with ``deletory_march`` and
+    their own random number streams.
+
+    Parameters
+    ----------
+    walk: PreparedWalk or str
+        CSR walk structure as returned by prepare_uniform_walk or the directory
+        of a walk stored by ``PreparedWalk.save``.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: callable
+        A callable that returns an integer z >= 0.
+    time_points: int
+        Number of experiments to measure activity for.
+    steps: int
+        The maximum number of steps for each individual random walker.
+    capacity: list or dict
+        Contains maximum capacity of nodes at their respective index.
+    assessor: callable (optional)
+        Called with the node index as argument, it should return the activity
+        value of a visit. It is sent to the workers and must be picklable.
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    processes: int (optional)
+        Number of worker processes, by default the number of CPUs.
+    block_size: int (optional)
+        Number of time points per task, by default a quarter of the time
+        points per process.
+    compiled: bool (optional)
+        Use the compiled kernels in ``foggy.kernels`` if numba is available.
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic for a given block size.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+    progress: callable (optional)
+        Called with each time point once its block is complete and closed at
+        the end. By default a ``foggy.Progress`` reports on standard output.
+
+    Returns
+    -------
+    An array of dimensions number of nodes N x number of time points T that
+    records the activity at each node per time point. An array of equal
+    dimension that measures the number of removed walkers.
+    """
+    return _sharded(walk, sources, num_walkers, time_points, steps, capacity,
+            assessor, transient, processes, block_size, compiled, seed,
+            sink, progress)
+
+def sharded_fluctuations(walk, sources, num_walkers, time_points, steps,
+        capacity=None, assessor=ConstantValue(), transient=0, processes=None,
+        block_size=None, compiled=False, seed=None, progress=None):
+    """
+    Simulate like ``sharded_march`` or, given a capacity, like
+    ``sharded_deletory_march`` but only accumulate the fluctuations of the
+    activity. Each worker returns the moments of its block of time points
+    instead of the block itself such that the N x T activity is never stored.
+
+    Parameters
+    ----------
+    walk: PreparedWalk or str
+        CSR walk structure as returned by prepare_uniform_walk or the directory
+        of a walk stored by ``PreparedWalk.save``.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: callable
+        A callable that returns an integer z >= 0.
+    time_points: int
+        Number of experiments to measure activity for.
+    steps: int
+        The maximum number of steps for each individual random walker.
+    capacity: list or dict (optional)
+        Contains maximum capacity of nodes at their respective index.
+    assessor: callable (optional)
+        Called with the node index as argument, it should return the activity
+        value of a visit. It is sent to the workers and must be picklable.
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    processes: int (optional)
+        Number of worker processes, by default the number of CPUs.
+    block_size: int (optional)
+        Number of time points per task, by default a quarter of the time
+        points per process.
+    compiled: bool (optional)
+        Use the compiled kernels in ``foggy.kernels`` if numba is available.
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic for a given block size.
+    progress: callable (optional)
+        Called with each time point once its block is complete and closed at
+        the end. By default a ``foggy.Progress`` reports on standard output.
+
+    Returns
+    -------
+    FluctuationAccumulator: The merged moments of the activity at each node.
+    """
+    return _sharded(walk, sources, num_walkers, time_points, steps, capacity,
+            assessor, transient, processes, block_size, compiled, seed, None,
+            progress, accumulate=True)[0]
+
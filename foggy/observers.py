@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+===============================
+Observers of Streaming Marchers
+===============================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-03-26
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    observers.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+__all__ = ["observe", "record", "Recorder", "Progress", "RunningMoments",
+        "Convergence"]
+
+
+import sys
+
+import numpy
+
+from .sinks import open_sink
+
+
+def observe(columns, *observers):
+    """
+    Pass each time point of a streaming marcher to a number of observers.
+
+    An observer is called with the time point followed by the arrays of that
+    time point, e.g., ``observer(time, visits, removed)``. If any observer
+    returns True the march is stopped after all observers have seen the time
+    point. Observers that have a ``close`` method are closed at the end.
+
+    Parameters
+    ----------
+    columns: iterator
+        A streaming marcher like ``foggy.walkers.iter_march`` that yields
+        tuples of the time point and the arrays of that time point.
+    observers:
+        Any number of observers.
+
+    Returns
+    -------
+    int: The number of observed time points.
+    """
+    num = 0
+    try:
+        for item in columns:
+            num += 1
+            stop = False
+            for observer in observers:
+                if observer(*item):
+                    stop = True
+            if stop:
+                break
+    finally:
+        if hasattr(columns, "close"):
+            columns.close()
+        for observer in observers:
+            if hasattr(observer, "close"):
+                observer.close()
+    return num
+
+def record(columns, names, shape, dtypes, sink=None, quiet=False):
+    """
+    Store all time points of a streaming marcher while reporting progress.
+
+    Parameters
+    ----------
+    columns: iterator
+        A streaming marcher.
+    names: list
+        Names of the arrays yielded per time point, e.g., "visits".
+    shape: tuple
+        Number of nodes N and number of time points T.
+    dtypes: list
+        Types of the arrays.
+    sink: (optional)
+        Creates the result arrays (see ``open_sink``).
+    quiet: bool (optional)
+        Do not report the progress.
+
+    Returns
+    -------
+    tuple: The arrays of dimensions N x T created by the sink.
+    """
+    recorder = Recorder(names, shape, dtypes, sink)
+    if quiet:
+        observe(columns, recorder)
+    else:
+        observe(columns, Progress(shape[1]), recorder)
+    return recorder.results
+
+
+class Recorder(object):
+    """
+    Writes the arrays of each time point into the columns of results that are
+    created by a sink, e.g., a ``foggy.hdf5.HDF5Sink``.
+    """
+
+    def __init__(self, names, shape, dtypes, sink=None, **kw_args):
+        """
+        Parameters
+        ----------
+        names: list
+            Names of the arrays yielded per time point, e.g., "visits".
+        shape: tuple
+            Number of nodes N and number of time points T.
+        dtypes: list
+            Types of the arrays.
+        sink: (optional)
+            Creates the result arrays (see ``open_sink``).
+        """
+        super(Recorder, self).__init__(**kw_args)
+        self.writers = [open_sink(sink, name, shape, dtype) for (name, dtype)
+                in zip(names, dtypes)]
+        self.results = None
+
+    def __call__(self, time, *columns):
+        for (writer, column) in zip(self.writers, columns):
+            writer.write(time, column)
+
+    def close(self):
+        if self.results is None:
+            self.results = tuple(writer.close() for writer in self.writers)
+        return self.results
+
+
+class Progress(object):
+    """
+    Reports the fraction of completed time points.
+    """
+
+    def __init__(self, time_points, stream=None, **kw_args):
+        """
+        Parameters
+        ----------
+        time_points: int
+            Total number of time points.
+        stream: file (optional)
+            Destination of the report, by default the current standard output.
+        """
+        super(Progress, self).__init__(**kw_args)
+        self.time_norm = float(time_points)
+        if stream is None:
+            stream = sys.stdout
+        self.stream = stream
+        self.done = 0
+        self._report(0.0)
+
+    def _report(self, fraction):
+        self.stream.write("\r{0:7.2%} complete".format(fraction))
+        self.stream.flush()
+
+    def __call__(self, time, *columns):
+        self.done += 1
+        self._report(self.done / self.time_norm)
+
+    def close(self):
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+class RunningMoments(object):
+    """
+    Running mean and standard deviation of one of the arrays per time point
+    without storing earlier time points [1]_.
+
+    References
+    ----------
+    .. [1] http://en.wikipedia.org/wiki/Standard_deviation#Rapid_calculation_methods
+    """
+
+    def __init__(self, index=0, **kw_args):
+        """
+        Parameters
+        ----------
+        index: int (optional)
+            Position of the observed array among those of a time point, by
+            default the activity.
+        """
+        super(RunningMoments, self).__init__(**kw_args)
+        self.index = index
+        self.count = 0
+        self.mean = None
+        self._sum_sq = None
+
+    def __call__(self, time, *columns):
+        column = numpy.asarray(columns[self.index], dtype=float)
+        if self.mean is None:
+            self.mean = numpy.zeros(len(column), dtype=float)
+            self._sum_sq = numpy.zeros(len(column), dtype=float)
+        self.count += 1
+        delta = column - self.mean
+        self.mean += delta / self.count
+        self._sum_sq += delta * (column - self.mean)
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return numpy.zeros_like(self.mean)
+        return self._sum_sq / (self.count - 1)
+
+    @property
+    def std(self):
+        return numpy.sqrt(self.variance)
+
+
+class Convergence(object):
+    """
+    Stops a march once the running mean activity of all nodes changes by less
+    than a relative tolerance over an interval of time points.
+    """
+
+    def __init__(self, rtol=1E-03, interval=10, min_time_points=None,
+            index=0, **kw_args):
+        """
+        Parameters
+        ----------
+        rtol: float (optional)
+            Largest change of the running mean relative to its largest value.
+        interval: int (optional)
+            Number of time points between checks.
+        min_time_points: int (optional)
+            Time points that are always observed, by default two intervals.
+        index: int (optional)
+            Position of the observed array among those of a time point.
+        """
+        super(Convergence, self).__init__(**kw_args)
+        self.rtol = float(rtol)
+        self.interval = max(int(interval), 1)
+        if min_time_points is None:
+            min_time_points = 2 * self.interval
+        self.min_time_points = int(min_time_points)
+        self.moments = RunningMoments(index)
+        self.converged = False
+        self._previous = None
+
+    def __call__(self, time, *columns):
+        self.moments(time, *columns)
+        if self.moments.count % self.interval != 0:
+            return False
+        mean = self.moments.mean
+        if self._previous is not None and\
+                self.moments.count >= self.min_time_points:
+            change = numpy.abs(mean - self._previous).max()
+            self.converged = change <= self.rtol * numpy.abs(mean).max()
+        self._previous = mean.copy()
+        return self.converged
+
@@ -19,18 +19,31 @@ Parallel Random Walks on Networks
 """
 
 
-__all__ = ["uniform_random_walker", "directed_random_walker", "march",
-        "iterative_march", "deletory_march", "buffered_march"]
+__all__ = ["uniform_random_walker", "directed_random_walker",
+        "visit_counter", "path_generator", "activate_walk", "cache_walk",
+        "iter_march", "march", "iterative_march", "iter_deletory_march",
+        "deletory_march", "iter_buffered_march", "buffered_march"]
 #        "limited_uniform_random_walker",
 
 
-import sys
+import itertools
+
+from collections import deque
 
 import numpy
 
 from IPython.parallel import interactive, require, LoadBalancedView
 
-from .visits import ConstantValue
+from .distributions import RandomBlocks, walker_counts
+from .structures import WalkerStore
+from .observers import observe, record, Progress
+from .utils import FluctuationAccumulator
+from .visits import (ConstantValue, assessor_values, assessor_lookup,
+        constant_value)
+
+
+# the number of prepared walks that each engine keeps for later use
+MAX_CACHED_WALKS = 4
 
 
 @require(numpy)
@@ -49,21 +62,13 @@ def uniform_random_walker(node):
     -------
     list: All nodes visited on the random walk.
     """
-    # accessing globals `probabilities`, `neighbours`, and `steps that were pushed before
-    local_probs = probabilities
-    local_nbrs = neighbours
-    smpl = numpy.random.random_sample
-    choose = numpy.searchsorted
+    # accessing globals `walk`, `steps`, and `blocks` that were set up before
+    choose = walk.sampler()
     path = [node]
-    for s in xrange(steps):
-        nbrs = local_nbrs[node]
-        if len(nbrs) == 0:
+    for draw in blocks.uniform(steps):
+        node = choose(node, draw)
+        if node < 0:
             break
-        draw = smpl()
-        # the nbrs list and probs list correspond to each other
-        # we use a binary search to find the index to the left of the
-        # probability and take that node
-        node = nbrs[choose(local_probs[node], draw)]
         path.append(node)
     return path
 
@@ -101,8 +106,11 @@ def uniform_random_walker(node):
 @interactive
 def directed_random_walker(node):
     """
-    Perform a single directed random walk on a network with a uniform probability of a
-    next step.
+    Perform a single directed random walk on a network.
+
+    Effective walks (see ``PreparedWalk.effective_walk``) need a single draw
+    per step, otherwise a uniformly proposed neighbour is accepted with its
+    acceptance probability. A walker that stays at its node visits it again.
 
     Parameters
     ----------
@@ -113,24 +121,191 @@ def directed_random_walker(node):
     -------
     list: All nodes visited on the random walk.
     """
-    # accessing globals `probabilities`, `neighbours`, and `steps that were pushed before
-    local_probs = probabilities
-    local_nbrs = neighbours
-    sample = numpy.random.random_sample
-    choose = numpy.random.randint
+    # accessing globals `walk`, `steps`, and `blocks` that were set up before
     path = [node]
+    if walk.acceptance is None:
+        choose = walk.sampler()
+        for draw in blocks.uniform(steps):
+            node = choose(node, draw)
+            if node < 0:
+                break
+            path.append(node)
+        return path
+    indptr = walk.indptr
+    indices = walk.indices
+    acceptance = walk.acceptance
+    draws = blocks.uniform(2 * steps)
     for s in xrange(steps):
-        nbrs = local_nbrs[node]
-        if len(nbrs) == 0:
+        start = indptr[node]
+        end = indptr[node + 1]
+        if start == end:
             break
-        nbr_index = choose(len(nbrs))
-        prob = local_probs[node][nbr_index]
-        if prob == 1.0:
-            path.append(nbrs[nbr_index])
-        elif sample() < prob:
-            path.append(nbrs[nbr_index])
+        nbr_index = start + int(draws[2 * s] * (end - start))
+        if draws[2 * s + 1] < acceptance[nbr_index]:
+            node = indices[nbr_index]
+        path.append(node)
     return path
 
+@require(numpy, "foggy")
+@interactive
+def visit_counter(nodes):
+    """
+    Perform random walks from a chunk of source nodes and sum up the value of
+    all visits after the transient at each node.
+
+    Parameters
+    ----------
+    nodes: numpy.array
+        Source node indices of the walkers.
+
+    Returns
+    -------
+    numpy.array: The activity at each node.
+    """
+    # accessing globals `walk`, `steps`, `transient`, `values`, and `blocks`
+    # that were set up before
+    counts = foggy.walkers._lockstep_counts(walk, numpy.asarray(nodes,
+            dtype=walk.indices.dtype), steps, transient, blocks,
+            walk.degree > 0, inclusive=True)
+    return counts * values
+
+@require(numpy, "foggy")
+@interactive
+def path_generator(nodes):
+    """
+    Perform random walks from a chunk of source nodes.
+
+    Parameters
+    ----------
+    nodes: numpy.array
+        Source node indices of the walkers.
+
+    Returns
+    -------
+    numpy.array: The concatenated paths of all walkers, each starting with its
+        source.
+    numpy.array: Offsets of the paths of length number of walkers + 1.
+    """
+    # accessing globals `walk`, `steps`, and `blocks` that were set up before
+    remaining = numpy.empty(len(nodes), dtype=numpy.int64)
+    remaining.fill(steps)
+    return foggy.walkers._lockstep_paths(walk, numpy.asarray(nodes,
+            dtype=walk.indices.dtype), remaining, blocks, walk.degree > 0)
+
+@interactive
+def activate_walk(key):
+    """
+    Make a walk cached on an engine the current one.
+
+    Parameters
+    ----------
+    key: str
+        The digest of the walk.
+
+    Returns
+    -------
+    bool: Whether the walk was found in the cache.
+    """
+    global walk
+    global walk_cache
+    try:
+        cache = walk_cache
+    except NameError:
+        return False
+    if key not in cache:
+        return False
+    # re-insert to mark the walk as most recently used
+    walk = cache.pop(key)
+    cache[key] = walk
+    return True
+
+@interactive
+def cache_walk(key, max_walks):
+    """
+    Add the current walk to an engine's cache and evict the least recently
+    used walks beyond max_walks.
+    """
+    global walk_cache
+    import collections
+    try:
+        walk_cache
+    except NameError:
+        walk_cache = collections.OrderedDict()
+    walk_cache[key] = walk
+    while len(walk_cache) > max_walks:
+        walk_cache.popitem(last=False)
+
+def _push_walk(d_view, walk):
+    """
+    Make the walk available as the global `walk` on all engines but only
+    transfer it to engines that do not have it cached.
+    """
+    key = walk.digest()
+    result = d_view.apply_async(activate_walk, key)
+    found = result.get()
+    missing = [meta["engine_id"] for (meta, hit) in
+            itertools.izip(result.metadata, found) if not hit]
+    if not missing:
+        return
+    view = d_view.client[missing]
+    view.push(dict(walk=walk), block=True)
+    view.apply_sync(cache_walk, key, MAX_CACHED_WALKS)
+
+def _map_chunks(func, starts, d_view, lb_view=None):
+    """
+    Distribute chunks of source nodes among the engines.
+    """
+    if isinstance(lb_view, LoadBalancedView):
+        return lb_view.map(func, numpy.array_split(starts, 2 * len(lb_view)),
+                block=False, ordered=False, chunksize=1)
+    return d_view.map(func, numpy.array_split(starts, len(d_view)),
+            block=False)
+
+def _seed_engines(d_view, rng):
+    """
+    Assign different but deterministic seeds to all remote engines and set up
+    their random number supply.
+    """
+    remote_seeds = set()
+    while len(remote_seeds) < len(d_view):
+        remote_seeds.add(int(rng.integers(numpy.iinfo(numpy.int32).max)))
+    d_view.scatter("seed", list(remote_seeds), block=True)
+    d_view.execute("import numpy; import foggy", block=True)
+    d_view.execute("blocks = foggy.RandomBlocks(seed[0])", block=True)
+
+def _accumulate(paths, transient, visits, assessor, values=None):
+    """
+    Add the value of all visits after the transient to the visits array.
+
+    Parameters
+    ----------
+    paths: iterable
+        The nodes visited by each walker.
+    transient: int
+        Cut-off the first transient steps of each random walk.
+    visits: numpy.array
+        Activity per node that is updated in place.
+    assessor: callable
+        Called with the node index as argument, it should return the activity
+        value of a visit.
+    values: numpy.array (optional)
+        The value of a visit at each node. If given, visits are counted and
+        weighed once instead of calling the assessor for each visit.
+    """
+    if values is None:
+        for path in paths:
+            for node in path[transient:]:
+                visits[node] += assessor(node)
+        return
+    nodes = numpy.fromiter(itertools.chain.from_iterable(path[transient:]
+            for path in paths), dtype=numpy.int64)
+    counts = numpy.bincount(nodes, minlength=len(visits))
+    constant = constant_value(assessor)
+    if constant is None:
+        visits += counts * values
+    else:
+        visits += counts * constant
+
 def clear_client(rc):
     """
     Particularly with older versions of IPython memory becomes a huge issue.
@@ -152,8 +327,127 @@ def clear_view(view):
     view.results.clear()
     view.history = list()
 
-def march(d_view, neighbours, probabilities, sources, num_walkers, time_points,
-        steps, assessor=ConstantValue(), transient=0, lb_view=None, seed=None):
+def _forget(result, *views):
+    """
+    Drop the cached results and history of a finished request while later
+    requests may still be outstanding (cf. ``clear_client``).
+    """
+    client = views[0].client
+    msg_ids = set(result.msg_ids)
+    for msg_id in msg_ids:
+        client.results.pop(msg_id, None)
+        client.metadata.pop(msg_id, None)
+        for view in views:
+            view.results.pop(msg_id, None)
+    client.history = [msg_id for msg_id in client.history if msg_id not in
+            msg_ids]
+    for view in views:
+        view.history = [msg_id for msg_id in view.history if msg_id not in
+                msg_ids]
+    # only digests of received messages are kept
+    client.session.digest_history.clear()
+
+def _resolve_buffered(paths, offsets, performed, skip, curr_visits,
+        curr_backlog, capacity, value, store):
+    """
+    Let walkers follow their paths until they reach a node at capacity. The
+    remainders of such paths, starting at that node, are added to the store
+    at once.
+
+    Parameters
+    ----------
+    paths: numpy.array
+        Concatenated paths of all walkers.
+    offsets: numpy.array
+        Offsets of the paths of length number of walkers + 1.
+    performed: numpy.array or int
+        The number of steps each walker has performed at the start of its path.
+    skip: int
+        Number of nodes ignored at the start of each path, i.e., the
+        transient.
+    """
+    begins = offsets[:-1] + skip
+    ends = offsets[1:]
+    stops = ends.copy()
+    for i in xrange(len(ends)):
+        begin = begins[i]
+        for (k, node) in enumerate(paths[begin:ends[i]]):
+            if curr_visits[node] >= capacity[node]:
+                curr_backlog[node] += 1
+                stops[i] = begin + k
+                break
+            curr_visits[node] += value(node)
+    stopped = stops < ends
+    starts = stops[stopped]
+    store.extend(paths[starts], (performed + stops - begins)[stopped],
+            paths=paths, starts=starts, ends=ends[stopped])
+
+def iter_march(d_view, walk, sources, num_walkers, time_points,
+        steps, assessor=ConstantValue(), transient=0, lb_view=None,
+        remote_reduce=None, seed=None):
+    """
+    Generate the results of ``march`` one time point at a time.
+
+    The arguments are those of ``march``. Yields tuples of the time point
+    and the activity at each node. The arrays are reused for the next time
+    point and need to be copied if they are kept.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    length = len(sources)
+    sources = numpy.asarray(sources)
+    rng = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, rng)
+    # visits are only counted on the master if values are available as array
+    values = None
+    if hasattr(assessor, "as_array"):
+        values = assessor_values(assessor, len(walk))
+    if remote_reduce is None:
+        remote_reduce = values is not None
+    if remote_reduce and values is None:
+        values = assessor_values(assessor, len(walk))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    # make available on remote kernels
+    _push_walk(d_view, walk)
+    d_view.push(dict(steps=steps, transient=transient, values=values),
+            block=True)
+    _seed_engines(d_view, rng)
+    view = isinstance(lb_view, LoadBalancedView)
+    if view:
+        num_krnl = len(lb_view)
+    for time in xrange(time_points):
+        curr_visits.fill(0.0)
+        curr_num = num_walkers()
+        if curr_num == 0:
+            yield (time, curr_visits)
+            continue
+        if remote_reduce:
+            results = _map_chunks(visit_counter, sources[rng.integers(length,
+                    curr_num)], d_view, lb_view)
+            for counts in results:
+                curr_visits += counts
+        elif view:
+            size = max((curr_num - 1) // (num_krnl * 2), 1)
+            results = lb_view.map(uniform_random_walker,
+                    sources[rng.integers(length, curr_num)],
+                    block=False, ordered=False, chunksize=size)
+            _accumulate(results, transient, curr_visits, assessor, values)
+        else:
+            results = d_view.map(uniform_random_walker,
+                    sources[rng.integers(length, curr_num)],
+                    block=False)
+            _accumulate(results, transient, curr_visits, assessor, values)
+        # clear cache
+        clear_client(d_view.client)
+        if view:
+            clear_view(lb_view)
+        clear_view(d_view)
+        yield (time, curr_visits)
+
+def march(d_view, walk, sources, num_walkers, time_points,
+        steps, assessor=ConstantValue(), transient=0, lb_view=None,
+        remote_reduce=None, seed=None, sink=None):
     """
     Start a number of random walks on the given network for a number of time
     points. Records the activity at visited nodes.
@@ -162,11 +456,8 @@ def march(d_view, neighbours, probabilities, sources, num_walkers, time_points,
     ----------
     d_view: DirectView
         An IPython.parallel.DirectView instance.
-    neighbours: list of lists
-        Adjacency list structure as returned by prepare_uniform_walk.
-    probabilities: list of lists
-        Transition probabilities list structure as returned by
-        prepare_uniform_walk.
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
     sources: list
         List of valid starting node indices.
     num_walkers: callable
@@ -183,9 +474,18 @@ def march(d_view, neighbours, probabilities, sources, num_walkers, time_points,
     lb_view: LoadBalancedView (optional)
         An IPython.parallel.LoadBalancedView instance which may have performance
         advantages over a DirectView.
+    remote_reduce: bool (optional)
+        Whether engines sum up the activity of their walkers and only return
+        the totals per node rather than all paths. This requires that the value
+        of a visit only depends on the node (see ``assessor_values``). By
+        default it is used for assessors that provide an ``as_array`` method.
     seed: (optional)
-        A valid seed for numpy.random that makes runs deterministic in
-        combination with using only a DirectView.
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic in combination with using only a DirectView.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
 
     Returns
     -------
@@ -198,76 +498,26 @@ def march(d_view, neighbours, probabilities, sources, num_walkers, time_points,
     ``DirectView``. Use of a ``LoadBalancedView`` will assign jobs to remote
     kernels in unpredictable order.
     """
-    time_points = int(time_points)
-    steps = int(steps)
-    transient = int(transient)
-    length = len(sources)
-    rand_int = numpy.random.randint
-    visits = numpy.zeros(shape=(len(neighbours), time_points), dtype=float)
-    sys.stdout.flush()
-    # make available on remote kernels
-    d_view.push(dict(neighbours=neighbours, probabilities=probabilities,
-        steps=steps), block=True)
-    # assign different but deterministic seeds to all remote engines
-    numpy.random.seed(seed)
-    remote_seeds = set()
-    while len(remote_seeds) < len(d_view):
-        remote_seeds.add(rand_int(sys.maxint))
-    d_view.scatter("seed", remote_seeds, block=True)
-    d_view.execute("import numpy", block=True)
-    d_view.execute("numpy.random.seed(seed[0])", block=True)
-    view = isinstance(lb_view, LoadBalancedView)
-    if view:
-        num_krnl = len(lb_view)
-    sys.stdout.write("\r{0:7.2%} complete".format(0.0))
-    sys.stdout.flush()
-    time_norm = float(time_points)
-    for time in xrange(time_points):
-        curr_visits = visits[:, time]
-        curr_num = num_walkers()
-        if curr_num == 0:
-            sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-            sys.stdout.flush()
-            continue
-        if view:
-            size = max((curr_num - 1) // (num_krnl * 2), 1)
-            results = lb_view.map(uniform_random_walker,
-                    [sources[rand_int(length)] for i in xrange(curr_num)],
-                    block=False, ordered=False, chunksize=size)
-        else:
-            results = d_view.map(uniform_random_walker,
-                    [sources[rand_int(length)] for i in xrange(curr_num)],
-                    block=False)
-        for path in results:
-            for node in path[transient:]:
-                curr_visits[node] += assessor(node)
-        # clear cache
-        clear_client(d_view.client)
-        if view:
-            clear_view(lb_view)
-        clear_view(d_view)
-        sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-        sys.stdout.flush()
-    sys.stdout.write("\r{0:7.2%} complete".format(1.0))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
-    return visits
+    return record(iter_march(d_view, walk, sources, num_walkers, time_points,
+            steps, assessor, transient, lb_view, remote_reduce, seed),
+            ["visits"], (len(walk), int(time_points)), [float], sink)[0]
 
-def iterative_march(d_view, neighbours, probabilities, sources, num_walkers, time_points,
-        steps, assessor=ConstantValue(), transient=0, lb_view=None, seed=None):
+def iterative_march(d_view, walk, sources, num_walkers, time_points,
+        steps, assessor=ConstantValue(), transient=0, lb_view=None,
+        remote_reduce=None, seed=None, accumulator=None, progress=None):
     """
     Start a number of random walks on the given network for a number of time points
     and compute running mean and standard deviation of the visits at each node.
 
+    Each time point is added to a ``foggy.utils.FluctuationAccumulator`` such
+    that the activity is never stored.
+
     Parameters
     ----------
     d_view: DirectView
         An IPython.parallel.DirectView instance.
-    neighbours: list of lists
-        Adjacency list structure as returned by prepare_uniform_walk.
-    probabilities: list of lists
-        Transition probabilities list structure as returned by
-        prepare_uniform_walk.
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
     sources: list
         List of valid starting node indices.
     num_walkers: callable
@@ -284,15 +534,25 @@ def iterative_march(d_view, neighbours, probabilities, sources, num_walkers, tim
     lb_view: LoadBalancedView (optional)
         An IPython.parallel.LoadBalancedView instance which may have performance
         advantages over a DirectView.
+    remote_reduce: bool (optional)
+        Whether engines sum up the activity of their walkers and only return
+        the totals per node rather than all paths. This requires that the value
+        of a visit only depends on the node (see ``assessor_values``). By
+        default it is used for assessors that provide an ``as_array`` method.
     seed: (optional)
-        A valid seed for numpy.random that makes runs deterministic in
-        combination with using only a DirectView.
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic in combination with using only a DirectView.
+    accumulator: FluctuationAccumulator (optional)
+        Receives the activity of each time point, e.g., to obtain its internal
+        and external fluctuations or to merge several runs.
+    progress: callable (optional)
+        Observes each time point and is closed at the end. By default a
+        ``foggy.Progress`` reports on standard output.
 
     Returns
     -------
-    list: Running average of the activity at each node.
-    list: Running standard deviation of the activity at each node.
-
+    numpy.array: Average of the activity at each node.
+    numpy.array: Standard deviation of the activity at each node.
 
     Warning
     -------
@@ -300,77 +560,69 @@ def iterative_march(d_view, neighbours, probabilities, sources, num_walkers, tim
     ``DirectView``. Use of a ``LoadBalancedView`` will assign jobs to remote
     kernels in unpredictable order.
     """
+    if accumulator is None:
+        accumulator = FluctuationAccumulator()
+    if progress is None:
+        progress = Progress(time_points)
+    observe(iter_march(d_view, walk, sources, num_walkers, time_points, steps,
+            assessor, transient, lb_view, remote_reduce, seed), progress,
+            accumulator)
+    return (accumulator.mean, accumulator.std)
+
+def iter_deletory_march(d_view, walk, sources,
+        num_walkers, time_points, steps, capacity, assessor=ConstantValue(),
+        transient=0, lb_view=None, seed=None):
+    """
+    Generate the results of ``deletory_march`` one time point at a time.
+
+    The arguments are those of ``deletory_march``. Yields tuples of the
+    time point and the activity and the number of removed walkers at each
+    node. The arrays are reused for the next time point and need to be
+    copied if they are kept.
+    """
     time_points = int(time_points)
     steps = int(steps)
     transient = int(transient)
     length = len(sources)
-    rand_int = numpy.random.randint
-    # compute a running mean and sd as per:
-    # http://en.wikipedia.org/wiki/Standard_deviation#Rapid_calculation_methods
-    visits = numpy.zeros(len(neighbours))
-    mean_fluxes = numpy.zeros(len(neighbours))
-    subtraction = numpy.zeros(len(neighbours))
-    std_fluxes = numpy.zeros(len(neighbours))
+    sources = numpy.asarray(sources)
+    rng = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, rng)
+    value = assessor_lookup(assessor, len(walk))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    curr_removed = numpy.zeros(len(walk), dtype=int)
     # make available on remote kernels
-    d_view.push(dict(neighbours=neighbours, probabilities=probabilities,
-        steps=steps), block=True)
-    # assign different but deterministic seeds to all remote engines
-    numpy.random.seed(seed)
-    remote_seeds = set()
-    while len(remote_seeds) < len(d_view):
-        remote_seeds.add(rand_int(sys.maxint))
-    d_view.scatter("seed", remote_seeds, block=True)
-    d_view.execute("import numpy", block=True)
-    d_view.execute("numpy.random.seed(seed[0])", block=True)
+    _push_walk(d_view, walk)
+    d_view.push(dict(steps=steps), block=True)
+    _seed_engines(d_view, rng)
     view = isinstance(lb_view, LoadBalancedView)
-    if view:
-        num_krnl = len(lb_view)
-    sys.stdout.write("\r{0:7.2%} complete".format(0.0))
-    sys.stdout.flush()
-    time_norm = float(time_points)
-    for time in xrange(1, time_points + 1):
-        visits.fill(0)
+    for time in xrange(time_points):
+        curr_visits.fill(0.0)
+        curr_removed.fill(0)
         curr_num = num_walkers()
         if curr_num == 0:
-            subtraction = -mean_fluxes
-            mean_fluxes += subtraction / time
-            std_fluxes += subtraction * (-mean_fluxes)
-            sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-            sys.stdout.flush()
+            yield (time, curr_visits, curr_removed)
             continue
-        if view:
-            size = max((curr_num - 1) // (num_krnl * 2), 1)
-            results = lb_view.map(uniform_random_walker,
-                    [sources[rand_int(length)] for i in xrange(curr_num)],
-                    block=False, ordered=False, chunksize=size)
-        else:
-            results = d_view.map(uniform_random_walker,
-                    [sources[rand_int(length)] for i in xrange(curr_num)],
-                    block=False)
-        for path in results:
-            for node in path[transient:]:
-                visits[node] += assessor(node)
+        results = _map_chunks(path_generator, sources[rng.integers(length,
+                curr_num)], d_view, lb_view)
+        # if transient > 0, the nodes visited in the transient are ignored
+        for (paths, offsets) in results:
+            for (begin, end) in itertools.izip(offsets[:-1] + transient,
+                    offsets[1:]):
+                for node in paths[begin:end]:
+                    if curr_visits[node] >= capacity[node]:
+                        curr_removed[node] += 1
+                        break
+                    curr_visits[node] += value(node)
         # clear cache
         clear_client(d_view.client)
         if view:
             clear_view(lb_view)
         clear_view(d_view)
-        # compute running average and variation
-        subtraction = visits - mean_fluxes
-        mean_fluxes += subtraction / time
-        std_fluxes += subtraction * (visits - mean_fluxes)
-        sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-        sys.stdout.flush()
-    std_fluxes /= float(time - 1)
-    numpy.sqrt(std_fluxes, std_fluxes)
-    sys.stdout.write("\r{0:7.2%} complete".format(1.0))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
-    return (mean_fluxes, std_fluxes)
-
-def deletory_march(d_view, neighbours, probabilities, sources,
+        yield (time, curr_visits, curr_removed)
+
+def deletory_march(d_view, walk, sources,
         num_walkers, time_points, steps, capacity, assessor=ConstantValue(),
-        transient=0, lb_view=None, seed=None):
+        transient=0, lb_view=None, seed=None, sink=None):
     """
     Start a number of random walks on the given network for a number of time
     points. Records the activity at visited nodes. And removes any walkers if
@@ -380,11 +632,8 @@ def deletory_march(d_view, neighbours, probabilities, sources,
     ----------
     d_view: DirectView
         An IPython.parallel.DirectView instance.
-    neighbours: list of lists
-        Adjacency list structure as returned by prepare_uniform_walk.
-    probabilities: list of lists
-        Transition probabilities list structure as returned by
-        prepare_uniform_walk.
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
     sources: list
         List of valid starting node indices.
     num_walkers: callable
@@ -404,8 +653,12 @@ def deletory_march(d_view, neighbours, probabilities, sources,
         An IPython.parallel.LoadBalancedView instance which may have performance
         advantages over a DirectView.
     seed: (optional)
-        A valid seed for numpy.random that makes runs deterministic in
-        combination with using only a DirectView.
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic in combination with using only a DirectView.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
 
     Returns
     -------
@@ -419,88 +672,112 @@ def deletory_march(d_view, neighbours, probabilities, sources,
     ``DirectView``. Use of a ``LoadBalancedView`` will assign jobs to remote
     kernels in unpredictable order.
     """
+    return record(iter_deletory_march(d_view, walk, sources, num_walkers,
+            time_points, steps, capacity, assessor, transient, lb_view, seed),
+            ["visits", "removed"], (len(walk), int(time_points)), [float, int],
+            sink)
+
+def iter_buffered_march(d_view, walk, sources,
+        num_walkers, time_points, steps, capacity, assessor=ConstantValue(),
+        transient=0, lb_view=None, lookahead=2, backlog_bytes=None, seed=None):
+    """
+    Generate the results of ``buffered_march`` one time point at a time.
+
+    The arguments are those of ``buffered_march``. Yields tuples of the
+    time point and the activity and the number of stored walkers at each
+    node. The arrays are reused for the next time point and need to be
+    copied if they are kept.
+    """
     time_points = int(time_points)
     steps = int(steps)
     transient = int(transient)
+    lookahead = max(int(lookahead), 1)
     length = len(sources)
-    rand_int = numpy.random.randint
-    visits = numpy.zeros(shape=(len(neighbours), time_points), dtype=float)
-    removed = numpy.zeros(shape=(len(neighbours), time_points), dtype=int)
-    sys.stdout.flush()
+    sources = numpy.asarray(sources)
+    rng = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, rng)
+    value = assessor_lookup(assessor, len(walk))
+    total_throughput = int(numpy.ceil(sum(capacity[node] for node in
+        range(len(walk)))))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    curr_backlog = numpy.zeros(len(walk), dtype=int)
     # make available on remote kernels
-    d_view.push(dict(neighbours=neighbours, probabilities=probabilities,
-        steps=steps), block=True)
-    # assign different but deterministic seeds to all remote engines
-    numpy.random.seed(seed)
-    remote_seeds = set()
-    while len(remote_seeds) < len(d_view):
-        remote_seeds.add(rand_int(sys.maxint))
-    d_view.scatter("seed", remote_seeds, block=True)
-    d_view.execute("import numpy", block=True)
-    d_view.execute("numpy.random.seed(seed[0])", block=True)
+    _push_walk(d_view, walk)
+    d_view.push(dict(steps=steps), block=True)
+    _seed_engines(d_view, rng)
     view = isinstance(lb_view, LoadBalancedView)
     if view:
-        num_krnl = len(lb_view)
-    sys.stdout.write("\r{0:7.2%} complete".format(0.0))
-    sys.stdout.flush()
-    time_norm = float(time_points)
-    for time in xrange(time_points):
-        curr_visits = visits[:, time]
-        curr_num = num_walkers()
-        if curr_num == 0:
-            sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-            sys.stdout.write("\r{0:7.2%} complete, current removed: {1:12d}".format(time / time_norm,
-                    removed[:, time].sum()))
-            sys.stdout.flush()
-            continue
-        if view:
-            size = max((curr_num - 1) // (num_krnl * 2), 1)
-            results = lb_view.map(uniform_random_walker,
-                    [sources[rand_int(length)] for i in xrange(curr_num)],
-                    block=False, ordered=False, chunksize=size)
-        else:
-            results = d_view.map(uniform_random_walker,
-                    [sources[rand_int(length)] for i in xrange(curr_num)],
-                    block=False)
-        for path in results:
-            # if transient > 0, the nodes visited in the transient are ignored
-            for node in path[transient:]:
-                if curr_visits[node] >= capacity[node]:
-                    removed[node, time] += 1
-                    break
-                curr_visits[node] += assessor(node)
-        # clear cache
-        clear_client(d_view.client)
-        if view:
-            clear_view(lb_view)
-        clear_view(d_view)
-        sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-        sys.stdout.write("\r{0:7.2%} complete, current removed: {1:12d}".format(time / time_norm,
-                removed[:, time].sum()))
-        sys.stdout.flush()
-    sys.stdout.write("\r{0:7.2%} complete".format(1.0, removed[:, time].sum()))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
-    return (visits, removed)
-
-def buffered_march(d_view, neighbours, probabilities, sources,
+        views = (d_view, lb_view)
+    else:
+        views = (d_view,)
+    # requests in submission order, None stands for a time point without
+    # walkers
+    in_flight = deque()
+    submitted = 0
+    store = WalkerStore(paths=True, max_bytes=backlog_bytes)
+    try:
+        for time in xrange(time_points):
+            while submitted < time_points and len(in_flight) < lookahead:
+                curr_num = num_walkers()
+                if curr_num == 0:
+                    in_flight.append(None)
+                else:
+                    in_flight.append(_map_chunks(path_generator,
+                            sources[rng.integers(length, curr_num)], d_view,
+                            lb_view))
+                submitted += 1
+            results = in_flight.popleft()
+            rem_time = time_points - time
+            curr_visits.fill(0.0)
+            curr_backlog.fill(0)
+            (store_nodes, store_performed, offsets, store_paths) =\
+                    store.drain()
+            num_old = len(store_nodes)
+            if results is not None:
+                num_old = min(num_old, total_throughput * rem_time)
+            # no need to cut transient since the buffered paths have been cut
+            _resolve_buffered(store_paths, offsets[:num_old + 1],
+                    store_performed[:num_old], 0, curr_visits, curr_backlog,
+                    capacity, value, store)
+            if results is not None:
+                # if transient > 0, the nodes visited in the transient are
+                # ignored
+                for (paths, path_offsets) in results:
+                    _resolve_buffered(paths, path_offsets, transient,
+                            transient, curr_visits, curr_backlog, capacity,
+                            value, store)
+                # later time points may still be outstanding
+                _forget(results, *views)
+            if all(item is None for item in in_flight):
+                # clear cache
+                clear_client(d_view.client)
+                if view:
+                    clear_view(lb_view)
+                clear_view(d_view)
+            yield (time, curr_visits, curr_backlog)
+    finally:
+        store.close()
+
+def buffered_march(d_view, walk, sources,
         num_walkers, time_points, steps, capacity, assessor=ConstantValue(),
-        transient=0, lb_view=None, seed=None):
+        transient=0, lb_view=None, lookahead=2, backlog_bytes=None, seed=None,
+        sink=None):
     """
     Start a number of random walks on the given network for a number of time
     points. Records the activity at visited nodes. And stores any walkers if
     the throughput capacity for the time point is exceeded. The buffered walker
     is then reintroduced at the next time point at that node.
 
+    Paths do not depend on the capacity so the engines generate the walks of
+    upcoming time points while the master resolves the current one. Buffered
+    walkers always continue before the new walkers of a time point.
+
     Parameters
     ----------
     d_view: DirectView
         An IPython.parallel.DirectView instance.
-    neighbours: list of lists
-        Adjacency list structure as returned by prepare_uniform_walk.
-    probabilities: list of lists
-        Transition probabilities list structure as returned by
-        prepare_uniform_walk.
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
     sources: list
         List of valid starting node indices.
     num_walkers: callable
@@ -519,9 +796,19 @@ def buffered_march(d_view, neighbours, probabilities, sources,
     lb_view: LoadBalancedView (optional)
         An IPython.parallel.LoadBalancedView instance which may have performance
         advantages over a DirectView.
+    lookahead: int (optional)
+        Number of time points whose walks are generated at once. A value of one
+        waits for the master before generating the next time point.
+    backlog_bytes: int (optional)
+        Memory budget of the stored walkers beyond which they are kept on disk
+        (see ``WalkerStore``).
     seed: (optional)
-        A valid seed for numpy.random that makes runs deterministic in
-        combination with using only a DirectView.
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic in combination with using only a DirectView.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
 
     Returns
     -------
@@ -535,93 +822,8 @@ def buffered_march(d_view, neighbours, probabilities, sources,
     ``DirectView``. Use of a ``LoadBalancedView`` will assign jobs to remote
     kernels in unknown order.
     """
-    time_points = int(time_points)
-    steps = int(steps)
-    transient = int(transient)
-    length = len(sources)
-    rand_int = numpy.random.randint
-    total_throughput = int(numpy.ceil(sum(capacity[node] for node in
-        range(len(neighbours)))))
-    visits = numpy.zeros(shape=(len(neighbours), time_points), dtype=float)
-    backlog = numpy.zeros(shape=(len(neighbours), time_points), dtype=int)
-    sys.stdout.flush()
-    # make available on remote kernels
-    d_view.push(dict(neighbours=neighbours, probabilities=probabilities,
-        steps=steps), block=True)
-    # assign different but deterministic seeds to all remote engines
-    numpy.random.seed(seed)
-    remote_seeds = set()
-    while len(remote_seeds) < len(d_view):
-        remote_seeds.add(rand_int(sys.maxint))
-    d_view.scatter("seed", remote_seeds, block=True)
-    d_view.execute("import numpy", block=True)
-    d_view.execute("numpy.random.seed(seed[0])", block=True)
-    view = isinstance(lb_view, LoadBalancedView)
-    if view:
-        num_krnl = len(lb_view)
-    sys.stdout.write("\r{0:7.2%} complete".format(0.0))
-    sys.stdout.flush()
-    old_buffer = list()
-    new_buffer = list()
-    time_norm = float(time_points)
-    for time in xrange(time_points):
-        rem_time = time_points - time
-        curr_visits = visits[:, time]
-        curr_num = num_walkers()
-        if curr_num == 0:
-            old_buffer = new_buffer
-            new_buffer = list()
-            for path in old_buffer:
-                # no need to cut transient since the buffered paths have been cut
-                for (i, node) in enumerate(path):
-                    if curr_visits[node] >= capacity[node]:
-                        backlog[node, time] += 1
-                        new_buffer.append(path[i:])
-                        break
-                    curr_visits[node] += assessor(node)
-            sys.stdout.write("\r{0:7.2%} complete, current backlog: {1:12d}".format(time / time_norm,
-                len(new_buffer)))
-            sys.stdout.flush()
-            continue
-        if view:
-            size = max((curr_num - 1) // (num_krnl * 2), 1)
-            results = lb_view.map(uniform_random_walker,
-                    [sources[rand_int(length)] for i in xrange(curr_num)],
-                    block=False, ordered=False, chunksize=size)
-        else:
-            results = d_view.map(uniform_random_walker,
-                    [sources[rand_int(length)] for i in xrange(curr_num)],
-                    block=False)
-        old_buffer = new_buffer[:total_throughput * rem_time]
-        new_buffer = list()
-        for path in old_buffer:
-            # no need to cut transient since the buffered paths have been cut
-            for (i, node) in enumerate(path):
-                if curr_visits[node] >= capacity[node]:
-                    backlog[node, time] += 1
-                    break
-                curr_visits[node] += assessor(node)
-            if i < len(path):
-                new_buffer.append(path[i:])
-        for path in results:
-            path = path[transient:]
-            # if transient > 0, the nodes visited in the transient are ignored
-            for (i, node) in enumerate(path):
-                if curr_visits[node] >= capacity[node]:
-                    backlog[node, time] += 1
-                    new_buffer.append(path[i:])
-                    break
-                curr_visits[node] += assessor(node)
-        # clear cache
-        clear_client(d_view.client)
-        if view:
-            clear_view(lb_view)
-        clear_view(d_view)
-        sys.stdout.write("\r{0:7.2%} complete, current backlog: {1:12d}".format(time / time_norm,
-            len(new_buffer)))
-        sys.stdout.flush()
-    sys.stdout.write("\r{0:7.2%} complete, current backlog: {1:12d}".format(1.0, len(new_buffer)))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
-    return (visits, backlog)
+    return record(iter_buffered_march(d_view, walk, sources, num_walkers,
+            time_points, steps, capacity, assessor, transient, lb_view,
+            lookahead, backlog_bytes, seed), ["visits", "backlog"], (len(walk),
+            int(time_points)), [float, int], sink)
 
@@ -28,10 +28,12 @@ import numpy
 import scipy.stats
 import matplotlib.pyplot as plt
 
-from itertools import izip
+from itertools import izip, count
 
 from scipy.optimize import curve_fit
 
+from .fitting import FITS
+
 
 BREWER_SET1 = ["#E41A1C", "#377EB8", "#4DAF4A", "#984EA3", "#FF7F00", "#FFFF33",
         "#A65628", "#F781BF", "#8DD3C7"]
@@ -63,13 +65,45 @@ def fluctuation_scaling(data, labels):
 def _continuous_power_law(x, k, alpha, c):
     return k * numpy.power(x, alpha) + c
 
-def fluctuation_scaling_fit(data, labels):
-    for ((x_loc, y_loc), label, colour) in izip(data, labels, BREWER_SET1):
+def fluctuation_scaling_fit(data, labels, method=None):
+    """
+    Plot many curves with labels and their power law fits.
+
+    data: list
+        Contains tuples of x-locations and y-locations.
+    labels: list
+        For each pair in ``data`` one string.
+    method: str (optional)
+        By default k * x^alpha + c is fitted to each pair by
+        ``scipy.optimize.curve_fit``. The methods of
+        ``foggy.fitting.fit_table``, "loglink" and "loglog", instead fit
+        exp(intercept) * x^alpha to all pairs at once. They estimate different
+        exponents.
+    """
+    if method is not None:
+        groups = numpy.concatenate([numpy.repeat(i, len(x_loc)) for (i,
+                (x_loc, y_loc)) in enumerate(data)])
+        fits = FITS[method](numpy.concatenate([x_loc for (x_loc, y_loc) in
+                data]), numpy.concatenate([y_loc for (x_loc, y_loc) in data]),
+                groups)
+        fits = dict(izip(fits.group, fits))
+    for (i, (x_loc, y_loc), label, colour) in izip(count(), data, labels,
+            BREWER_SET1):
         mask = numpy.isfinite(x_loc) & (x_loc > 0.0) & numpy.isfinite(y_loc) & (y_loc > 0.0)
         x_loc = x_loc[mask]
         y_loc = y_loc[mask]
         if len(x_loc) == 0 or len(y_loc) == 0:
             continue
+        if method is not None:
+            fit = fits[i]
+            if numpy.isfinite(fit.slope):
+                x_line = numpy.sort(x_loc)
+                plt.plot(x_line, numpy.exp(fit.intercept) *
+                        numpy.power(x_line, fit.slope), color=colour)
+                label = "%s $\\alpha = %.3G \\pm %.3G$" % (label, fit.slope,
+                        fit.standard_error)
+            plt.scatter(x_loc, y_loc, label=label, color=colour)
+            continue
         try:
             (popt, pcov) = curve_fit(_continuous_power_law, x_loc, y_loc)
             fit_y = numpy.power(x_loc, popt[1])
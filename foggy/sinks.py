@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+=========================
+Output of Marcher Results
+=========================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-03-25
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    sinks.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+__all__ = ["ColumnWriter", "ArraySink", "MemmapSink", "open_sink"]
+
+
+import os
+
+import numpy
+
+
+class ColumnWriter(object):
+    """
+    Receives the columns of an N x T array one time point at a time and writes
+    them to the target array in blocks of consecutive columns.
+    """
+
+    def __init__(self, target, block_columns=1, **kw_args):
+        """
+        Parameters
+        ----------
+        target: array-like
+            Any two-dimensional array that supports assignment of column
+            slices, e.g., a numpy.array, numpy.memmap, or tables.CArray.
+        block_columns: int (optional)
+            Number of columns collected before they are written at once.
+        """
+        super(ColumnWriter, self).__init__(**kw_args)
+        self.target = target
+        self.block_columns = max(int(block_columns), 1)
+        self._buffer = None
+        if self.block_columns > 1:
+            self._buffer = numpy.zeros((target.shape[0], self.block_columns),
+                    dtype=target.dtype, order="F")
+        self._first = 0
+        self._filled = 0
+
+    @property
+    def shape(self):
+        return self.target.shape
+
+    def write(self, time, column):
+        """
+        Set the column of a time point.
+        """
+        if self._buffer is None:
+            self.target[:, time] = column
+            return
+        if self._filled > 0 and time != self._first + self._filled:
+            self.flush()
+        if self._filled == 0:
+            self._first = time
+        self._buffer[:, self._filled] = column
+        self._filled += 1
+        if self._filled == self.block_columns:
+            self.flush()
+
+    def flush(self):
+        """
+        Write any buffered columns to the target.
+        """
+        if self._filled == 0:
+            return
+        self.target[:, self._first:self._first + self._filled] =\
+                self._buffer[:, :self._filled]
+        self._filled = 0
+
+    def close(self):
+        """
+        Write outstanding columns and return the target array.
+        """
+        self.flush()
+        if hasattr(self.target, "flush"):
+            self.target.flush()
+        return self.target
+
+
+class ArraySink(object):
+    """
+    Keeps the results of a march in memory, the default.
+    """
+
+    def create(self, name, shape, dtype):
+        """
+        Parameters
+        ----------
+        name: str
+            Identifies the result, e.g., "visits" or "removed".
+        shape: tuple
+            Number of nodes N and number of time points T.
+        dtype: numpy.dtype
+            Type of the elements.
+
+        Returns
+        -------
+        ColumnWriter: Collects the columns of the result.
+        """
+        return ColumnWriter(numpy.zeros(shape, dtype=dtype))
+
+
+class MemmapSink(object):
+    """
+    Writes the results of a march to .npy files in a directory. The arrays are
+    memory-mapped in Fortran order such that each column is contiguous on disk
+    and only the current column needs to be held in memory.
+    """
+
+    def __init__(self, path, **kw_args):
+        """
+        Parameters
+        ----------
+        path: str
+            Directory that is created if necessary.
+        """
+        super(MemmapSink, self).__init__(**kw_args)
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def filename(self, name):
+        return os.path.join(self.path, name + ".npy")
+
+    def create(self, name, shape, dtype):
+        """
+        Parameters
+        ----------
+        name: str
+            Identifies the result and its file, e.g., "visits" or "removed".
+        shape: tuple
+            Number of nodes N and number of time points T.
+        dtype: numpy.dtype
+            Type of the elements.
+
+        Returns
+        -------
+        ColumnWriter: Collects the columns of the result.
+        """
+        return ColumnWriter(numpy.lib.format.open_memmap(self.filename(name),
+                mode="w+", dtype=dtype, shape=shape, fortran_order=True))
+
+
+def open_sink(sink, name, shape, dtype):
+    """
+    Create a result in the given sink or in memory if it is None.
+    """
+    if sink is None:
+        sink = ArraySink()
+    return sink.create(name, shape, dtype)
+
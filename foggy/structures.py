@@ -0,0 +1,783 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+==========================
+Prepared Random Walk Data
+==========================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-03-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    structures.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+__all__ = ["PreparedWalk", "WalkerStore"]
+
+
+import os
+import shutil
+import hashlib
+import tempfile
+
+import numpy
+import scipy.sparse
+
+
+def _index_type(size):
+    """
+    Use 32 bit indices whenever possible but do not overflow.
+    """
+    if size < numpy.iinfo(numpy.int32).max:
+        return numpy.int32
+    return numpy.int64
+
+def _alias_table(probs):
+    """
+    Construct Walker's alias table for a discrete distribution using Vose's
+    method.
+
+    Parameters
+    ----------
+    probs: numpy.array
+        Probabilities normalised to unity.
+
+    Returns
+    -------
+    numpy.array: The probability of keeping a selected column.
+    numpy.array: The alias of each column.
+    """
+    num = len(probs)
+    scaled = probs * num
+    keep = numpy.ones(num, dtype=float)
+    alias = numpy.arange(num, dtype=numpy.int64)
+    small = [i for i in xrange(num) if scaled[i] < 1.0]
+    large = [i for i in xrange(num) if scaled[i] >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        keep[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = (scaled[more] + scaled[less]) - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+    # any left-overs are due to rounding and are kept with certainty
+    return (keep, alias)
+
+def _load_array(filename, mmap_mode):
+    try:
+        return numpy.load(filename, mmap_mode=mmap_mode)
+    except ValueError:
+        # empty arrays cannot be memory-mapped
+        return numpy.load(filename)
+
+
+class PreparedWalk(object):
+    """
+    Compressed sparse row (CSR) representation of the transition structure of a
+    random walk.
+
+    The neighbours of the node with index i are stored in
+    ``indices[indptr[i]:indptr[i + 1]]`` and the cumulative transition
+    probabilities to those neighbours in the same slice of ``cumprob``. Dead
+    ends simply have an empty slice.
+
+    All data is held in a few flat, contiguous arrays which makes instances
+    cheap to pickle, share between processes, and memory-map.
+    """
+
+    _arrays = ("indptr", "indices", "cumprob", "acceptance", "unweighted",
+            "alias_prob", "alias_index")
+
+    def __init__(self, indptr, indices, cumprob, acceptance=None,
+            unweighted=None, **kw_args):
+        """
+        Parameters
+        ----------
+        indptr: array-like
+            Offsets of the neighbours of each node, of length N + 1.
+        indices: array-like
+            Concatenated neighbour indices of all nodes.
+        cumprob: array-like
+            Concatenated cumulative transition probabilities of all nodes.
+        acceptance: array-like (optional)
+            Per edge acceptance probabilities of a directed walk (see
+            ``prepare_directed_walk``).
+        unweighted: array-like (optional)
+            Boolean flags marking nodes whose neighbours are equally likely,
+            these are sampled by direct indexing rather than a search.
+        """
+        super(PreparedWalk, self).__init__(**kw_args)
+        self.indptr = numpy.ascontiguousarray(indptr,
+                dtype=_index_type(indptr[-1]))
+        self.indices = numpy.ascontiguousarray(indices,
+                dtype=_index_type(len(self.indptr)))
+        self.cumprob = numpy.ascontiguousarray(cumprob, dtype=numpy.float64)
+        assert len(self.indices) == self.indptr[-1]
+        assert len(self.cumprob) == self.indptr[-1]
+        if acceptance is not None:
+            acceptance = numpy.ascontiguousarray(acceptance,
+                    dtype=numpy.float64)
+            assert len(acceptance) == self.indptr[-1]
+        self.acceptance = acceptance
+        if unweighted is not None:
+            unweighted = numpy.ascontiguousarray(unweighted, dtype=bool)
+            assert len(unweighted) == len(self.indptr) - 1
+        self.unweighted = unweighted
+        self.alias_prob = None
+        self.alias_index = None
+        self._shifted = None
+
+    @classmethod
+    def from_lists(cls, neighbours, probabilities, **kw_args):
+        """
+        Convert the former list of arrays structures to a CSR representation.
+
+        Parameters
+        ----------
+        neighbours: list of lists
+            Adjacency list structure.
+        probabilities: list of lists
+            Cumulative transition probabilities corresponding to neighbours.
+        """
+        indptr = numpy.zeros(len(neighbours) + 1, dtype=numpy.int64)
+        indptr[1:] = [len(nbrs) for nbrs in neighbours]
+        numpy.cumsum(indptr, out=indptr)
+        if indptr[-1] == 0:
+            return cls(indptr, [], [], **kw_args)
+        indices = numpy.concatenate([numpy.asarray(nbrs, dtype=numpy.int64)
+                for nbrs in neighbours])
+        cumprob = numpy.concatenate([numpy.asarray(probs, dtype=float)
+                for probs in probabilities])
+        return cls(indptr, indices, cumprob, **kw_args)
+
+    @classmethod
+    def from_adjacency(cls, adjacency, **kw_args):
+        """
+        Construct the walk from a weighted adjacency matrix without looping
+        over nodes or edges.
+
+        The neighbours of all nodes of equal degree form a dense block whose
+        rows are summed up in sequence such that the cumulative probabilities
+        equal those of ``prepare_uniform_walk`` for the same neighbour order.
+
+        Parameters
+        ----------
+        adjacency: scipy.sparse matrix
+            The entry (i, j) is the weight of the edge from node i to node j.
+            Duplicate entries are summed and explicit zeros are dropped.
+        """
+        adjacency = scipy.sparse.csr_matrix(adjacency, dtype=numpy.float64)
+        adjacency.sum_duplicates()
+        adjacency.eliminate_zeros()
+        indptr = adjacency.indptr
+        weights = adjacency.data
+        degree = numpy.diff(indptr)
+        cumprob = numpy.zeros(len(weights), dtype=float)
+        order = numpy.argsort(degree, kind="mergesort")
+        (sizes, firsts) = numpy.unique(degree[order], return_index=True)
+        bounds = numpy.append(firsts, len(order))
+        for (k, size) in enumerate(sizes):
+            if size == 0:
+                continue
+            rows = order[bounds[k]:bounds[k + 1]]
+            positions = indptr[rows, numpy.newaxis] + numpy.arange(size)
+            block = numpy.cumsum(weights[positions], axis=1)
+            # the sum of all edge weights normalises each row to unity
+            block /= block[:, -1:]
+            cumprob[positions] = block
+        starts = indptr[:-1][degree > 0]
+        # nodes whose edges all carry the same weight can be sampled directly
+        unweighted = numpy.ones(len(degree), dtype=bool)
+        if len(starts) > 0:
+            unweighted[degree > 0] = (numpy.minimum.reduceat(weights, starts) ==
+                    numpy.maximum.reduceat(weights, starts))
+        return cls(indptr, adjacency.indices, cumprob, unweighted=unweighted,
+                **kw_args)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """
+        Open a walk stored by ``save``.
+
+        Parameters
+        ----------
+        path: str
+            Directory containing the array files.
+        mmap_mode: str (optional)
+            Passed on to ``numpy.load``. By default the arrays are memory-mapped
+            read-only such that many processes share the same pages.
+        """
+        arrays = dict()
+        for name in cls._arrays:
+            filename = os.path.join(path, name + ".npy")
+            if os.path.exists(filename):
+                arrays[name] = _load_array(filename, mmap_mode)
+        walk = cls(arrays["indptr"], arrays["indices"], arrays["cumprob"],
+                acceptance=arrays.get("acceptance"),
+                unweighted=arrays.get("unweighted"))
+        walk.alias_prob = arrays.get("alias_prob")
+        walk.alias_index = arrays.get("alias_index")
+        return walk
+
+    def save(self, path):
+        """
+        Store all arrays as separate .npy files in a directory such that they
+        can be memory-mapped by ``load``.
+
+        Parameters
+        ----------
+        path: str
+            Directory that is created if necessary.
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        for name in self._arrays:
+            array = getattr(self, name)
+            if array is not None:
+                numpy.save(os.path.join(path, name + ".npy"), array)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # derived data is recomputed on demand and need not be transferred
+        state["_shifted"] = None
+        return state
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def digest(self):
+        """
+        A hash of the content of all arrays which identifies equal walks.
+
+        Returns
+        -------
+        str: The SHA-1 digest in hexadecimal notation.
+        """
+        sha = hashlib.sha1()
+        for name in self._arrays:
+            array = getattr(self, name)
+            if array is None:
+                continue
+            array = numpy.ascontiguousarray(array)
+            sha.update("{0}:{1}:{2:d};".format(name, array.dtype.str,
+                    len(array)))
+            sha.update(array.data)
+        return sha.hexdigest()
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    @property
+    def degree(self):
+        """
+        Array of the out-degree of each node.
+        """
+        return numpy.diff(self.indptr)
+
+    @property
+    def is_unweighted(self):
+        """
+        Whether all nodes choose among their neighbours with equal probability.
+        """
+        return self.unweighted is not None and bool(self.unweighted.all())
+
+    @property
+    def nbytes(self):
+        """
+        Memory consumed by the array data.
+        """
+        total = self.indptr.nbytes + self.indices.nbytes + self.cumprob.nbytes
+        if self.acceptance is not None:
+            total += self.acceptance.nbytes
+        if self.unweighted is not None:
+            total += self.unweighted.nbytes
+        if self.alias_prob is not None:
+            total += self.alias_prob.nbytes + self.alias_index.nbytes
+        return total
+
+    def build_alias(self):
+        """
+        Construct Walker's alias tables for all nodes such that the next node
+        can be sampled in constant time independent of the degree.
+
+        The tables are stored in the arrays ``alias_prob`` and ``alias_index``
+        which correspond to ``indices``. ``alias_index`` holds offsets relative
+        to the start of a node's neighbours.
+        """
+        self.alias_prob = numpy.ones(self.num_edges, dtype=numpy.float64)
+        self.alias_index = numpy.zeros(self.num_edges,
+                dtype=_index_type(self.degree.max()))
+        probs = self.transition_probabilities()
+        for i in xrange(len(self)):
+            start = self.indptr[i]
+            end = self.indptr[i + 1]
+            if start == end:
+                continue
+            (keep, alias) = _alias_table(probs[start:end])
+            self.alias_prob[start:end] = keep
+            self.alias_index[start:end] = alias
+
+    def transition_probabilities(self):
+        """
+        Array of the transition probability along each edge, the difference of
+        consecutive cumulative probabilities.
+        """
+        probs = self.cumprob.copy()
+        probs[1:] -= self.cumprob[:-1]
+        starts = self.indptr[:-1][self.degree > 0]
+        probs[starts] = self.cumprob[starts]
+        return probs
+
+    def transition_matrix(self):
+        """
+        The transition matrix P as a scipy.sparse.csr_matrix where the entry
+        P[i, j] is the probability of a step from node i to node j. Rows of
+        dead ends are empty.
+        """
+        return scipy.sparse.csr_matrix((self.transition_probabilities(),
+            self.indices, self.indptr), shape=(len(self), len(self)))
+
+    def effective_walk(self):
+        """
+        Convert a directed walk, whose neighbours are proposed according to
+        ``cumprob`` and accepted with the probabilities in ``acceptance``, into
+        the equivalent walk that needs a single draw per step.
+
+        A rejected proposal leaves the walker at its node. The probability of
+        staying is therefore added as a transition to the node itself at the
+        end of its neighbours.
+
+        Returns
+        -------
+        PreparedWalk: A walk with normalised cumulative probabilities.
+        """
+        if self.acceptance is None:
+            raise ValueError("walk has no acceptance probabilities")
+        num_nodes = len(self)
+        degree = self.degree
+        rows = numpy.repeat(numpy.arange(num_nodes), degree)
+        moves = self.transition_probabilities() * self.acceptance
+        stay = 1.0 - numpy.bincount(rows, weights=moves, minlength=num_nodes)
+        has_stay = (degree > 0) & (stay > degree * numpy.finfo(float).eps)
+        indptr = numpy.zeros(num_nodes + 1, dtype=numpy.int64)
+        numpy.cumsum(degree + has_stay, out=indptr[1:])
+        # edges move back by the number of stay transitions in earlier rows
+        shift = indptr[:-1] - self.indptr[:-1]
+        positions = numpy.arange(self.num_edges) + shift[rows]
+        stay_pos = indptr[1:][has_stay] - 1
+        indices = numpy.zeros(indptr[-1], dtype=self.indices.dtype)
+        indices[positions] = self.indices
+        indices[stay_pos] = numpy.flatnonzero(has_stay)
+        probs = numpy.zeros(indptr[-1], dtype=float)
+        probs[positions] = moves
+        probs[stay_pos] = stay[has_stay]
+        # cumulative sums restart at the beginning of each node's neighbours
+        cumprob = numpy.cumsum(probs)
+        totals = numpy.concatenate(([0.0], cumprob))
+        new_degree = numpy.diff(indptr)
+        cumprob -= numpy.repeat(totals[indptr[:-1]], new_degree)
+        ends = indptr[1:][new_degree > 0] - 1
+        cumprob[ends] = 1.0
+        return PreparedWalk(indptr, indices, cumprob, unweighted=~has_stay)
+
+    def neighbours(self, node):
+        """
+        View of the neighbour indices of a node.
+        """
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def probabilities(self, node):
+        """
+        View of the cumulative transition probabilities of a node.
+        """
+        return self.cumprob[self.indptr[node]:self.indptr[node + 1]]
+
+    def sampling_method(self, method=None):
+        """
+        Determine a method for choosing the next node of a single walker.
+
+        Parameters
+        ----------
+        method: str (optional)
+            Either "cumulative" for a binary search among the cumulative
+            probabilities, "alias" for sampling from the alias tables, or
+            "uniform" for direct indexing of the neighbours of an unweighted
+            graph. The default is the fastest available method.
+
+        Returns
+        -------
+        str: The name of the method.
+        """
+        if method is None:
+            if self.is_unweighted:
+                method = "uniform"
+            elif self.alias_prob is not None:
+                method = "alias"
+            else:
+                method = "cumulative"
+        if method == "uniform":
+            if not self.is_unweighted:
+                raise ValueError("graph has weighted nodes")
+        elif method == "alias":
+            if self.alias_prob is None:
+                raise ValueError("alias tables have not been built")
+        elif method != "cumulative":
+            raise ValueError("unknown sampling method '%s'" % method)
+        return method
+
+    def sampler(self, method=None):
+        """
+        Select a method for choosing the next node of a single walker (see
+        ``sampling_method``).
+
+        Returns
+        -------
+        callable: One of ``choose``, ``choose_alias``, or ``choose_uniform``.
+        """
+        method = self.sampling_method(method)
+        if method == "uniform":
+            return self.choose_uniform
+        elif method == "alias":
+            return self.choose_alias
+        return self.choose
+
+    def choose(self, node, draw):
+        """
+        Select the next node of a walker.
+
+        Parameters
+        ----------
+        node: int
+            Index of the current node.
+        draw: float
+            A uniform random number in [0, 1).
+
+        Returns
+        -------
+        int: The index of the next node or -1 if node is a dead end.
+        """
+        start = self.indptr[node]
+        end = self.indptr[node + 1]
+        if start == end:
+            return -1
+        if self.unweighted is not None and self.unweighted[node]:
+            return self.indices[start + int(draw * (end - start))]
+        # binary search for the index to the left of the draw
+        return self.indices[start + numpy.searchsorted(self.cumprob[start:end],
+                draw)]
+
+    def choose_uniform(self, node, draw):
+        """
+        Select the next node of a walker in an unweighted graph.
+
+        Parameters
+        ----------
+        node: int
+            Index of the current node.
+        draw: float
+            A uniform random number in [0, 1).
+
+        Returns
+        -------
+        int: The index of the next node or -1 if node is a dead end.
+        """
+        start = self.indptr[node]
+        end = self.indptr[node + 1]
+        if start == end:
+            return -1
+        return self.indices[start + int(draw * (end - start))]
+
+    def choose_alias(self, node, draw):
+        """
+        Select the next node of a walker by means of the alias tables.
+
+        Parameters
+        ----------
+        node: int
+            Index of the current node.
+        draw: float
+            A uniform random number in [0, 1).
+
+        Returns
+        -------
+        int: The index of the next node or -1 if node is a dead end.
+        """
+        start = self.indptr[node]
+        end = self.indptr[node + 1]
+        if start == end:
+            return -1
+        # a single draw determines the column and, from the remainder, whether
+        # to keep it or to use its alias
+        draw *= end - start
+        column = int(draw)
+        pos = start + column
+        if draw - column < self.alias_prob[pos]:
+            return self.indices[pos]
+        return self.indices[start + self.alias_index[pos]]
+
+    def sample(self, nodes, draws):
+        """
+        Select the next nodes of many walkers at once.
+
+        Parameters
+        ----------
+        nodes: numpy.array
+            Indices of the current nodes, none of which may be a dead end.
+        draws: numpy.array
+            Uniform random numbers in [0, 1) of the same length as nodes.
+
+        Returns
+        -------
+        numpy.array: The indices of the next nodes.
+        """
+        if self.is_unweighted:
+            start = self.indptr[nodes]
+            draws = draws * (self.indptr[nodes + 1] - start)
+            return self.indices[start + draws.astype(start.dtype)]
+        if self.alias_prob is not None:
+            start = self.indptr[nodes]
+            draws = draws * (self.indptr[nodes + 1] - start)
+            columns = draws.astype(start.dtype)
+            pos = start + columns
+            keep = (draws - columns) < self.alias_prob[pos]
+            return self.indices[numpy.where(keep, pos,
+                    start + self.alias_index[pos])]
+        if self._shifted is None:
+            # shifting the cumulative probabilities of each node by its index
+            # makes them globally sorted so that a single binary search can
+            # serve all walkers
+            self._shifted = self.cumprob + numpy.repeat(
+                    numpy.arange(len(self), dtype=float), self.degree)
+        pos = numpy.searchsorted(self._shifted, nodes + draws)
+        # guard against rounding of the shifted draws
+        numpy.clip(pos, self.indptr[nodes], self.indptr[nodes + 1] - 1, out=pos)
+        if self.unweighted is not None:
+            mask = self.unweighted[nodes]
+            start = self.indptr[nodes[mask]]
+            pos[mask] = start + (draws[mask] * (self.indptr[nodes[mask] + 1] -
+                    start)).astype(start.dtype)
+        return self.indices[pos]
+
+
+class WalkerStore(object):
+    """
+    First in, first out store of buffered walkers kept as a struct of arrays.
+
+    Each walker is described by its current node and the number of steps it
+    has performed. Optionally, the remainder of a pre-generated path is kept
+    for each walker in one concatenated array.
+
+    Walkers are added to the current generation of the store and ``drain``
+    hands out all of them at once in the order that they were added. Two
+    generations of arrays are used alternately so that after an initial
+    growth no more memory is allocated.
+
+    Beyond an optional memory budget, arrays are allocated as memory-mapped
+    files instead.
+    """
+
+    def __init__(self, size=1024, paths=False, max_bytes=None,
+            directory=None, **kw_args):
+        """
+        Parameters
+        ----------
+        size: int (optional)
+            The initial number of walkers that fit into the store.
+        paths: bool (optional)
+            Whether to keep path remainders with each walker.
+        max_bytes: int (optional)
+            Memory budget of the arrays, larger arrays are kept on disk.
+        directory: str (optional)
+            Where to place files beyond the budget, by default a new temporary
+            directory.
+        """
+        super(WalkerStore, self).__init__(**kw_args)
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._tmp_dir = None
+        self._num_files = 0
+        self._files = dict()
+        size = max(int(size), 1)
+        dtypes = [("node", numpy.int64), ("performed", numpy.int64)]
+        if paths:
+            dtypes.extend([("offset", numpy.int64), ("path", numpy.int32)])
+        self._generations = list()
+        for i in xrange(2):
+            arrays = dict()
+            for (name, dtype) in dtypes:
+                arrays[name] = self._allocate(size, dtype)
+            self._generations.append(arrays)
+        self._current = 0
+        self._num = 0
+        self._path_len = 0
+
+    def __len__(self):
+        return self._num
+
+    @property
+    def has_paths(self):
+        return "path" in self._generations[0]
+
+    @property
+    def nbytes(self):
+        """
+        Memory consumed by arrays that are not memory-mapped.
+        """
+        return sum(array.nbytes for arrays in self._generations for array in
+                arrays.itervalues() if id(array) not in self._files)
+
+    def _allocate(self, size, dtype):
+        nbytes = size * numpy.dtype(dtype).itemsize
+        if self.max_bytes is None or self.nbytes + nbytes <= self.max_bytes:
+            return numpy.empty(size, dtype=dtype)
+        if self.directory is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="foggy_")
+            self.directory = self._tmp_dir
+        filename = os.path.join(self.directory, "store_{0:d}.npy".format(
+                self._num_files))
+        self._num_files += 1
+        array = numpy.lib.format.open_memmap(filename, mode="w+", dtype=dtype,
+                shape=(size,))
+        self._files[id(array)] = filename
+        return array
+
+    def _release(self, array):
+        filename = self._files.pop(id(array), None)
+        if filename is not None:
+            del array
+            os.remove(filename)
+
+    def _reserve(self, name, size, used):
+        arrays = self._generations[self._current]
+        old = arrays[name]
+        if size <= len(old):
+            return old
+        new = self._allocate(max(size, 2 * len(old)), old.dtype)
+        new[:used] = old[:used]
+        arrays[name] = new
+        self._release(old)
+        return new
+
+    def append(self, node, performed, path=None):
+        """
+        Add a single walker.
+
+        Parameters
+        ----------
+        node: int
+            The current node of the walker.
+        performed: int
+            The number of steps performed.
+        path: array-like (optional)
+            The remaining path of the walker starting with its current node.
+        """
+        num = self._num
+        arrays = self._generations[self._current]
+        if num == len(arrays["node"]):
+            for name in ("node", "performed", "offset"):
+                if name in arrays:
+                    self._reserve(name, num + 1, num)
+        arrays["node"][num] = node
+        arrays["performed"][num] = performed
+        if path is not None:
+            arrays["offset"][num] = self._path_len
+            end = self._path_len + len(path)
+            self._reserve("path", end, self._path_len)[self._path_len:end] =\
+                    path
+            self._path_len = end
+        self._num = num + 1
+
+    def extend(self, nodes, performed, paths=None, starts=None, ends=None):
+        """
+        Add many walkers at once.
+
+        Parameters
+        ----------
+        nodes: numpy.array
+            The current nodes of the walkers.
+        performed: numpy.array
+            The number of steps performed by each walker.
+        paths: numpy.array (optional)
+            Concatenated paths from which the remainders
+            ``paths[starts[i]:ends[i]]`` are kept.
+        starts: numpy.array (optional)
+            Beginning of each walker's remaining path.
+        ends: numpy.array (optional)
+            End of each walker's remaining path.
+        """
+        num = self._num
+        end = num + len(nodes)
+        for name in ("node", "performed", "offset"):
+            if name in self._generations[self._current]:
+                self._reserve(name, end, num)
+        arrays = self._generations[self._current]
+        arrays["node"][num:end] = nodes
+        arrays["performed"][num:end] = performed
+        if paths is not None:
+            lengths = ends - starts
+            offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+            numpy.cumsum(lengths, out=offsets[1:])
+            arrays["offset"][num:end] = self._path_len + offsets[:-1]
+            # gather all segments with a single fancy index
+            index = numpy.repeat(starts - offsets[:-1], lengths) +\
+                    numpy.arange(offsets[-1])
+            path_end = self._path_len + offsets[-1]
+            self._reserve("path", path_end, self._path_len)[
+                    self._path_len:path_end] = paths[index]
+            self._path_len = path_end
+        self._num = end
+
+    def drain(self):
+        """
+        Remove all walkers from the store.
+
+        Returns
+        -------
+        numpy.array: The nodes of the walkers in the order they were added.
+        numpy.array: The number of steps performed by each walker.
+        numpy.array: Offsets of the remaining paths of length number of
+            walkers + 1 or None.
+        numpy.array: Concatenated remaining paths or None.
+
+        Warning
+        -------
+        The arrays are views that are only valid until the next call to
+        ``drain``.
+        """
+        arrays = self._generations[self._current]
+        num = self._num
+        result = (arrays["node"][:num], arrays["performed"][:num])
+        if self.has_paths:
+            offsets = numpy.empty(num + 1, dtype=numpy.int64)
+            offsets[:num] = arrays["offset"][:num]
+            offsets[num] = self._path_len
+            result += (offsets, arrays["path"][:self._path_len])
+        else:
+            result += (None, None)
+        self._current = 1 - self._current
+        self._num = 0
+        self._path_len = 0
+        return result
+
+    def close(self):
+        """
+        Remove any files that were created.
+        """
+        for arrays in self._generations:
+            for name in arrays.keys():
+                self._release(arrays.pop(name))
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
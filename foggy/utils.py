@@ -19,7 +19,8 @@ Random Walks on Networks
 """
 
 
-__all__ = ["compute_mu", "internal_dynamics_external_fluctuations"]
+__all__ = ["compute_mu", "internal_dynamics_external_fluctuations",
+        "FluctuationAccumulator"]
 
 
 import numpy
@@ -51,15 +52,21 @@ def compute_mu(alpha, nu=1.0):
     nu = float(nu)
     return (nu - (2.0 * alpha * nu)) / (2.0 * (alpha - 1.0))
 
-def internal_dynamics_external_fluctuations(activity):
+def internal_dynamics_external_fluctuations(activity, block_size=None):
     """
     Assess the internal dynamics and external fluctuations of a complex system.
 
+    The activity is processed in blocks of rows such that only one block is
+    converted to double precision at a time. Single precision input, as well
+    as memory-mapped or HDF5 arrays, are thus never copied as a whole.
+
     Parameters
     ----------
-    activity: numpy.array
+    activity: array-like
         Two dimensional array, where the first dimension corresponds to system
         elements and the second to observations of their activity.
+    block_size: int (optional)
+        Number of rows per block, by default as many as fit into about 32 MB.
 
     Returns
     -------
@@ -69,16 +76,141 @@ def internal_dynamics_external_fluctuations(activity):
     References
     ----------
     """
-    internal = numpy.zeros(activity.shape, dtype=float)
-    external = numpy.zeros(activity.shape, dtype=float)
-    sum_time = activity.sum(axis=1)
-    sum_elem = activity.sum(axis=0)
+    (num_elem, num_time) = activity.shape
+    if block_size is None:
+        block_size = max(2**22 // max(num_time, 1), 1)
+    block_size = max(int(block_size), 1)
+    blocks = [(start, min(start + block_size, num_elem)) for start in
+            xrange(0, num_elem, block_size)]
+    sum_time = numpy.zeros(num_elem, dtype=float)
+    sum_elem = numpy.zeros(num_time, dtype=float)
+    for (start, stop) in blocks:
+        block = numpy.asarray(activity[start:stop], dtype=float)
+        sum_time[start:stop] = block.sum(axis=1)
+        sum_elem += block.sum(axis=0)
     # equation (2)
-    fraction = sum_time / activity.sum()
-    # equation (3) & (4)
-    for i in xrange(activity.shape[0]):
-        for t in xrange(activity.shape[1]):
-            external[i, t] = fraction[i] * sum_elem[t]
-            internal[i, t] = activity[i, t] - external[i, t]
-    return (internal.std(axis=1, ddof=1), external.std(axis=1, ddof=1))
+    fraction = sum_time / sum_elem.sum()
+    # equation (3) & (4), the external fluctuations of an element are the
+    # total activity scaled by its fraction
+    internal = numpy.zeros(num_elem, dtype=float)
+    for (start, stop) in blocks:
+        block = numpy.array(activity[start:stop], dtype=float)
+        block -= fraction[start:stop, numpy.newaxis] * sum_elem
+        internal[start:stop] = block.std(axis=1, ddof=1)
+    return (internal, numpy.abs(fraction) * sum_elem.std(ddof=1))
+
+
+class FluctuationAccumulator(object):
+    """
+    Online version of ``internal_dynamics_external_fluctuations`` that is
+    updated with one or more time points of activity at a time.
+
+    Only the centered moments of the activity a_it of each element, of the
+    total activity S_t, and their co-moments are kept. Accumulators of
+    disjoint sets of time points, e.g., from blocks of time points simulated
+    by different processes, are combined by ``merge`` [1]_.
+
+    References
+    ----------
+    .. [1] Chan, T. F., G. H. Golub, and R. J. LeVeque.
+           "Updating Formulae and a Pairwise Algorithm for Computing Sample
+           Variances." Technical Report STAN-CS-79-773, Stanford University
+           (1979).
+    """
+
+    def __init__(self, index=0, **kw_args):
+        """
+        Parameters
+        ----------
+        index: int (optional)
+            Position of the activity among the arrays of a time point when used
+            as an observer of a streaming marcher.
+        """
+        super(FluctuationAccumulator, self).__init__(**kw_args)
+        self.index = index
+        self.count = 0
+        self.mean = None
+        self.mean_total = 0.0
+        self._sum_sq = None
+        self._sum_sq_total = 0.0
+        self._co_sum = None
+
+    def __call__(self, time, *columns):
+        self.add(columns[self.index])
+
+    def add(self, activity):
+        """
+        Add observations.
+
+        Parameters
+        ----------
+        activity: numpy.array
+            The activity of all elements at one time point or a two dimensional
+            array with one column per time point.
+        """
+        activity = numpy.asarray(activity, dtype=float)
+        if activity.ndim == 1:
+            activity = activity[:, numpy.newaxis]
+        if activity.shape[1] == 0:
+            return
+        other = FluctuationAccumulator(self.index)
+        other.count = activity.shape[1]
+        total = activity.sum(axis=0)
+        other.mean = activity.mean(axis=1)
+        other.mean_total = total.mean()
+        deviation = activity - other.mean[:, numpy.newaxis]
+        total -= other.mean_total
+        other._sum_sq = numpy.einsum("ij,ij->i", deviation, deviation)
+        other._sum_sq_total = total.dot(total)
+        other._co_sum = deviation.dot(total)
+        self.merge(other)
+
+    def merge(self, other):
+        """
+        Include the observations of another accumulator.
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count = other.count
+            self.mean = other.mean.copy()
+            self.mean_total = other.mean_total
+            self._sum_sq = other._sum_sq.copy()
+            self._sum_sq_total = other._sum_sq_total
+            self._co_sum = other._co_sum.copy()
+            return
+        count = self.count + other.count
+        weight = self.count * other.count / float(count)
+        delta = other.mean - self.mean
+        delta_total = other.mean_total - self.mean_total
+        self._sum_sq += other._sum_sq + delta * delta * weight
+        self._sum_sq_total += other._sum_sq_total +\
+                delta_total * delta_total * weight
+        self._co_sum += other._co_sum + delta * delta_total * weight
+        self.mean += delta * (other.count / float(count))
+        self.mean_total += delta_total * (other.count / float(count))
+        self.count = count
+
+    @property
+    def std(self):
+        return numpy.sqrt(self._sum_sq / (self.count - 1))
+
+    def fluctuations(self):
+        """
+        Returns
+        -------
+        Two arrays for the standard deviation of the internal and external
+        fluctuations of components, respectively (cf.
+        ``internal_dynamics_external_fluctuations``).
+        """
+        norm = float(self.count - 1)
+        # equation (2)
+        fraction = self.mean / self.mean_total
+        var_total = self._sum_sq_total / norm
+        # the internal fluctuations have zero mean, their variance follows
+        # from the moments of the activity and the total activity
+        internal = (self._sum_sq - 2.0 * fraction * self._co_sum +
+                fraction * fraction * self._sum_sq_total) / norm
+        external = fraction * numpy.sqrt(var_total)
+        return (numpy.sqrt(numpy.maximum(internal, 0.0)), numpy.abs(external))
 
@@ -19,12 +19,66 @@ Values of Random Walk Visits
 """
 
 
-__all__ = ["ConstantValue", "DegreeDependentValue"]
+__all__ = ["assessor_values", "assessor_lookup", "constant_value",
+        "ConstantValue", "DegreeDependentValue"]
 
 
 import numpy
 
 
+def assessor_values(assessor, num_nodes):
+    """
+    Obtain the value of a visit at each node as an array.
+
+    Parameters
+    ----------
+    assessor: callable
+        Either an instance with an ``as_array`` method, like the classes in
+        this module, or a callable that is given the node index as argument
+        and returns the activity value of a visit. The latter is tabulated and
+        must thus only depend on the node.
+    num_nodes: int
+        The number of nodes N.
+
+    Returns
+    -------
+    numpy.array: The value of a visit at the node indices 0 to (N - 1).
+    """
+    if hasattr(assessor, "as_array"):
+        return assessor.as_array(num_nodes)
+    return numpy.array([assessor(node) for node in xrange(num_nodes)],
+            dtype=float)
+
+def assessor_lookup(assessor, num_nodes):
+    """
+    Obtain a fast callable that returns the value of a visit at a node.
+
+    Assessors that provide their values as an array are looked up by index,
+    any other callable is returned as is and called for every visit.
+
+    Parameters
+    ----------
+    assessor: callable
+        Called with the node index as argument, it should return the activity
+        value of a visit.
+    num_nodes: int
+        The number of nodes N.
+    """
+    if hasattr(assessor, "as_array"):
+        return assessor.as_array(num_nodes).__getitem__
+    return assessor
+
+def constant_value(assessor):
+    """
+    Return the constant value of all visits or None.
+
+    Visits of constant value can be counted as integers and scaled once.
+    """
+    if isinstance(assessor, ConstantValue):
+        return assessor.value
+    return None
+
+
 class ConstantValue(object):
     """
     An estimator of the value generated by a random walker visiting a node.
@@ -44,6 +98,12 @@ class ConstantValue(object):
         """
         return self.value
 
+    def as_array(self, num_nodes):
+        """
+        The value of a visit at each of num_nodes nodes.
+        """
+        return numpy.repeat(self.value, num_nodes)
+
 
 class DegreeDependentValue(object):
     """
@@ -85,3 +145,10 @@ class DegreeDependentValue(object):
         """
         return self.values[index]
 
+    def as_array(self, num_nodes):
+        """
+        The pre-computed values of all nodes.
+        """
+        assert len(self.values) == num_nodes
+        return self.values
+
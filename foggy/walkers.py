@@ -19,23 +19,32 @@ Random Walks on Networks
 """
 
 
-__all__ = ["prepare_uniform_walk", "prepare_directed_walk", "march",
-        "deletory_march", "buffered_march"]
+__all__ = ["prepare_uniform_walk", "prepare_sparse_walk", "prepare_edge_walk",
+        "prepare_directed_walk", "iter_march", "march", "iter_lockstep_march",
+        "lockstep_march", "iter_multinomial_march", "multinomial_march",
+        "iter_deletory_march", "deletory_march", "iter_buffered_march",
+        "buffered_march"]
 
 #        "limited_uniform_random_walker",
 
-import sys
+import heapq
 import itertools
 
+from collections import deque
+
 import numpy
+import scipy.sparse
 import networkx as nx
 
-from collections import deque
-
-from .visits import ConstantValue
+from . import kernels
+from .distributions import RandomBlocks, walker_counts
+from .visits import (ConstantValue, assessor_values, assessor_lookup,
+        constant_value)
+from .structures import PreparedWalk, WalkerStore
+from .observers import record
 
 
-def prepare_uniform_walk(graph, node2id=None, weight=None):
+def prepare_uniform_walk(graph, node2id=None, weight=None, alias=False):
     """
     Prepare data structures for a uniform random walk.
 
@@ -51,40 +60,86 @@ def prepare_uniform_walk(graph, node2id=None, weight=None):
     weight: hashable
         The keyword for edge data that should be used to weigh the propagation
         probability.
+    alias: bool (optional)
+        Build alias tables for sampling the next node in constant time. This
+        pays off for graphs with high degree nodes.
+
+    Returns
+    -------
+    PreparedWalk: The CSR structure of neighbours and cumulative transition
+        probabilities.
+    dict: The mapping from nodes to indices.
     """
     nodes = sorted(graph.nodes())
     if len(nodes) < 2:
         raise nx.NetworkXError("network is too small")
     if node2id is None:
         node2id = dict(itertools.izip(nodes, itertools.count()))
-    probabilities = range(len(nodes))
-    neighbours = range(len(nodes))
+    indptr = numpy.zeros(len(nodes) + 1, dtype=numpy.int64)
+    for node in nodes:
+        indptr[node2id[node] + 1] = len(graph[node])
+    numpy.cumsum(indptr, out=indptr)
+    neighbours = numpy.zeros(indptr[-1], dtype=numpy.int64)
+    probabilities = numpy.zeros(indptr[-1], dtype=float)
+    # nodes whose edges all carry the same weight can be sampled directly
+    unweighted = numpy.ones(len(nodes), dtype=bool)
     for node in nodes:
         i = node2id[node]
-        adj = graph[node]
-        out_deg = len(adj)
-        if out_deg == 0:
-            probabilities[i] = list()
-            neighbours[i] = list()
+        start = indptr[i]
+        end = indptr[i + 1]
+        if start == end:
             continue
         prob = 0.0
-        probabilities[i] = numpy.zeros(out_deg, dtype=float)
-        neighbours[i] = numpy.zeros(out_deg, dtype=int)
-        for (j, (nhbr, data)) in enumerate(adj.iteritems()):
-            neighbours[i][j] = node2id[nhbr]
-            prob += data.get(weight, 1.0)
-            probabilities[i][j] = prob
+        first = None
+        for (j, (nhbr, data)) in enumerate(graph[node].iteritems(), start):
+            neighbours[j] = node2id[nhbr]
+            value = data.get(weight, 1.0)
+            if first is None:
+                first = value
+            elif value != first:
+                unweighted[i] = False
+            prob += value
+            probabilities[j] = prob
         # prob is now the sum of all edge weights, normalise to unity
-        probabilities[i] /= prob
-    return (probabilities, neighbours, node2id)
+        probabilities[start:end] /= prob
+    walk = PreparedWalk(indptr, neighbours, probabilities,
+            unweighted=unweighted)
+    if alias:
+        walk.build_alias()
+    return (walk, node2id)
 
-def prepare_directed_walk(graph, input_layer, output_layer, temperature,
-        node2id=None, weight=None):
+def _adjacency_matrix(graph, nodes, node2id, weight=None):
     """
-    Prepare data structures for a directed random walk (see docs).
+    Extract the weighted adjacency matrix in CSR format with rows and columns
+    in the order of node2id.
 
-    Works for undirected as well as directed graphs. For multi-graphs simply
-    provide a suitable edge weight.
+    Iterating over the adjacency once per array is considerably faster than
+    ``nx.to_scipy_sparse_matrix``.
+    """
+    adj = graph.adj
+    indptr = numpy.zeros(len(nodes) + 1, dtype=numpy.int64)
+    indptr[1:] = numpy.fromiter((len(adj[node]) for node in nodes),
+            dtype=numpy.int64, count=len(nodes))
+    numpy.cumsum(indptr, out=indptr)
+    indices = numpy.fromiter((node2id[nhbr] for node in nodes
+            for nhbr in adj[node]), dtype=numpy.int64, count=indptr[-1])
+    if weight is None:
+        weights = numpy.ones(indptr[-1], dtype=float)
+    else:
+        weights = numpy.fromiter((data.get(weight, 1.0) for node in nodes
+                for data in adj[node].itervalues()), dtype=float,
+                count=indptr[-1])
+    return scipy.sparse.csr_matrix((weights, indices, indptr),
+            shape=(len(nodes), len(nodes)))
+
+def prepare_sparse_walk(graph, node2id=None, weight=None, alias=False):
+    """
+    Prepare data structures for a uniform random walk from the sparse
+    adjacency matrix of a graph.
+
+    The result is equivalent to ``prepare_uniform_walk`` but the transition
+    probabilities are computed by array operations which is much faster for
+    large graphs. Neighbours are sorted by index.
 
     Parameters
     ----------
@@ -95,58 +150,266 @@ def prepare_directed_walk(graph, input_layer, output_layer, temperature,
     weight: hashable
         The keyword for edge data that should be used to weigh the propagation
         probability.
+    alias: bool (optional)
+        Build alias tables for sampling the next node in constant time.
+
+    Returns
+    -------
+    PreparedWalk: The CSR structure of neighbours and cumulative transition
+        probabilities.
+    dict: The mapping from nodes to indices.
     """
     nodes = sorted(graph.nodes())
     if len(nodes) < 2:
         raise nx.NetworkXError("network is too small")
     if node2id is None:
         node2id = dict(itertools.izip(nodes, itertools.count()))
-    shortest_paths = nx.shortest_path_length(graph, weight=weight)
-    min_separation = min(shortest_paths[in_node][out_node]\
-                for in_node in input_layer for out_node in output_layer)
-    middle_nodes = set(nodes).difference(input_layer, output_layer)
-    for node in middle_nodes:
-        min_in = min(shortest_paths[node][in_node] for in_node in input_layer)
-        min_out = min(shortest_paths[node][out_node] for out_node in output_layer)
+    else:
+        nodes = sorted(nodes, key=node2id.get)
+    walk = PreparedWalk.from_adjacency(_adjacency_matrix(graph, nodes,
+            node2id, weight))
+    if alias:
+        walk.build_alias()
+    return (walk, node2id)
+
+def prepare_edge_walk(sources, targets, weights=None, num_nodes=None,
+        directed=True, alias=False):
+    """
+    Prepare data structures for a uniform random walk straight from arrays of
+    edges between node indices.
+
+    Parameters
+    ----------
+    sources: array-like
+        The node index at the beginning of each edge.
+    targets: array-like
+        The node index at the end of each edge.
+    weights: array-like (optional)
+        The weight of each edge, all edges weigh one by default.
+    num_nodes: int (optional)
+        The number of nodes N, by default one more than the largest index.
+    directed: bool (optional)
+        Whether edges may only be followed from source to target.
+    alias: bool (optional)
+        Build alias tables for sampling the next node in constant time.
+
+    Returns
+    -------
+    PreparedWalk: The CSR structure of neighbours and cumulative transition
+        probabilities.
+    """
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    targets = numpy.asarray(targets, dtype=numpy.int64)
+    if weights is None:
+        weights = numpy.ones(len(sources), dtype=float)
+    else:
+        weights = numpy.asarray(weights, dtype=float)
+    if num_nodes is None:
+        num_nodes = int(max(sources.max(), targets.max())) + 1
+    if not directed:
+        loops = sources == targets
+        (sources, targets) = (numpy.concatenate((sources, targets[~loops])),
+                numpy.concatenate((targets, sources[~loops])))
+        weights = numpy.concatenate((weights, weights[~loops]))
+    adjacency = scipy.sparse.coo_matrix((weights, (sources, targets)),
+            shape=(num_nodes, num_nodes))
+    walk = PreparedWalk.from_adjacency(adjacency)
+    if alias:
+        walk.build_alias()
+    return walk
+
+def _distances_to(graph, targets, weight=None):
+    """
+    Compute the length of the shortest path from every node to the nearest of
+    the targets by a single breadth-first search (or Dijkstra's algorithm if
+    edges are weighted) that starts from all targets at once.
+
+    Directed graphs are searched against the direction of their edges.
+
+    Returns
+    -------
+    dict: Map from nodes that can reach a target to their distance.
+    """
+    if graph.is_directed():
+        predecessors = graph.pred
+    else:
+        predecessors = graph.adj
+    distance = dict()
+    if weight is None:
+        for node in targets:
+            distance[node] = 0
+        queue = deque(distance)
+        while queue:
+            node = queue.popleft()
+            dist = distance[node] + 1
+            for nhbr in predecessors[node]:
+                if nhbr not in distance:
+                    distance[nhbr] = dist
+                    queue.append(nhbr)
+        return distance
+    heap = [(0, node) for node in set(targets)]
+    heapq.heapify(heap)
+    while heap:
+        (dist, node) = heapq.heappop(heap)
+        if node in distance:
+            continue
+        distance[node] = dist
+        for (nhbr, data) in predecessors[node].iteritems():
+            if nhbr not in distance:
+                heapq.heappush(heap, (dist + data.get(weight, 1), nhbr))
+    return distance
+
+def _directed_coordinates(graph, input_layer, output_layer, weight=None):
+    """
+    Assign each node its distances to the input and output layers and its
+    resulting coordinate along the direction of the walk.
+
+    The results are stored as node attributes "in", "out", and "coord" and
+    are not recomputed for the same layers and weight as long as the number of
+    nodes and edges is unchanged.
+    """
+    key = (frozenset(input_layer), frozenset(output_layer), weight,
+            graph.number_of_nodes(), graph.number_of_edges())
+    if graph.graph.get("directed_coordinates") == key:
+        return
+    to_input = _distances_to(graph, input_layer, weight)
+    to_output = _distances_to(graph, output_layer, weight)
+    missing = set(graph).difference(to_input).union(
+            set(graph).difference(to_output))
+    if missing:
+        raise nx.NetworkXError("%d nodes cannot reach both layers" %
+                len(missing))
+    min_separation = float(min(to_output[in_node] for in_node in input_layer))
+    for node in graph:
+        min_in = to_input[node]
+        min_out = to_output[node]
         graph.node[node]["in"] = min_in
         graph.node[node]["out"] = min_out
         graph.node[node]["coord"] = 0.5 * (
                 1.0 + (min_in / min_separation) - (min_out / min_separation))
-    probabilities = range(len(nodes))
-    neighbours = range(len(nodes))
+    graph.graph["directed_coordinates"] = key
+
+def prepare_directed_walk(graph, input_layer, output_layer, temperature,
+        node2id=None, weight=None, effective=False):
+    """
+    Prepare data structures for a directed random walk (see docs).
+
+    Works for undirected as well as directed graphs. For multi-graphs simply
+    provide a suitable edge weight. The coordinates of nodes are stored as node
+    attributes and reused when only the temperature changes.
+
+    Parameters
+    ----------
+    graph: nx.(Di)Graph
+        The underlying network.
+    input_layer: iterable
+        Nodes at the beginning of the direction of the walk.
+    output_layer: iterable
+        Nodes at the end of the direction of the walk.
+    temperature: float
+        Steps against the direction are accepted with a probability that
+        decays exponentially with the loss in coordinate over the temperature.
+    node2id: dict
+        A mapping from nodes in graph to indices running from 0 to (N - 1).
+    weight: hashable
+        The keyword for edge data that should be used to weigh the propagation
+        probability.
+    effective: bool (optional)
+        Return the equivalent walk with normalised transition probabilities
+        that include the probability of staying at a node (see
+        ``PreparedWalk.effective_walk``). It can be used with all marchers.
+
+    Returns
+    -------
+    PreparedWalk: The CSR structure of neighbours with uniform cumulative
+        proposal probabilities and per edge acceptance probabilities, or the
+        effective walk.
+    dict: The mapping from nodes to indices.
+    """
+    nodes = sorted(graph.nodes())
+    if len(nodes) < 2:
+        raise nx.NetworkXError("network is too small")
+    if node2id is None:
+        node2id = dict(itertools.izip(nodes, itertools.count()))
+    _directed_coordinates(graph, input_layer, output_layer, weight)
+    indptr = numpy.zeros(len(nodes) + 1, dtype=numpy.int64)
+    for node in nodes:
+        indptr[node2id[node] + 1] = len(graph[node])
+    numpy.cumsum(indptr, out=indptr)
+    neighbours = numpy.zeros(indptr[-1], dtype=numpy.int64)
+    uniform = numpy.zeros(indptr[-1], dtype=float)
+    probabilities = numpy.zeros(indptr[-1], dtype=float)
     for node in nodes:
         i = node2id[node]
-        adj = graph[node]
-        out_deg = len(adj)
-        if out_deg == 0:
-            probabilities[i] = list()
-            neighbours[i] = list()
+        start = indptr[i]
+        end = indptr[i + 1]
+        if start == end:
             continue
-        probabilities[i] = numpy.zeros(out_deg, dtype=float)
-        neighbours[i] = numpy.zeros(out_deg, dtype=int)
-        for (j, (nhbr, data)) in enumerate(adj.iteritems()):
-            neigh = node2id[nhbr]
-            neighbours[i][j] = neigh
-            coord_diff = graph.node[neigh] - graph.node[node]
+        # neighbours are proposed uniformly and accepted with a probability
+        uniform[start:end] = numpy.arange(1, end - start + 1,
+                dtype=float) / float(end - start)
+        coord = graph.node[node]["coord"]
+        for (j, nhbr) in enumerate(graph[node], start):
+            neighbours[j] = node2id[nhbr]
+            coord_diff = graph.node[nhbr]["coord"] - coord
             if coord_diff > 0.0:
-                probabilities[i][j] = 1.0
+                probabilities[j] = 1.0
             else:
-                probabilities[i][j] = numpy.exp(coord_diff / temperature)
-    return (probabilities, neighbours, node2id)
+                probabilities[j] = numpy.exp(coord_diff / temperature)
+    walk = PreparedWalk(indptr, neighbours, uniform, acceptance=probabilities)
+    if effective:
+        walk = walk.effective_walk()
+    return (walk, node2id)
+
+def iter_march(walk, sources, num_walkers, time_points,
+        steps, assessor=ConstantValue(), transient=0, seed=None,
+        compiled=False):
+    """
+    Generate the results of ``march`` one time point at a time.
+
+    The arguments are those of ``march``. Yields tuples of the time point
+    and the activity at each node. The arrays are reused for the next time
+    point and need to be copied if they are kept.
+    """
+    if compiled and kernels.NUMBA_AVAILABLE:
+        for item in kernels.iter_march(walk, sources, num_walkers, time_points,
+                steps, assessor, transient, seed):
+            yield item
+        return
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    blocks = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, blocks)
+    sources = numpy.asarray(sources)
+    choose = walk.sampler()
+    value = assessor_lookup(assessor, len(walk))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    for time in xrange(time_points):
+        curr_visits.fill(0.0)
+        curr_num = num_walkers()
+        for node in sources[blocks.integers(len(sources), curr_num)]:
+            if transient == 0:
+                curr_visits[node] += value(node)
+            for (s, draw) in enumerate(blocks.uniform(steps)):
+                node = choose(node, draw)
+                if node < 0:
+                    break
+                if s > transient:
+                    curr_visits[node] += value(node)
+        yield (time, curr_visits)
 
-def march(neighbours, probabilities, sources, num_walkers, time_points,
-        steps, assessor=ConstantValue(), transient=0, seed=None):
+def march(walk, sources, num_walkers, time_points,
+        steps, assessor=ConstantValue(), transient=0, seed=None,
+        compiled=False, sink=None, quiet=False):
     """
     Start a number of random walks on the given network for a number of time
     points. Records the activity at visited nodes.
 
     Parameters
     ----------
-    neighbours: list of lists
-        Adjacency list structure as returned by prepare_uniform_walk.
-    probabilities: list of lists
-        Transition probabilities list structure as returned by
-        prepare_uniform_walk.
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
     sources: list
         List of valid starting node indices.
     num_walkers: callable
@@ -161,60 +424,149 @@ def march(neighbours, probabilities, sources, num_walkers, time_points,
     transient: int (optional)
         Cut-off the first transient steps of each random walk.
     seed: (optional)
-        A valid seed for numpy.random that makes runs deterministic.
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic.
+    compiled: bool (optional)
+        Use the compiled kernels in ``foggy.kernels`` if numba is available.
+        Results are identical for the same seed provided that the value of a
+        visit only depends on the node.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+    quiet: bool (optional)
+        Do not report the progress on standard output.
 
     Returns
     -------
     An array of dimensions number of nodes N x number of time points T that
     records the activity at each node per time point.
 
+    """
+    return record(iter_march(walk, sources, num_walkers, time_points, steps,
+            assessor, transient, seed, compiled), ["visits"], (len(walk),
+            int(time_points)), [float], sink, quiet)[0]
+
+def _lockstep_counts(walk, nodes, steps, transient, blocks, alive,
+        inclusive=False):
+    """
+    Advance walkers from the given nodes together and count the visits at each
+    node following the rules of ``march``.
+
+    Parameters
+    ----------
+    inclusive: bool (optional)
+        Instead count all visits from the transient-th step on, as in
+        ``foggy.parallel``.
+
+    Returns
+    -------
+    numpy.array: The number of counted visits at each node.
+    """
+    # step s reaches the (s + 1)-th node of the path
+    first = transient - 1 if inclusive else transient + 1
+    num_nodes = len(walk)
+    counts = numpy.zeros(num_nodes, dtype=numpy.int64)
+    # visited nodes are collected and counted once they outnumber the nodes
+    pending = list()
+    num_pending = 0
+    if transient == 0:
+        pending.append(nodes)
+        num_pending += len(nodes)
+    for s in xrange(steps):
+        nodes = nodes[alive[nodes]]
+        if len(nodes) == 0:
+            break
+        nodes = walk.sample(nodes, blocks.uniform(len(nodes)))
+        if s >= first:
+            pending.append(nodes)
+            num_pending += len(nodes)
+        if num_pending >= num_nodes:
+            counts += numpy.bincount(numpy.concatenate(pending),
+                    minlength=num_nodes)
+            pending = list()
+            num_pending = 0
+    if num_pending > 0:
+        counts += numpy.bincount(numpy.concatenate(pending),
+                minlength=num_nodes)
+    return counts
+
+def _lockstep_paths(walk, nodes, remaining, blocks, alive):
+    """
+    Advance walkers from the given nodes together and record their paths.
+
+    Parameters
+    ----------
+    remaining: numpy.array
+        The maximum number of steps of each walker.
+
+    Returns
+    -------
+    numpy.array: The concatenated paths, each starting with its source.
+    numpy.array: Offsets of the paths of length number of walkers + 1.
+    """
+    num = len(nodes)
+    width = int(remaining.max()) + 1 if num > 0 else 1
+    positions = numpy.empty((num, width), dtype=walk.indices.dtype)
+    positions.fill(-1)
+    positions[:, 0] = nodes
+    active = numpy.arange(num)
+    for s in xrange(width - 1):
+        active = active[alive[nodes] & (remaining[active] > s)]
+        if len(active) == 0:
+            break
+        nodes = walk.sample(positions[active, s], blocks.uniform(len(active)))
+        positions[active, s + 1] = nodes
+    # walkers never return from a dead end so rows are filled left to right
+    mask = positions >= 0
+    offsets = numpy.zeros(num + 1, dtype=numpy.int64)
+    numpy.cumsum(mask.sum(axis=1), out=offsets[1:])
+    return (positions[mask], offsets)
+
+def iter_lockstep_march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, seed=None):
+    """
+    Generate the results of ``lockstep_march`` one time point at a time.
+
+    The arguments are those of ``lockstep_march``. Yields tuples of the
+    time point and the activity at each node. The arrays are reused for the
+    next time point and need to be copied if they are kept.
     """
     time_points = int(time_points)
     steps = int(steps)
     transient = int(transient)
-    numpy.random.seed(seed)
-    rand_int = numpy.random.randint
-    smpl = numpy.random.random_sample
-    choose = numpy.searchsorted
-    visits = numpy.zeros(shape=(len(neighbours), time_points), dtype=float)
-    sys.stdout.write("\r{0:7.2%} complete".format(0.0))
-    sys.stdout.flush()
-    time_norm = float(time_points)
+    blocks = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, blocks)
+    num_nodes = len(walk)
+    sources = numpy.asarray(sources, dtype=walk.indices.dtype)
+    constant = constant_value(assessor)
+    values = assessor_values(assessor, num_nodes)
+    alive = walk.degree > 0
+    curr_visits = numpy.zeros(num_nodes, dtype=float)
     for time in xrange(time_points):
-        curr_visits = visits[:, time]
-        curr_num = num_walkers()
-        for i in xrange(curr_num):
-            node = sources[rand_int(len(sources))]
-            if transient == 0:
-                curr_visits[node] += assessor(node)
-            for s in xrange(steps):
-                nbrs = neighbours[node]
-                if len(nbrs) == 0:
-                    break
-                draw = smpl()
-                node = nbrs[choose(probabilities[node], draw)]
-                if s > transient:
-                    curr_visits[node] += assessor(node)
-        sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-        sys.stdout.flush()
-    sys.stdout.write("\r{0:7.2%} complete".format(1.0))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
-    return visits
+        nodes = sources[blocks.integers(len(sources), num_walkers())]
+        counts = _lockstep_counts(walk, nodes, steps, transient, blocks, alive)
+        if constant is None:
+            numpy.multiply(counts, values, out=curr_visits)
+        else:
+            numpy.multiply(counts, constant, out=curr_visits)
+        yield (time, curr_visits)
 
-def deletory_march(neighbours, probabilities, sources, num_walkers, time_points,
-        steps, capacity, assessor=ConstantValue(), transient=0, seed=None):
+def lockstep_march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, seed=None, sink=None,
+        quiet=False):
     """
     Start a number of random walks on the given network for a number of time
     points. Records the activity at visited nodes.
 
+    In contrast to ``march`` all walkers of a time point advance together such
+    that each step is a handful of array operations. The results follow the
+    same distribution.
+
     Parameters
     ----------
-    neighbours: list of lists
-        Adjacency list structure as returned by prepare_uniform_walk.
-    probabilities: list of lists
-        Transition probabilities list structure as returned by
-        prepare_uniform_walk.
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
     sources: list
         List of valid starting node indices.
     num_walkers: callable
@@ -223,75 +575,209 @@ def deletory_march(neighbours, probabilities, sources, num_walkers, time_points,
         Number of experiments to measure activity for.
     steps: int
         The maximum number of steps for each individual random walker.
-    capacity: list or dict
-        Contains maximum capacity of nodes at their respective index.
     assessor: callable (optional)
         Called with the node index as argument, it should return the activity
-        value of a visit.
+        value of a visit. The value may only depend on the node (see
+        ``assessor_values``).
     transient: int (optional)
         Cut-off the first transient steps of each random walk.
     seed: (optional)
-        A valid seed for numpy.random that makes runs deterministic.
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+    quiet: bool (optional)
+        Do not report the progress on standard output.
 
     Returns
     -------
     An array of dimensions number of nodes N x number of time points T that
-    records the activity at each node per time point. An array of equal
-    dimension that measures the number of removed walkers.
+    records the activity at each node per time point.
+    """
+    return record(iter_lockstep_march(walk, sources, num_walkers, time_points,
+            steps, assessor, transient, seed), ["visits"], (len(walk),
+            int(time_points)), [float], sink, quiet)[0]
+
+def _spread(walk, probs, nodes, occupancy, blocks, threshold):
+    """
+    Move all walkers one step and return the new occupancy of the nodes.
+    """
+    num_nodes = len(walk)
+    # few walkers on a node are moved individually, many by a single draw
+    few = occupancy < threshold
+    movers = numpy.repeat(nodes[few], occupancy[few])
+    result = numpy.bincount(walk.sample(movers, blocks.uniform(len(movers))),
+            minlength=num_nodes)
+    many = numpy.flatnonzero(~few)
+    if len(many) == 0:
+        return result
+    targets = list()
+    counts = list()
+    for (node, num) in itertools.izip(nodes[many], occupancy[many]):
+        start = walk.indptr[node]
+        end = walk.indptr[node + 1]
+        targets.append(walk.indices[start:end])
+        counts.append(blocks.rng.multinomial(num, probs[start:end]))
+    result += numpy.bincount(numpy.concatenate(targets),
+            weights=numpy.concatenate(counts),
+            minlength=num_nodes).astype(result.dtype)
+    return result
+
+def iter_multinomial_march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, seed=None, threshold=32):
+    """
+    Generate the results of ``multinomial_march`` one time point at a time.
+
+    The arguments are those of ``multinomial_march``. Yields tuples of the
+    time point and the activity at each node. The arrays are reused for the
+    next time point and need to be copied if they are kept.
+    """
+    time_points = int(time_points)
+    steps = int(steps)
+    transient = int(transient)
+    blocks = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, blocks)
+    num_nodes = len(walk)
+    sources = numpy.asarray(sources, dtype=walk.indices.dtype)
+    constant = constant_value(assessor)
+    values = assessor_values(assessor, num_nodes)
+    probs = walk.transition_probabilities()
+    alive = walk.degree > 0
+    curr_visits = numpy.zeros(num_nodes, dtype=float)
+    for time in xrange(time_points):
+        occupancy = numpy.bincount(sources[blocks.integers(len(sources),
+                num_walkers())], minlength=num_nodes)
+        counts = numpy.zeros(num_nodes, dtype=numpy.int64)
+        if transient == 0:
+            counts += occupancy
+        for s in xrange(steps):
+            # walkers stop at dead ends
+            nodes = numpy.flatnonzero(occupancy * alive)
+            if len(nodes) == 0:
+                break
+            occupancy = _spread(walk, probs, nodes, occupancy[nodes], blocks,
+                    threshold)
+            if s > transient:
+                counts += occupancy
+        if constant is None:
+            numpy.multiply(counts, values, out=curr_visits)
+        else:
+            numpy.multiply(counts, constant, out=curr_visits)
+        yield (time, curr_visits)
+
+def multinomial_march(walk, sources, num_walkers, time_points, steps,
+        assessor=ConstantValue(), transient=0, seed=None, threshold=32,
+        sink=None, quiet=False):
+    """
+    Start a number of random walks on the given network for a number of time
+    points. Records the activity at visited nodes.
+
+    Since the walkers do not interact, only the number of walkers on each node
+    is tracked. In each step the walkers on a node are distributed among its
+    neighbours by a single multinomial draw, the cost thus scales with the
+    number of occupied nodes rather than the number of walkers. The results
+    follow the same distribution as those of ``march``.
+
+    Parameters
+    ----------
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: callable
+        A callable that returns an integer z >= 0.
+    time_points: int
+        Number of experiments to measure activity for.
+    steps: int
+        The maximum number of steps for each individual random walker.
+    assessor: callable (optional)
+        Called with the node index as argument, it should return the activity
+        value of a visit. The value may only depend on the node (see
+        ``assessor_values``).
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic.
+    threshold: int (optional)
+        Nodes occupied by fewer walkers move them individually.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+    quiet: bool (optional)
+        Do not report the progress on standard output.
+
+    Returns
+    -------
+    An array of dimensions number of nodes N x number of time points T that
+    records the activity at each node per time point.
+    """
+    return record(iter_multinomial_march(walk, sources, num_walkers,
+            time_points, steps, assessor, transient, seed, threshold),
+            ["visits"], (len(walk), int(time_points)), [float], sink,
+            quiet)[0]
+
+def iter_deletory_march(walk, sources, num_walkers, time_points,
+        steps, capacity, assessor=ConstantValue(), transient=0, seed=None,
+        compiled=False):
     """
+    Generate the results of ``deletory_march`` one time point at a time.
+
+    The arguments are those of ``deletory_march``. Yields tuples of the
+    time point and the activity and the number of removed walkers at each
+    node. The arrays are reused for the next time point and need to be
+    copied if they are kept.
+    """
+    if compiled and kernels.NUMBA_AVAILABLE:
+        for item in kernels.iter_deletory_march(walk, sources, num_walkers,
+                time_points, steps, capacity, assessor, transient, seed):
+            yield item
+        return
     time_points = int(time_points)
     steps = int(steps)
     transient = int(transient)
-    numpy.random.seed(seed)
-    rand_int = numpy.random.randint
-    smpl = numpy.random.random_sample
-    choose = numpy.searchsorted
-    visits = numpy.zeros(shape=(len(neighbours), time_points), dtype=float)
-    removed = numpy.zeros(shape=(len(neighbours), time_points), dtype=int)
-    sys.stdout.write("\r{0:7.2%} complete".format(0.0))
-    sys.stdout.flush()
-    time_norm = float(time_points)
+    blocks = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, blocks)
+    sources = numpy.asarray(sources)
+    choose = walk.sampler()
+    value = assessor_lookup(assessor, len(walk))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    curr_removed = numpy.zeros(len(walk), dtype=int)
     for time in xrange(time_points):
-        curr_visits = visits[:, time]
+        curr_visits.fill(0.0)
+        curr_removed.fill(0)
         curr_num = num_walkers()
-        for _ in xrange(curr_num):
-            node = sources[rand_int(len(sources))]
+        for node in sources[blocks.integers(len(sources), curr_num)]:
             if curr_visits[node] >= capacity[node]:
-                removed[node, time] += 1
+                curr_removed[node] += 1
                 continue
             if transient == 0:
-                curr_visits[node] += assessor(node)
-            for s in xrange(steps):
-                nbrs = neighbours[node]
-                if len(nbrs) == 0:
+                curr_visits[node] += value(node)
+            for (s, draw) in enumerate(blocks.uniform(steps)):
+                node = choose(node, draw)
+                if node < 0:
                     break
-                draw = smpl()
-                node = nbrs[choose(probabilities[node], draw)]
                 if curr_visits[node] >= capacity[node]:
-                    removed[node, time] += 1
+                    curr_removed[node] += 1
                     break
                 if s > transient:
-                    curr_visits[node] += assessor(node)
-        sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-        sys.stdout.flush()
-    sys.stdout.write("\r{0:7.2%} complete".format(1.0))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
-    return (visits, removed)
+                    curr_visits[node] += value(node)
+        yield (time, curr_visits, curr_removed)
 
-def buffered_march(neighbours, probabilities, sources, num_walkers, time_points,
-        steps, capacity, assessor=ConstantValue(), transient=0, seed=None):
+def deletory_march(walk, sources, num_walkers, time_points,
+        steps, capacity, assessor=ConstantValue(), transient=0, seed=None,
+        compiled=False, sink=None, quiet=False):
     """
     Start a number of random walks on the given network for a number of time
     points. Records the activity at visited nodes.
 
     Parameters
     ----------
-    neighbours: list of lists
-        Adjacency list structure as returned by prepare_uniform_walk.
-    probabilities: list of lists
-        Transition probabilities list structure as returned by
-        prepare_uniform_walk.
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
     sources: list
         List of valid starting node indices.
     num_walkers: callable
@@ -308,76 +794,154 @@ def buffered_march(neighbours, probabilities, sources, num_walkers, time_points,
     transient: int (optional)
         Cut-off the first transient steps of each random walk.
     seed: (optional)
-        A valid seed for numpy.random that makes runs deterministic.
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic.
+    compiled: bool (optional)
+        Use the compiled kernels in ``foggy.kernels`` if numba is available.
+        Results are identical for the same seed provided that the value of a
+        visit only depends on the node.
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+    quiet: bool (optional)
+        Do not report the progress on standard output.
 
     Returns
     -------
     An array of dimensions number of nodes N x number of time points T that
     records the activity at each node per time point. An array of equal
-    dimension that measures the number of stored walkers.
+    dimension that measures the number of removed walkers.
     """
+    return record(iter_deletory_march(walk, sources, num_walkers, time_points,
+            steps, capacity, assessor, transient, seed, compiled),
+            ["visits", "removed"], (len(walk), int(time_points)), [float, int],
+            sink, quiet)
+
+def iter_buffered_march(walk, sources, num_walkers, time_points,
+        steps, capacity, assessor=ConstantValue(), transient=0, seed=None,
+        compiled=False, backlog_bytes=None):
+    """
+    Generate the results of ``buffered_march`` one time point at a time.
+
+    The arguments are those of ``buffered_march``. Yields tuples of the
+    time point and the activity and the number of stored walkers at each
+    node. The arrays are reused for the next time point and need to be
+    copied if they are kept.
+    """
+    if compiled and kernels.NUMBA_AVAILABLE:
+        for item in kernels.iter_buffered_march(walk, sources, num_walkers,
+                time_points, steps, capacity, assessor, transient, seed):
+            yield item
+        return
     time_points = int(time_points)
     steps = int(steps)
     transient = int(transient)
-    numpy.random.seed(seed)
-    rand_int = numpy.random.randint
-    smpl = numpy.random.random_sample
-    choose = numpy.searchsorted
-    visits = numpy.zeros(shape=(len(neighbours), time_points), dtype=float)
-    backlog = numpy.zeros(shape=(len(neighbours), time_points), dtype=int)
-    sys.stdout.write("\r{0:7.2%} complete".format(0.0))
-    sys.stdout.flush()
-    time_norm = float(time_points)
-    store = deque()
-    for time in xrange(time_points):
-        curr_visits = visits[:, time]
-        curr_num = num_walkers()
-        today_store = len(store)
-        for _ in xrange(today_store):
-            (node, performed) = store.pop()
-            if curr_visits[node] >= capacity[node]:
-                backlog[node, time] += 1
-                store.appendleft((node, performed))
-                continue
-            if performed > transient:
-                curr_visits[node] += assessor(node)
-            for s in xrange(steps - performed):
-                nbrs = neighbours[node]
-                if len(nbrs) == 0:
-                    break
-                draw = smpl()
-                node = nbrs[choose(probabilities[node], draw)]
-                performed += 1
+    blocks = RandomBlocks(seed)
+    num_walkers = walker_counts(num_walkers, blocks)
+    sources = numpy.asarray(sources)
+    choose = walk.sampler()
+    value = assessor_lookup(assessor, len(walk))
+    curr_visits = numpy.zeros(len(walk), dtype=float)
+    curr_backlog = numpy.zeros(len(walk), dtype=int)
+    store = WalkerStore(max_bytes=backlog_bytes)
+    try:
+        for time in xrange(time_points):
+            curr_visits.fill(0.0)
+            curr_backlog.fill(0)
+            curr_num = num_walkers()
+            (store_nodes, store_performed, _, _) = store.drain()
+            for (node, performed) in itertools.izip(store_nodes.tolist(),
+                    store_performed.tolist()):
                 if curr_visits[node] >= capacity[node]:
-                    backlog[node, time] += 1
-                    store.appendleft((node, performed))
-                    break
+                    curr_backlog[node] += 1
+                    store.append(node, performed)
+                    continue
                 if performed > transient:
-                    curr_visits[node] += assessor(node)
-        for _ in xrange(curr_num):
-            node = sources[rand_int(len(sources))]
-            if curr_visits[node] >= capacity[node]:
-                backlog[node, time] += 1
-                store.appendleft((node, 0))
-                continue
-            if transient == 0:
-                curr_visits[node] += assessor(node)
-            for s in xrange(steps):
-                nbrs = neighbours[node]
-                if len(nbrs) == 0:
-                    break
-                draw = smpl()
-                node = nbrs[choose(probabilities[node], draw)]
+                    curr_visits[node] += value(node)
+                for draw in blocks.uniform(steps - performed):
+                    node = choose(node, draw)
+                    if node < 0:
+                        break
+                    performed += 1
+                    if curr_visits[node] >= capacity[node]:
+                        curr_backlog[node] += 1
+                        store.append(node, performed)
+                        break
+                    if performed > transient:
+                        curr_visits[node] += value(node)
+            for node in sources[blocks.integers(len(sources), curr_num)]:
                 if curr_visits[node] >= capacity[node]:
-                    backlog[node, time] += 1
-                    store.appendleft((node, s + 1))
-                    break
-                if s > transient:
-                    curr_visits[node] += assessor(node)
-        sys.stdout.write("\r{0:7.2%} complete".format(time / time_norm))
-        sys.stdout.flush()
-    sys.stdout.write("\r{0:7.2%} complete".format(1.0))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
-    return (visits, backlog)
+                    curr_backlog[node] += 1
+                    store.append(node, 0)
+                    continue
+                if transient == 0:
+                    curr_visits[node] += value(node)
+                for (s, draw) in enumerate(blocks.uniform(steps)):
+                    node = choose(node, draw)
+                    if node < 0:
+                        break
+                    if curr_visits[node] >= capacity[node]:
+                        curr_backlog[node] += 1
+                        store.append(node, s + 1)
+                        break
+                    if s > transient:
+                        curr_visits[node] += value(node)
+            yield (time, curr_visits, curr_backlog)
+    finally:
+        store.close()
+
+def buffered_march(walk, sources, num_walkers, time_points,
+        steps, capacity, assessor=ConstantValue(), transient=0, seed=None,
+        compiled=False, backlog_bytes=None, sink=None, quiet=False):
+    """
+    Start a number of random walks on the given network for a number of time
+    points. Records the activity at visited nodes.
+
+    Parameters
+    ----------
+    walk: PreparedWalk
+        CSR walk structure as returned by prepare_uniform_walk.
+    sources: list
+        List of valid starting node indices.
+    num_walkers: callable
+        A callable that returns an integer z >= 0.
+    time_points: int
+        Number of experiments to measure activity for.
+    steps: int
+        The maximum number of steps for each individual random walker.
+    capacity: list or dict
+        Contains maximum capacity of nodes at their respective index.
+    assessor: callable (optional)
+        Called with the node index as argument, it should return the activity
+        value of a visit.
+    transient: int (optional)
+        Cut-off the first transient steps of each random walk.
+    seed: (optional)
+        A valid seed or generator (see ``random_generator``) that makes runs
+        deterministic.
+    compiled: bool (optional)
+        Use the compiled kernels in ``foggy.kernels`` if numba is available.
+        Results are identical for the same seed provided that the value of a
+        visit only depends on the node.
+    backlog_bytes: int (optional)
+        Memory budget of the stored walkers beyond which they are kept on disk
+        (see ``WalkerStore``).
+    sink: (optional)
+        Receives the columns of the results as soon as a time point is
+        complete, e.g., a ``MemmapSink`` or ``foggy.hdf5.HDF5Sink``, and
+        creates the returned arrays. By default they are kept in memory.
+    quiet: bool (optional)
+        Do not report the progress on standard output.
+
+    Returns
+    -------
+    An array of dimensions number of nodes N x number of time points T that
+    records the activity at each node per time point. An array of equal
+    dimension that measures the number of stored walkers.
+    """
+    return record(iter_buffered_march(walk, sources, num_walkers, time_points,
+            steps, capacity, assessor, transient, seed, compiled,
+            backlog_bytes), ["visits", "backlog"], (len(walk),
+            int(time_points)), [float, int], sink, quiet)
 
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+
+import logging
+import argparse
+import timeit
+
+import numpy
+import networkx as nx
+
+import foggy
+
+
+logging.basicConfig()
+LOGGER = logging.getLogger()
+LOGGER.setLevel(logging.INFO)
+
+
+###############################################################################
+# Benchmarks
+###############################################################################
+
+
+def sampling(args):
+    graph = nx.barabasi_albert_graph(args.nodes, args.edges, seed=args.seed)
+    for (u, v, data) in graph.edges_iter(data=True):
+        data["weight"] = numpy.random.random_sample()
+    start = timeit.default_timer()
+    (walk, indices) = foggy.prepare_uniform_walk(graph, weight="weight",
+            alias=True)
+    LOGGER.info("preparation with alias tables: %.3G s",
+            timeit.default_timer() - start)
+    LOGGER.info("maximum degree: %d", walk.degree.max())
+    nodes = numpy.random.randint(len(walk), size=args.draws)
+    draws = numpy.random.random_sample(args.draws)
+    for method in ["cumulative", "alias"]:
+        choose = walk.sampler(method)
+        start = timeit.default_timer()
+        for (node, draw) in zip(nodes, draws):
+            choose(node, draw)
+        LOGGER.info("%s sampling: %.3G s per %d draws", method,
+                timeit.default_timer() - start, args.draws)
+    start = timeit.default_timer()
+    walk.sample(nodes, draws)
+    LOGGER.info("vectorised alias sampling: %.3G s per %d draws",
+            timeit.default_timer() - start, args.draws)
+    walk.alias_prob = None
+    walk.alias_index = None
+    start = timeit.default_timer()
+    walk.sample(nodes, draws)
+    LOGGER.info("vectorised cumulative sampling: %.3G s per %d draws",
+            timeit.default_timer() - start, args.draws)
+
+
+###############################################################################
+# Main
+###############################################################################
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=None)
+    parser.add_argument("-n", "--nodes", dest="nodes", type=int, default=10000,
+            help="number of nodes in the test graph (default: %(default)d)")
+    parser.add_argument("-m", "--edges", dest="edges", type=int, default=3,
+            help="number of edges added per node (default: %(default)d)")
+    parser.add_argument("-s", "--seed", dest="seed", type=int, default=None,
+            help="seed for the graph generation (default: %(default)s)")
+    subparsers = parser.add_subparsers(help="sub-command help")
+# sampling
+    parser_s = subparsers.add_parser("sampling",
+            help="compare methods for selecting the next node")
+    parser_s.add_argument("-d", "--draws", dest="draws", type=int,
+            default=1000000, help="number of draws (default: %(default)d)")
+    parser_s.set_defaults(func=sampling)
+    args = parser.parse_args()
+    args.func(args)
+
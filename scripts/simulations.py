@@ -138,8 +138,8 @@ class BeanMuncher(object):
         LOGGER.info("    %d component(s)", nx.number_connected_components(graph))
 
     def uniform_capacity(graph, indices, walkers, num_steps):
-        capacity = numpy.zeros(len(graph), dtype=float)
-        capacity += float(walkers.mid_point * num_steps) / float(len(graph))
+        capacity = numpy.zeros(len(indices), dtype=float)
+        capacity += float(walkers.mid_point * num_steps) / float(len(indices))
         return capacity
 
     def degree_capacity(graph, indices, walkers, num_steps):
@@ -155,13 +155,12 @@ class BeanMuncher(object):
             "degree" : degree_capacity
     }
 
-    def _run(self, config, description, net, nbrs, probs, indices, walkers,
+    def _run(self, config, description, net, walk, indices, walkers,
             num_steps, visits, seed=None):
         job_descr = dict()
         job_descr["parameters"] = description
         job_descr["simulation"] = self._type[config["walk_type"]]
-        job_descr["neighbours"] = nbrs
-        job_descr["probabilities"] = probs
+        job_descr["walk"] = walk
         job_descr["sources"] = indices.values()
         job_descr["num_walkers"] = walkers
         job_descr["time_points"] = config["time_points"]
@@ -171,14 +170,13 @@ class BeanMuncher(object):
         job_descr["seed"] = seed
         job_descr["capacity"] = None
 
-    def _capacity_run(self, config, description, net, nbrs, probs, indices, walkers,
+    def _capacity_run(self, config, description, net, walk, indices, walkers,
             num_steps, visits, seed=None):
         description["sim_id"] = str(uuid4()).replace("-", "")
         job_descr = dict()
         job_descr["parameters"] = description
         job_descr["simulation"] = self._type[config["walk_type"]]
-        job_descr["neighbours"] = nbrs
-        job_descr["probabilities"] = probs
+        job_descr["walk"] = walk
         job_descr["sources"] = indices.values()
         job_descr["num_walkers"] = walkers
         job_descr["time_points"] = config["time_points"]
@@ -194,15 +192,16 @@ class BeanMuncher(object):
         "buffered": _capacity_run
     }
 
-    def __init__(self, bean_queue, encoding="utf-8", **kw_args):
+    def __init__(self, bean_queue, encoding="utf-8", cache_dir=None, **kw_args):
         """
         Warning
         -------
         bean_queue must be using the right tube!
         """
-        super(JSONBeanShooter, self).__init__(**kw_args)
+        super(BeanMuncher, self).__init__(**kw_args)
         self.queue = bean_queue
         self.encoding = encoding
+        self.cache = None if cache_dir is None else foggy.WalkCache(cache_dir)
 
     def __call__(self, filename):
         config = json.load(codecs.open(filename, encoding=self.encoding,
@@ -221,25 +220,39 @@ class BeanMuncher(object):
         description["visit_value"] = config["visit_value"]
         description["capacity"] = config["capacity"]
         description["transient"] = config["transient"]
+        cache = self.cache
+        if "cache_dir" in config:
+            cache = foggy.WalkCache(config["cache_dir"])
         for (path, net_type) in izip(config["graphs_dir"], config["graphs_type"]):
-            graphs = [nx.read_gpickle(net_file) for net_file in glob(os.path.join(path, "*.pkl"))]
-            LOGGER.debug("%d graphs found", len(graphs))
-            for net in graphs:
-                description["graph_name"] = net.name
+            net_files = glob(os.path.join(path, "*.pkl"))
+            LOGGER.debug("%d graphs found", len(net_files))
+            for net_file in net_files:
+                description["graph_file"] = net_file
                 description["graph_type"] = net_type
+                if cache is None:
+                    net = nx.read_gpickle(net_file)
+                    (walk, indices) = setup(net)
+                    name = net.name
+                else:
+                    # the pickle is only read on a cache miss
+                    net = None
+                    (walk, indices, name) = cache.prepare(net_file, setup)
+                    if config["capacity"] == "degree" or name is None:
+                        net = nx.read_gpickle(net_file)
+                        name = net.name
+                description["graph_name"] = name
 #                self.graph_info(net)
-                (probs, nbrs, indices) = setup(net)
                 for kw in config["walker_factors"]:
                     description["walker_factor"] = kw
-                    num_walkers = len(net) * kw
+                    num_walkers = len(walk) * kw
                     for var in config["variation_factors"]:
                         description["variation_factor"] = var
                         walkers = distribution(num_walkers, num_walkers * var)
                         for ks in config["steps_factors"]:
                             description["steps_factor"] = ks
-                            num_steps = len(net) * ks
+                            num_steps = len(walk) * ks
                             for _ in range(config["repetition"]):
-                                simulation(config, description, net, nbrs, probs, indices,
+                                simulation(config, description, net, walk, indices,
                                     walkers, num_steps, visits, seed=None)
 
 
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+======================
+Analytic Model Testing
+======================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-04-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    test_analytic.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+import unittest
+
+import numpy
+import networkx as nx
+
+from foggy import analytic
+from foggy.distributions import UniformInterval
+from foggy.utils import internal_dynamics_external_fluctuations
+from foggy.walkers import prepare_uniform_walk, march
+
+
+class TestWalkerMoments(unittest.TestCase):
+
+    def test_distribution(self):
+        self.assertEqual(analytic.walker_moments(UniformInterval(30, 0)),
+                (30.0, 0.0))
+        (mean, variance) = analytic.walker_moments(UniformInterval(30, 10))
+        self.assertEqual(mean, 30.0)
+        self.assertTrue(variance > 0.0)
+
+    def test_number(self):
+        self.assertEqual(analytic.walker_moments(12), (12.0, 0.0))
+
+    def test_callable(self):
+        self.assertRaises(ValueError, analytic.walker_moments, lambda: 12)
+
+
+class TestExpectedActivity(unittest.TestCase):
+
+    def setUp(self):
+        graph = nx.barabasi_albert_graph(20, 2, seed=3)
+        (self.walk, _) = prepare_uniform_walk(graph)
+        self.sources = range(len(self.walk))
+
+    def test_simulation(self):
+        expected = analytic.expected_activity(self.walk, self.sources,
+                UniformInterval(30, 10), 8)
+        activity = march(self.walk, self.sources, UniformInterval(30, 10),
+                4000, 8, seed=2, quiet=True)
+        simulated = (activity.mean(axis=1), activity.std(axis=1, ddof=1)) +\
+                internal_dynamics_external_fluctuations(activity)
+        for (one, other) in zip(expected, simulated):
+            self.assertTrue(numpy.allclose(one, other, rtol=0.05))
+
+    def test_probes(self):
+        exact = analytic.expected_activity(self.walk, self.sources, 30, 8)
+        estimate = analytic.expected_activity(self.walk, self.sources, 30, 8,
+                probes=2000, seed=1)
+        self.assertTrue(numpy.allclose(exact[0], estimate[0]))
+        self.assertTrue(numpy.allclose(exact[1], estimate[1], rtol=0.1))
+
+    def test_max_exact(self):
+        self.assertRaises(ValueError, analytic.expected_activity, self.walk,
+                self.sources, 30, 8, max_exact=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+==================
+Walk Cache Testing
+==================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-04-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    test_cache.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+import networkx as nx
+
+from foggy.cache import WalkCache
+from foggy.walkers import prepare_uniform_walk
+
+
+class TestWalkCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = WalkCache(os.path.join(self.directory, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def round_trip(self, graph):
+        filename = os.path.join(self.directory, "graph.pkl")
+        nx.write_gpickle(graph, filename)
+        # the order of neighbours may change when the graph is unpickled
+        (walk, node2id) = prepare_uniform_walk(nx.read_gpickle(filename))
+        # the first call prepares and stores, the second one loads
+        for _ in range(2):
+            (cached, indices, name) = self.cache.prepare(filename,
+                    prepare_uniform_walk)
+            self.assertEqual(indices, node2id)
+            self.assertEqual(name, graph.name)
+            for attr in ("indptr", "indices", "cumprob"):
+                self.assertTrue(numpy.array_equal(getattr(cached, attr),
+                        getattr(walk, attr)))
+
+    def test_integer_nodes(self):
+        self.round_trip(nx.barabasi_albert_graph(50, 2, seed=1))
+
+    def test_tuple_nodes(self):
+        self.round_trip(nx.grid_2d_graph(5, 4))
+
+    def test_string_nodes(self):
+        self.round_trip(nx.relabel_nodes(nx.path_graph(6),
+                dict((i, str(i)) for i in range(6))))
+
+    def test_stale_tuple_entry(self):
+        graph = nx.grid_2d_graph(3, 3)
+        (walk, node2id) = prepare_uniform_walk(graph)
+        self.cache.store("stale", walk, node2id)
+        # the layout of earlier versions that cannot be restored
+        path = os.path.join(self.cache.directory, "stale")
+        os.remove(os.path.join(path, "nodes.pkl"))
+        numpy.save(os.path.join(path, "nodes.npy"),
+                numpy.asarray(sorted(node2id, key=node2id.get)))
+        self.assertIsNone(self.cache.load("stale"))
+        self.assertNotIn("stale", self.cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+===================================
+Fluctuation Scaling Fitting Testing
+===================================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-04-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    test_fitting.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+import unittest
+
+import numpy
+import scipy.stats
+from scipy.optimize import curve_fit
+
+from foggy.fitting import loglink_fit, loglog_fit, fit_table
+
+
+class FittingCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = numpy.random.RandomState(1)
+        self.groups = numpy.repeat(["a", "b", "c"], 40)
+        self.x = rng.exponential(50.0, size=len(self.groups))
+        slope = numpy.repeat([0.5, 0.7, 0.9], 40)
+        self.y = 0.8 * self.x ** slope * rng.lognormal(0.0, 0.1,
+                size=len(self.x))
+        # ignored observations
+        self.x[[0, 50]] = [0.0, numpy.nan]
+        self.valid = numpy.ones(len(self.x), dtype=bool)
+        self.valid[[0, 50]] = False
+
+
+class TestLogLog(FittingCase):
+
+    def test_linregress(self):
+        fits = loglog_fit(self.x, self.y, self.groups)
+        self.assertEqual(fits.group.tolist(), ["a", "b", "c"])
+        for fit in fits:
+            mask = (self.groups == fit["group"]) & self.valid
+            (slope, intercept, r_value, p_value, std_err) =\
+                    scipy.stats.linregress(numpy.log(self.x[mask]),
+                    numpy.log(self.y[mask]))
+            self.assertEqual(fit["count"], mask.sum())
+            self.assertAlmostEqual(fit["slope"], slope)
+            self.assertAlmostEqual(fit["intercept"], intercept)
+            self.assertAlmostEqual(fit["standard_error"], std_err)
+            self.assertAlmostEqual(fit["r_squared"], r_value * r_value)
+            self.assertAlmostEqual(fit["p_value"], p_value)
+
+
+class TestLogLink(FittingCase):
+
+    def test_exact(self):
+        y = numpy.exp(-0.2 + 0.6 * numpy.log(self.x[self.valid]))
+        fit = loglink_fit(self.x[self.valid], y)[0]
+        self.assertAlmostEqual(fit["slope"], 0.6)
+        self.assertAlmostEqual(fit["intercept"], -0.2)
+
+    def test_least_squares(self):
+        fits = loglink_fit(self.x, self.y, self.groups)
+        model = lambda x, intercept, slope: numpy.exp(intercept + slope *
+                numpy.log(x))
+        for fit in fits:
+            mask = (self.groups == fit["group"]) & self.valid
+            (params, _) = curve_fit(model, self.x[mask], self.y[mask],
+                    p0=(0.0, 0.5), xtol=1E-12, ftol=1E-12)
+            self.assertAlmostEqual(fit["intercept"], params[0], places=6)
+            self.assertAlmostEqual(fit["slope"], params[1], places=6)
+
+
+class TestFitTable(FittingCase):
+
+    def setUp(self):
+        super(TestFitTable, self).setUp()
+        self.table = numpy.rec.fromarrays([self.groups, self.x, self.y],
+                names=["sim_id", "mean_activity", "std_activity"])
+
+    def test_array(self):
+        fits = fit_table(self.table, method="loglog")
+        self.assertEqual(fits.dtype.names[0], "sim_id")
+        expected = loglog_fit(self.x, self.y, self.groups)
+        self.assertTrue(numpy.array_equal(fits.slope, expected.slope))
+
+    def test_condition(self):
+        self.assertRaises(ValueError, fit_table, self.table,
+                condition="sim_id == 'a'")
+
+
+if __name__ == "__main__":
+    unittest.main()
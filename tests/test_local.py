@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+=====================
+Local Backend Testing
+=====================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-04-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    test_local.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+import sys
+import unittest
+
+from StringIO import StringIO
+
+import numpy
+import networkx as nx
+
+from foggy import local
+from foggy.walkers import prepare_uniform_walk
+
+
+class Collector(object):
+
+    def __init__(self, **kw_args):
+        super(Collector, self).__init__(**kw_args)
+        self.times = list()
+        self.closed = False
+
+    def __call__(self, time, *columns):
+        self.times.append(time)
+
+    def close(self):
+        self.closed = True
+
+
+class TestSharded(unittest.TestCase):
+
+    def setUp(self):
+        graph = nx.barabasi_albert_graph(60, 2, seed=3)
+        (self.walk, _) = prepare_uniform_walk(graph)
+        self.sources = range(len(self.walk))
+        self.capacity = dict((node, 3.0) for node in self.sources)
+        self.stdout = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+
+    def test_default_progress(self):
+        local.sharded_march(self.walk, self.sources, lambda: 20, 4, 10,
+                processes=2, seed=1)
+        self.assertIn("100.00% complete", sys.stdout.getvalue())
+
+    def test_progress(self):
+        progress = Collector()
+        local.sharded_deletory_march(self.walk, self.sources, lambda: 20, 7,
+                10, self.capacity, processes=2, block_size=2, seed=1,
+                progress=progress)
+        self.assertEqual(sorted(progress.times), range(7))
+        self.assertTrue(progress.closed)
+        self.assertEqual(sys.stdout.getvalue(), "")
+
+    def test_deterministic(self):
+        first = local.sharded_deletory_march(self.walk, self.sources,
+                lambda: 20, 7, 10, self.capacity, processes=2, block_size=2,
+                seed=1, progress=Collector())
+        second = local.sharded_deletory_march(self.walk, self.sources,
+                lambda: 20, 7, 10, self.capacity, processes=3, block_size=2,
+                seed=1, progress=Collector())
+        for (one, other) in zip(first, second):
+            self.assertTrue(numpy.array_equal(one, other))
+
+    def test_fluctuations(self):
+        activity = local.sharded_march(self.walk, self.sources, lambda: 20, 7,
+                10, processes=2, block_size=3, seed=1, progress=Collector())
+        accumulator = local.sharded_fluctuations(self.walk, self.sources,
+                lambda: 20, 7, 10, processes=2, block_size=3, seed=1,
+                progress=Collector())
+        self.assertTrue(numpy.allclose(accumulator.mean,
+                activity.mean(axis=1)))
+        self.assertTrue(numpy.allclose(accumulator.std,
+                activity.std(axis=1, ddof=1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
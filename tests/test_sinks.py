@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+=============
+Sinks Testing
+=============
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-04-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    test_sinks.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+import networkx as nx
+
+from foggy import local
+from foggy import walkers
+from foggy.sinks import ColumnWriter, MemmapSink
+
+try:
+    from foggy.hdf5 import HDF5Sink
+except ImportError:
+    HDF5Sink = None
+
+
+class Quiet(object):
+
+    def __call__(self, time, *columns):
+        pass
+
+
+class TestColumnWriter(unittest.TestCase):
+
+    def test_blocks(self):
+        data = numpy.arange(35, dtype=float).reshape(5, 7)
+        target = numpy.zeros(data.shape)
+        writer = ColumnWriter(target, block_columns=3)
+        # gaps in the sequence of time points flush the block early
+        for time in (0, 1, 4, 5, 6, 2, 3):
+            writer.write(time, data[:, time])
+        self.assertIs(writer.close(), target)
+        self.assertTrue(numpy.array_equal(target, data))
+
+
+class TestSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        graph = nx.barabasi_albert_graph(60, 2, seed=3)
+        (self.walk, _) = walkers.prepare_uniform_walk(graph)
+        self.sources = range(len(self.walk))
+        self.capacity = dict((node, 2.0) for node in self.sources)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def check(self, expected, result, sink):
+        for (one, other) in zip(expected, result):
+            self.assertTrue(numpy.array_equal(one, other))
+        for (name, array) in zip(["visits", "removed"], expected):
+            self.assertTrue(numpy.array_equal(numpy.load(sink.filename(name)),
+                    array))
+
+    def test_memmap(self):
+        expected = walkers.deletory_march(self.walk, self.sources, lambda: 30,
+                7, 10, self.capacity, seed=1, quiet=True)
+        sink = MemmapSink(os.path.join(self.directory, "serial"))
+        result = walkers.deletory_march(self.walk, self.sources, lambda: 30,
+                7, 10, self.capacity, seed=1, sink=sink, quiet=True)
+        self.check(expected, result, sink)
+
+    def test_sharded_memmap(self):
+        expected = local.sharded_deletory_march(self.walk, self.sources,
+                lambda: 30, 7, 10, self.capacity, processes=2, block_size=2,
+                seed=1, progress=Quiet())
+        sink = MemmapSink(os.path.join(self.directory, "sharded"))
+        # the workers write directly into the files of the sink
+        result = local.sharded_deletory_march(self.walk, self.sources,
+                lambda: 30, 7, 10, self.capacity, processes=2, block_size=2,
+                seed=1, sink=sink, progress=Quiet())
+        self.check(expected, result, sink)
+
+    @unittest.skipIf(HDF5Sink is None, "PyTables is not installed")
+    def test_hdf5(self):
+        expected = walkers.deletory_march(self.walk, self.sources, lambda: 30,
+                7, 10, self.capacity, seed=1, quiet=True)
+        sink = HDF5Sink(os.path.join(self.directory, "results.h5"),
+                block_columns=3)
+        result = walkers.deletory_march(self.walk, self.sources, lambda: 30,
+                7, 10, self.capacity, seed=1, sink=sink, quiet=True)
+        for (one, other) in zip(expected, result):
+            self.assertTrue(numpy.array_equal(one, other[:]))
+        sink.h5_file.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+===========================
+Walk Data Structure Testing
+===========================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-04-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    test_structures.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+import os
+import unittest
+
+import numpy
+import scipy.sparse
+import networkx as nx
+
+from foggy.structures import PreparedWalk, WalkerStore
+from foggy.walkers import (prepare_uniform_walk, prepare_sparse_walk,
+        buffered_march)
+
+
+def edge_probabilities(walk):
+    """
+    Map each edge to its transition probability.
+    """
+    probs = numpy.diff(numpy.concatenate(([0.0], walk.cumprob)))
+    result = dict()
+    for i in xrange(len(walk)):
+        (start, end) = (walk.indptr[i], walk.indptr[i + 1])
+        probs[start] = walk.cumprob[start]
+        for k in xrange(start, end):
+            result[(i, walk.indices[k])] = probs[k]
+    return result
+
+
+class TestFromAdjacency(unittest.TestCase):
+
+    def test_sequential_sums(self):
+        rng = numpy.random.RandomState(1)
+        (num, edges) = (500, 20000)
+        adjacency = scipy.sparse.csr_matrix((rng.exponential(size=edges),
+                (rng.randint(num, size=edges), rng.randint(num, size=edges))),
+                shape=(num, num))
+        walk = PreparedWalk.from_adjacency(adjacency)
+        adjacency.sum_duplicates()
+        # the summation of prepare_uniform_walk
+        expected = numpy.zeros(len(adjacency.data), dtype=float)
+        for i in xrange(num):
+            (start, end) = (adjacency.indptr[i], adjacency.indptr[i + 1])
+            prob = 0.0
+            for k in xrange(start, end):
+                prob += adjacency.data[k]
+                expected[k] = prob
+            expected[start:end] /= prob
+        self.assertTrue(numpy.array_equal(walk.cumprob, expected))
+
+    def test_prepare_uniform_walk(self):
+        graph = nx.gnp_random_graph(100, 0.1, seed=2, directed=True)
+        rng = numpy.random.RandomState(3)
+        for (u, v) in graph.edges_iter():
+            graph[u][v]["weight"] = rng.exponential()
+        for weight in (None, "weight"):
+            (expected, _) = prepare_uniform_walk(graph, weight=weight)
+            (walk, _) = prepare_sparse_walk(graph, weight=weight)
+            self.assertTrue(numpy.array_equal(walk.indptr, expected.indptr))
+            self.assertTrue(numpy.array_equal(walk.unweighted,
+                    expected.unweighted))
+            probs = edge_probabilities(walk)
+            for (edge, prob) in edge_probabilities(expected).iteritems():
+                self.assertAlmostEqual(probs[edge], prob, places=14)
+
+
+class TestAlias(unittest.TestCase):
+
+    def test_probabilities(self):
+        graph = nx.barabasi_albert_graph(100, 3, seed=2)
+        rng = numpy.random.RandomState(3)
+        for (u, v) in graph.edges_iter():
+            graph[u][v]["weight"] = rng.exponential()
+        (walk, _) = prepare_uniform_walk(graph, weight="weight", alias=True)
+        expected = walk.transition_probabilities()
+        for i in xrange(len(walk)):
+            (start, end) = (walk.indptr[i], walk.indptr[i + 1])
+            # a uniform slot keeps its own neighbour or yields to its alias
+            probs = walk.alias_prob[start:end].copy()
+            numpy.add.at(probs, walk.alias_index[start:end],
+                    1.0 - walk.alias_prob[start:end])
+            self.assertTrue(numpy.allclose(probs / (end - start),
+                    expected[start:end]))
+
+
+class TestWalkerStore(unittest.TestCase):
+
+    def fill(self, store, paths):
+        store.append(3, 1, paths[2:5])
+        store.extend(numpy.array([7, 8]), numpy.array([0, 2]), paths=paths,
+                starts=numpy.array([7, 8]), ends=numpy.array([9, 12]))
+        store.append(1, 4, paths[1:2])
+
+    def check(self, store, paths):
+        (nodes, performed, offsets, remainders) = store.drain()
+        self.assertEqual(nodes.tolist(), [3, 7, 8, 1])
+        self.assertEqual(performed.tolist(), [1, 0, 2, 4])
+        self.assertEqual([remainders[offsets[i]:offsets[i + 1]].tolist()
+                for i in xrange(len(nodes))], [[2, 3, 4], [7, 8],
+                [8, 9, 10, 11], [1]])
+
+    def test_order(self):
+        paths = numpy.arange(20, dtype=numpy.int32)
+        store = WalkerStore(size=1, paths=True)
+        # generations alternate and keep their arrays
+        for _ in range(3):
+            self.fill(store, paths)
+            self.check(store, paths)
+            self.assertEqual(len(store), 0)
+        store.close()
+
+    def test_spill(self):
+        paths = numpy.arange(20, dtype=numpy.int32)
+        store = WalkerStore(size=1, paths=True, max_bytes=0)
+        self.fill(store, paths)
+        self.assertEqual(store.nbytes, 0)
+        directory = store.directory
+        self.assertTrue(len(os.listdir(directory)) > 0)
+        self.check(store, paths)
+        store.close()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_buffered_march(self):
+        graph = nx.barabasi_albert_graph(60, 2, seed=3)
+        (walk, _) = prepare_uniform_walk(graph)
+        sources = range(len(walk))
+        capacity = dict((node, 1.0) for node in sources)
+        expected = buffered_march(walk, sources, lambda: 40, 6, 15, capacity,
+                seed=1, quiet=True)
+        result = buffered_march(walk, sources, lambda: 40, 6, 15, capacity,
+                seed=1, backlog_bytes=0, quiet=True)
+        for (one, other) in zip(expected, result):
+            self.assertTrue(numpy.array_equal(one, other))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+====================
+Fluctuations Testing
+====================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-04-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    test_utils.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+import unittest
+
+import numpy
+
+from foggy.utils import (internal_dynamics_external_fluctuations,
+        FluctuationAccumulator)
+
+
+def reference_fluctuations(activity):
+    """
+    The element-wise loop of the original implementation.
+    """
+    internal = numpy.zeros(activity.shape, dtype=float)
+    external = numpy.zeros(activity.shape, dtype=float)
+    sum_time = activity.sum(axis=1)
+    sum_elem = activity.sum(axis=0)
+    fraction = sum_time / activity.sum()
+    for i in xrange(activity.shape[0]):
+        for t in xrange(activity.shape[1]):
+            external[i, t] = fraction[i] * sum_elem[t]
+            internal[i, t] = activity[i, t] - external[i, t]
+    return (internal.std(axis=1, ddof=1), external.std(axis=1, ddof=1))
+
+
+class TestFluctuations(unittest.TestCase):
+
+    def setUp(self):
+        rng = numpy.random.RandomState(1)
+        self.activity = rng.poisson(rng.exponential(20.0, size=(50, 1)),
+                size=(50, 30)).astype(float)
+
+    def test_reference(self):
+        expected = reference_fluctuations(self.activity)
+        for block_size in (None, 1, 7, 50):
+            result = internal_dynamics_external_fluctuations(self.activity,
+                    block_size=block_size)
+            for (one, other) in zip(expected, result):
+                self.assertTrue(numpy.allclose(one, other, rtol=1E-12))
+
+    def test_input_unchanged(self):
+        activity = self.activity.copy()
+        internal_dynamics_external_fluctuations(activity, block_size=7)
+        self.assertTrue(numpy.array_equal(activity, self.activity))
+
+    def test_single_precision(self):
+        expected = reference_fluctuations(self.activity)
+        result = internal_dynamics_external_fluctuations(
+                self.activity.astype(numpy.float32), block_size=7)
+        for (one, other) in zip(expected, result):
+            self.assertTrue(numpy.allclose(one, other, rtol=1E-12))
+
+
+class TestFluctuationAccumulator(unittest.TestCase):
+
+    def setUp(self):
+        rng = numpy.random.RandomState(2)
+        self.activity = rng.poisson(rng.exponential(20.0, size=(40, 1)),
+                size=(40, 25)).astype(float)
+
+    def check(self, accumulator):
+        self.assertEqual(accumulator.count, self.activity.shape[1])
+        self.assertTrue(numpy.allclose(accumulator.mean,
+                self.activity.mean(axis=1)))
+        self.assertTrue(numpy.allclose(accumulator.std,
+                self.activity.std(axis=1, ddof=1)))
+        expected = internal_dynamics_external_fluctuations(self.activity)
+        for (one, other) in zip(expected, accumulator.fluctuations()):
+            self.assertTrue(numpy.allclose(one, other, rtol=1E-10))
+
+    def test_columns(self):
+        accumulator = FluctuationAccumulator()
+        for time in xrange(self.activity.shape[1]):
+            accumulator(time, self.activity[:, time])
+        self.check(accumulator)
+
+    def test_merge(self):
+        parts = list()
+        for (start, stop) in [(10, 25), (0, 3), (3, 10)]:
+            part = FluctuationAccumulator()
+            part.add(self.activity[:, start:stop])
+            parts.append(part)
+        accumulator = FluctuationAccumulator()
+        # blocks are merged in any order, e.g., as workers complete
+        for part in parts:
+            accumulator.merge(part)
+        accumulator.merge(FluctuationAccumulator())
+        self.check(accumulator)
+
+
+if __name__ == "__main__":
+    unittest.main()
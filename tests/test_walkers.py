@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+======================
+Serial Marcher Testing
+======================
+
+:Author:
+    Moritz Emanuel Beber
+:Date:
+    2014-04-04
+:Copyright:
+    Copyright |c| 2014, Jacobs University Bremen gGmbH, all rights reserved.
+:File:
+    test_walkers.py
+
+.. |c| unicode:: U+A9
+"""
+
+
+import unittest
+
+import numpy
+import networkx as nx
+
+from foggy import kernels
+from foggy import walkers
+from foggy.distributions import UniformInterval
+
+
+def assert_identical(test, first, second):
+    for (one, other) in zip(first, second):
+        test.assertTrue(numpy.array_equal(one, other))
+
+
+class WalkersCase(unittest.TestCase):
+
+    def setUp(self):
+        graph = nx.barabasi_albert_graph(80, 2, seed=3)
+        # a few dead ends
+        graph = graph.to_directed()
+        graph.remove_edges_from([(node, nhbr) for node in range(0, 80, 9)
+                for nhbr in graph.successors(node)])
+        (self.walk, _) = walkers.prepare_uniform_walk(graph)
+        self.sources = range(len(self.walk))
+        self.capacity = dict((node, 2.0) for node in self.sources)
+        self.num_walkers = UniformInterval(30, 10)
+
+
+@unittest.skipUnless(kernels.NUMBA_AVAILABLE, "numba is not installed")
+class TestCompiled(WalkersCase):
+
+    def test_march(self):
+        for transient in (0, 3):
+            assert_identical(self, [walkers.march(self.walk, self.sources,
+                    self.num_walkers, 6, 15, transient=transient, seed=1,
+                    quiet=True)], [walkers.march(self.walk, self.sources,
+                    self.num_walkers, 6, 15, transient=transient, seed=1,
+                    compiled=True, quiet=True)])
+
+    def test_deletory_march(self):
+        for transient in (0, 3):
+            assert_identical(self, walkers.deletory_march(self.walk,
+                    self.sources, self.num_walkers, 6, 15, self.capacity,
+                    transient=transient, seed=1, quiet=True),
+                    walkers.deletory_march(self.walk, self.sources,
+                    self.num_walkers, 6, 15, self.capacity,
+                    transient=transient, seed=1, compiled=True, quiet=True))
+
+    def test_buffered_march(self):
+        for transient in (0, 3):
+            assert_identical(self, walkers.buffered_march(self.walk,
+                    self.sources, self.num_walkers, 6, 15, self.capacity,
+                    transient=transient, seed=1, quiet=True),
+                    walkers.buffered_march(self.walk, self.sources,
+                    self.num_walkers, 6, 15, self.capacity,
+                    transient=transient, seed=1, compiled=True, quiet=True))
+
+
+class TestSeeds(WalkersCase):
+
+    def test_march(self):
+        first = walkers.march(self.walk, self.sources, self.num_walkers, 6, 15,
+                seed=1, quiet=True)
+        # drawing from the distribution does not affect seeded runs
+        self.num_walkers()
+        second = walkers.march(self.walk, self.sources, self.num_walkers, 6,
+                15, seed=1, quiet=True)
+        self.assertTrue(numpy.array_equal(first, second))
+
+    def test_lockstep_march(self):
+        first = walkers.lockstep_march(self.walk, self.sources,
+                self.num_walkers, 6, 15, seed=1, quiet=True)
+        self.num_walkers()
+        second = walkers.lockstep_march(self.walk, self.sources,
+                UniformInterval(30, 10), 6, 15, seed=1, quiet=True)
+        self.assertTrue(numpy.array_equal(first, second))
+
+    def test_seeded_distribution(self):
+        # a distribution with its own seed keeps its sequence of counts
+        num_walkers = UniformInterval(30, 10, seed=7)
+        counts = [num_walkers() for _ in range(6)]
+        # without steps each walker only visits its source
+        activity = walkers.march(self.walk, self.sources,
+                UniformInterval(30, 10, seed=7), 6, 0, seed=1, quiet=True)
+        self.assertEqual(activity.sum(axis=0).tolist(), counts)
+
+
+if __name__ == "__main__":
+    unittest.main()